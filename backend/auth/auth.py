@@ -1,24 +1,61 @@
+import csv
+import os
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
-import pandas as pd
+from utils.timing import span
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Get the backend directory (parent of auth folder)
+USERS_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'users.csv')
+# Row-level access grants (email, account_id); users without rows see every account
+USER_ACCOUNTS_CSV_PATH = os.path.join(os.path.dirname(USERS_CSV_PATH), 'user_accounts.csv')
+# Named dataset grants (email, dataset); users without rows only see the default dataset
+USER_DATASETS_CSV_PATH = os.path.join(os.path.dirname(USERS_CSV_PATH), 'user_datasets.csv')
+
+@lru_cache(maxsize=1)
+def _password_context():
+    """bcrypt context, created on first use (passlib is slow to import)."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     """Hash a password."""
-    return pwd_context.hash(password)
+    return _password_context().hash(password)
+
+def _find_user(email: str) -> Optional[dict]:
+    """Row of users.csv for an email (read with the csv module to keep pandas off the auth path)."""
+    with open(USERS_CSV_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('email') == email:
+                return row
+    return None
+
+def _granted_accounts(email: str) -> Optional[tuple]:
+    """Account ids an email is restricted to, or None when it has no grants."""
+    if not os.path.exists(USER_ACCOUNTS_CSV_PATH):
+        return None
+    with open(USER_ACCOUNTS_CSV_PATH, newline='', encoding='utf-8') as f:
+        accounts = {row['account_id'].strip() for row in csv.DictReader(f) if row.get('email') == email}
+    return tuple(sorted(accounts)) if accounts else None
+
+def _granted_datasets(email: str) -> tuple:
+    """Named datasets an email may query (the default dataset needs no grant)."""
+    if not os.path.exists(USER_DATASETS_CSV_PATH):
+        return ()
+    with open(USER_DATASETS_CSV_PATH, newline='', encoding='utf-8') as f:
+        datasets = {row['dataset'].strip() for row in csv.DictReader(f) if row.get('email') == email}
+    return tuple(sorted(datasets))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -31,6 +68,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+@span("auth")
 def verify_token(token: str):
     """Verify and decode a JWT token."""
     try:
@@ -52,47 +90,38 @@ def verify_token(token: str):
 
 def authenticate_user(email: str, password: str):
     """Authenticate a user by email and password."""
-    import os
     try:
-        # Get the backend directory (parent of auth folder)
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        csv_path = os.path.join(current_dir, 'data', 'users.csv')
-        users_df = pd.read_csv(csv_path)
-        user = users_df[users_df['email'] == email]
-        
-        if user.empty:
+        user_data = _find_user(email)
+        if user_data is None:
             return False
-            
-        user_data = user.iloc[0]
+
         # Use plain text password comparison (as provided in the case)
         if password == user_data['password']:
             return {
                 'email': user_data['email'],
                 'name': user_data['name'],
-                'role': user_data['role']
+                'role': user_data['role'],
+                'accounts': _granted_accounts(email),
+                'datasets': _granted_datasets(email)
             }
         return False
     except Exception:
         return False
 
+@span("auth")
 def get_user_by_email(email: str):
     """Get user information by email."""
-    import os
     try:
-        # Get the backend directory (parent of auth folder)
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        csv_path = os.path.join(current_dir, 'data', 'users.csv')
-        users_df = pd.read_csv(csv_path)
-        user = users_df[users_df['email'] == email]
-        
-        if user.empty:
+        user_data = _find_user(email)
+        if user_data is None:
             return None
-            
-        user_data = user.iloc[0]
+
         return {
             'email': user_data['email'],
             'name': user_data['name'],
-            'role': user_data['role']
+            'role': user_data['role'],
+            'accounts': _granted_accounts(email),
+            'datasets': _granted_datasets(email)
         }
     except Exception:
         return None
\ No newline at end of file
@@ -2,20 +2,46 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from routes.routes import router
-from middleware import RequestLoggingMiddleware
+from middleware import RequestLoggingMiddleware, ProfilingMiddleware, CompressionMiddleware
+from utils import config
+from utils.json_response import FastJSONResponse
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 import os
+import threading
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the dataset warmup in the background; /ready reports when it is done."""
+    if config.WARMUP_ENABLED:
+        from services.warmup import warm_up, warmup_state
+        threading.Thread(target=warm_up, args=(warmup_state,), name="warmup", daemon=True).start()
+    yield
+
 
 app = FastAPI(
     title="Marketing Analytics API", 
     version="1.0.0",
     description="Professional API for marketing metrics analysis with JWT authentication",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson-based encoding for every route that does not pick its own response class
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
-# Add request logging middleware (first)
+# Negotiated gzip/br/zstd response compression (innermost, so its cost is logged)
+if config.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Add request logging middleware
 app.add_middleware(RequestLoggingMiddleware)
 
+# Opt-in slow request profiling (no middleware at all when disabled)
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -44,7 +70,10 @@ async def root():
             "base_url": "http://localhost:8001/api",
             "auth": "/api/login",
             "metrics": "/api/metrics", 
-            "user_profile": "/api/me"
+            "user_profile": "/api/me",
+            "prometheus": "/metrics",
+            "health": "/health",
+            "readiness": "/ready"
         },
         "features": [
             "JWT Authentication",
@@ -55,16 +84,34 @@ async def root():
         ]
     }
 
-# Health check endpoint
+# Health check endpoint (liveness: the process is up, data may still be loading)
 @app.get("/health")
 async def health_check():
     """Health check for monitoring."""
     return {
         "status": "healthy",
-        "timestamp": "2025-09-25",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
         "service": "Marketing Analytics API"
     }
 
+# Readiness endpoint: 503 until the dataset is loaded and warm
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for load balancers, with warmup progress and dataset details."""
+    from services.warmup import warmup_state
+    report = warmup_state.snapshot()
+    report["ready"] = warmup_state.ready or not config.WARMUP_ENABLED
+    return FastJSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text-format exposition of the API monitoring counters."""
+    from fastapi.responses import PlainTextResponse
+    from utils import api_logger, render_metrics
+    from utils.prometheus import CONTENT_TYPE
+    return PlainTextResponse(render_metrics(api_logger), media_type=CONTENT_TYPE)
+
 # Mount static files for templates
 templates_dir = os.path.join(os.path.dirname(__file__), "templates")
 if os.path.exists(templates_dir):
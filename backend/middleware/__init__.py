@@ -3,5 +3,7 @@ Middleware modules for request processing and logging.
 """
 
 from .logging_middleware import RequestLoggingMiddleware
+from .profiling_middleware import ProfilingMiddleware
+from .compression_middleware import CompressionMiddleware
 
-__all__ = ["RequestLoggingMiddleware"]
\ No newline at end of file
+__all__ = ["RequestLoggingMiddleware", "ProfilingMiddleware", "CompressionMiddleware"]
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+Response compression middleware.
+Compresses JSON/text responses above COMPRESSION_MIN_SIZE with the best
+encoding the client accepts (large bodies in the threadpool); streamed and
+already encoded responses pass through.
+"""
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from utils import config
+from utils.compression import compress_async, is_compressible, negotiate_encoding
+
+
+class CompressionMiddleware(BaseHTTPMiddleware):
+    """Middleware that applies negotiated gzip/br/zstd content encoding."""
+    
+    async def dispatch(self, request: Request, call_next):
+        """Compress the response body when the client and content type allow it."""
+        
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        response = await call_next(request)
+        
+        if (encoding is None or "content-encoding" in response.headers
+                or not is_compressible(response.headers.get("content-type", ""))):
+            return response
+        
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = [
+            (name, value) for name, value in response.raw_headers
+            if name not in (b"content-length", b"content-encoding")
+        ]
+        if len(body) >= config.COMPRESSION_MIN_SIZE:
+            body = await compress_async(body, encoding)
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+        
+        compressed = Response(content=body, status_code=response.status_code, background=response.background)
+        compressed.raw_headers = headers + [(b"content-length", str(len(body)).encode("latin-1"))]
+        compressed.headers.add_vary_header("Accept-Encoding")
+        return compressed
@@ -8,6 +8,8 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
 from utils.logger import api_logger
+from utils import config
+from utils.timing import start_request_timing, format_server_timing
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Middleware to automatically log all HTTP requests."""
@@ -22,6 +24,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         
         start_time = time.time()
         
+        # Stage spans are only collected when enabled (zero cost otherwise)
+        spans = start_request_timing() if config.SERVER_TIMING_ENABLED else None
+        
         # Get client IP (handle proxy headers)
         client_ip = self.get_client_ip(request)
         
@@ -48,6 +53,9 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         # Calculate response time
         process_time = time.time() - start_time
         
+        # Metric label: matched route template, never raw ids (bounded cardinality)
+        route_path = self.get_route_label(request)
+        
         # Log the request
         api_logger.log_request(
             method=request.method,
@@ -56,14 +64,29 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
             status_code=response.status_code,
             response_time=process_time,
             user_email=user_email,
-            error=error_message
+            error=error_message,
+            route=route_path
         )
         
         # Add response time header
         response.headers["X-Process-Time"] = str(process_time)
         
+        if spans is not None:
+            response.headers["Server-Timing"] = format_server_timing(spans, total=process_time)
+            if spans:
+                api_logger.record_stage_timings(route_path, dict(spans))
+        
         return response
     
+    def get_route_label(self, request: Request) -> str:
+        """Route path with path parameters restored to their {placeholders}."""
+        if request.scope.get("route") is None:
+            return "unmatched"
+        route_path = request.url.path
+        for name, value in request.scope.get("path_params", {}).items():
+            route_path = route_path.replace(f"/{value}", f"/{{{name}}}")
+        return route_path
+    
     def get_client_ip(self, request: Request) -> str:
         """Extract client IP considering proxy headers."""
         
@@ -85,7 +108,7 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
         
         # Skip user extraction for public paths (faster)
         path = request.url.path
-        if path in {"/", "/docs", "/openapi.json", "/api/logs", "/api/logs/json", "/health"}:
+        if path in {"/", "/docs", "/openapi.json", "/api/logs", "/api/logs/json", "/api/logs/stream", "/health", "/ready", "/metrics"}:
             return None
         
         # Quick header check
@@ -0,0 +1,77 @@
+"""
+Opt-in profiling middleware for slow requests.
+Samples request stacks and keeps a profile only when the request is slow;
+admins can force a full cProfile run with the X-Profile header.
+"""
+
+import time
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from utils import config
+from utils.profiler import stack_sampler, profile_store, request_profile, CProfileSession
+
+PROFILE_HEADER = "x-profile"
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Middleware that captures profiles of slow (or flagged) requests."""
+    
+    def __init__(self, app, sampler=None, store=None):
+        super().__init__(app)
+        self.sampler = sampler or stack_sampler
+        self.store = store or profile_store
+    
+    async def dispatch(self, request: Request, call_next):
+        """Profile matching requests, keep the profile only if slow or flagged."""
+        
+        path = request.url.path
+        if not path.startswith(config.PROFILING_PATHS):
+            return await call_next(request)
+        
+        user_email = None
+        cprofile_session = None
+        if request.headers.get(PROFILE_HEADER):
+            user_email = self.get_admin_email(request)
+            if user_email:
+                cprofile_session = CProfileSession()
+        
+        session = self.sampler.start_session()
+        # Work the request hands to the threadpool is profiled with it
+        token = request_profile.set((session, cprofile_session))
+        start_time = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            duration = time.perf_counter() - start_time
+            request_profile.reset(token)
+            self.sampler.stop_session(session)
+            stats_text = cprofile_session.stop() if cprofile_session else None
+        
+        threshold = config.PROFILING_THRESHOLD_MS / 1000
+        if cprofile_session is not None or duration >= threshold:
+            profile = self.store.add(
+                method=request.method,
+                path=path,
+                duration=duration,
+                mode="cprofile" if cprofile_session else "sampled",
+                user=user_email,
+                session=session,
+                stats_text=stats_text
+            )
+            response.headers["X-Profile-Id"] = str(profile["id"])
+        
+        return response
+    
+    def get_admin_email(self, request: Request):
+        """Only admins may force the (more expensive) cProfile mode."""
+        auth_header = request.headers.get("authorization", "")
+        if not auth_header.startswith("Bearer "):
+            return None
+        try:
+            from auth import verify_token, get_user_by_email
+            user = get_user_by_email(verify_token(auth_header[7:]))
+            if user and user.get("role") == "admin":
+                return user["email"]
+        except Exception:
+            pass
+        return None
@@ -8,7 +8,17 @@ from .models import (
     UserInfo,
     MetricData,
     MetricsResponse,
-    MetricsFilters
+    MetricsFilters,
+    MetricsCount,
+    RangeFilter,
+    AggregateResponse,
+    BatchQuery,
+    BatchRequest,
+    BatchResponse,
+    TimeSeriesQuery,
+    TimeSeriesResponse,
+    ApproxStatsQuery,
+    ApproxStatsResponse
 )
 
 __all__ = [
@@ -17,5 +27,15 @@ __all__ = [
     "UserInfo",
     "MetricData",
     "MetricsResponse",
-    "MetricsFilters"
+    "MetricsFilters",
+    "MetricsCount",
+    "RangeFilter",
+    "AggregateResponse",
+    "BatchQuery",
+    "BatchRequest",
+    "BatchResponse",
+    "TimeSeriesQuery",
+    "TimeSeriesResponse",
+    "ApproxStatsQuery",
+    "ApproxStatsResponse"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from typing import Optional, List, Literal, Dict
 from datetime import datetime
 
 class LoginRequest(BaseModel):
@@ -15,6 +15,8 @@ class UserInfo(BaseModel):
     email: str
     name: str
     role: str
+    accounts: Optional[List[str]] = None  # account grant; None means every account
+    datasets: List[str] = Field(default_factory=list)  # named datasets granted (the default needs none)
 
 class MetricData(BaseModel):
     model_config = ConfigDict(exclude_none=True)
@@ -26,6 +28,9 @@ class MetricData(BaseModel):
     cost_micros: Optional[int] = None
     conversions: float
     conversion_rate: float
+    ctr: float = 0.0
+    cpc: Optional[float] = None  # cost per click, micros (admin only)
+    cpa: Optional[float] = None  # cost per conversion, micros (admin only)
 
 class MetricDataPublic(BaseModel):
     """Metric data for regular users (no cost information)"""
@@ -35,6 +40,7 @@ class MetricDataPublic(BaseModel):
     clicks: int
     conversions: float
     conversion_rate: float
+    ctr: float = 0.0
 
 class MetricsResponse(BaseModel):
     model_config = ConfigDict(exclude_none=True)
@@ -44,6 +50,7 @@ class MetricsResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    total_count_approximate: bool = False  # total_count/total_pages are estimates
 
 class MetricsResponsePublic(BaseModel):
     """Metrics response for regular users (no cost information)"""
@@ -52,12 +59,203 @@ class MetricsResponsePublic(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    total_count_approximate: bool = False  # total_count/total_pages are estimates
+
+# Numeric columns accepted by range filters (cost columns are admin-only)
+RANGE_FILTER_COLUMNS = (
+    'impressions', 'clicks', 'conversions', 'interactions', 'cost_micros',
+    'conversion_rate', 'ctr', 'cpc', 'cpa'
+)
+
+class RangeFilter(BaseModel):
+    """Numeric predicate on one column, e.g. impressions > 10000."""
+    column: str
+    gt: Optional[float] = None
+    gte: Optional[float] = None
+    lt: Optional[float] = None
+    lte: Optional[float] = None
+    
+    @field_validator('column')
+    @classmethod
+    def check_column(cls, value):
+        if value not in RANGE_FILTER_COLUMNS:
+            raise ValueError(f"column must be one of {', '.join(RANGE_FILTER_COLUMNS)}")
+        return value
+    
+    @model_validator(mode='after')
+    def check_bounds(self):
+        if all(bound is None for bound in (self.gt, self.gte, self.lt, self.lte)):
+            raise ValueError("at least one of gt, gte, lt, lte is required")
+        return self
+
+# Dataset selectors name a source file, so only plain identifiers are accepted
+DATASET_NAME_REGEX = r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$'
+# Dataset served when a request does not select one (metrics.csv)
+DEFAULT_DATASET = 'default'
+
+def _check_iso_date(value: Optional[str]) -> Optional[str]:
+    """Reject date filters that are not ISO dates (e.g. 2024-01-31)."""
+    if value:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("dates must be ISO formatted, e.g. 2024-01-31")
+    return value
 
 class MetricsFilters(BaseModel):
+    dataset: Optional[str] = Field(default=None, pattern=DATASET_NAME_REGEX)  # None: metrics.csv
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     sort_by: Optional[str] = None
     sort_order: Optional[str] = "asc"
     search: Optional[str] = None
+    ranges: Optional[List[RangeFilter]] = None
     page: Optional[int] = 1
-    page_size: Optional[int] = 20
\ No newline at end of file
+    page_size: Optional[int] = 20
+    # 'approximate' serves pages from an early-terminating scan and estimates total_count
+    count_mode: Optional[Literal['exact', 'approximate']] = 'exact'
+    
+    @field_validator('start_date', 'end_date')
+    @classmethod
+    def check_dates(cls, value):
+        return _check_iso_date(value)
+
+class MetricsCount(BaseModel):
+    total_count: int
+    total_pages: int
+
+# Columns aggregate queries can group by
+AGGREGATE_GROUP_COLUMNS = ('date', 'campaign_id', 'account_id')
+
+class AggregateRow(BaseModel):
+    """Summed metrics over a set of rows (a whole result or one group)."""
+    model_config = ConfigDict(exclude_none=True)
+    
+    key: Optional[str] = None  # group value, absent for totals
+    rows: int
+    impressions: int
+    clicks: int
+    interactions: int
+    conversions: float
+    conversion_rate: float
+    ctr: float
+    cost_micros: Optional[int] = None  # admin only
+    cpc: Optional[float] = None  # admin only
+    cpa: Optional[float] = None  # admin only
+
+class AggregateResponse(BaseModel):
+    totals: AggregateRow
+    groups: Optional[List[AggregateRow]] = None
+
+# Metrics a time series can chart: additive sums and ratios derived from them
+TIMESERIES_METRICS = (
+    'impressions', 'clicks', 'interactions', 'conversions', 'cost_micros',
+    'conversion_rate', 'ctr', 'cpc', 'cpa'
+)
+TIMESERIES_INTERVALS = ('day', 'week', 'month')
+MAX_TIMESERIES_POINTS = 2000
+
+class TimeSeriesQuery(BaseModel):
+    """Bucketed series over the filtered rows, one per group (or a single total series)."""
+    filters: MetricsFilters = Field(default_factory=MetricsFilters)
+    metrics: List[str] = Field(default_factory=lambda: ['impressions', 'clicks', 'conversions'], min_length=1)
+    interval: Optional[Literal['day', 'week', 'month']] = None  # finest that fits max_points when omitted
+    max_points: int = Field(default=200, ge=3, le=MAX_TIMESERIES_POINTS)
+    downsample: Literal['lttb', 'none'] = 'lttb'
+    group_by: Optional[Literal['campaign_id', 'account_id']] = None
+    top: int = Field(default=10, ge=1, le=50)  # series kept when grouping, by total of the first metric
+    
+    @field_validator('metrics')
+    @classmethod
+    def check_metrics(cls, value):
+        unknown = [metric for metric in value if metric not in TIMESERIES_METRICS]
+        if unknown:
+            raise ValueError(f"metrics must be in {', '.join(TIMESERIES_METRICS)}")
+        return list(dict.fromkeys(value))
+
+class TimeSeries(BaseModel):
+    model_config = ConfigDict(exclude_none=True)
+    
+    key: Optional[str] = None  # group value, absent for the total series
+    timestamps: List[str]
+    values: dict  # metric -> list of values aligned with timestamps
+
+class TimeSeriesResponse(BaseModel):
+    interval: str
+    buckets: int  # buckets before downsampling
+    series: List[TimeSeries]
+
+# Columns with per-day distinct-count sketches and metrics with quantile sketches
+SKETCH_DISTINCT_COLUMNS = ('campaign_id', 'account_id')
+SKETCH_QUANTILE_METRICS = (
+    'impressions', 'clicks', 'conversions', 'cost_micros',
+    'conversion_rate', 'ctr', 'cpc', 'cpa'
+)
+
+class ApproxStatsQuery(BaseModel):
+    """Distinct counts and quantiles over a date range, answered from sketches."""
+    dataset: Optional[str] = Field(default=None, pattern=DATASET_NAME_REGEX)
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    distinct: List[str] = Field(default_factory=lambda: list(SKETCH_DISTINCT_COLUMNS))
+    quantiles: Dict[str, List[float]] = Field(default_factory=dict)  # metric -> quantiles in [0, 1]
+    
+    @field_validator('start_date', 'end_date')
+    @classmethod
+    def check_dates(cls, value):
+        return _check_iso_date(value)
+    
+    @field_validator('distinct')
+    @classmethod
+    def check_distinct(cls, value):
+        if any(column not in SKETCH_DISTINCT_COLUMNS for column in value):
+            raise ValueError(f"distinct columns must be in {', '.join(SKETCH_DISTINCT_COLUMNS)}")
+        return value
+    
+    @field_validator('quantiles')
+    @classmethod
+    def check_quantiles(cls, value):
+        for metric, qs in value.items():
+            if metric not in SKETCH_QUANTILE_METRICS:
+                raise ValueError(f"quantile metrics must be in {', '.join(SKETCH_QUANTILE_METRICS)}")
+            if not qs or any(not 0 <= q <= 1 for q in qs):
+                raise ValueError("quantiles must be between 0 and 1")
+        return value
+
+class ApproxStatsResponse(BaseModel):
+    rows: int  # exact
+    days: int
+    distinct: Dict[str, int]
+    quantiles: Dict[str, Dict[str, Optional[float]]]
+    error: Dict[str, float]  # documented error bounds of the sketches
+
+# Upper bound on queries per batch request
+MAX_BATCH_QUERIES = 20
+
+class BatchQuery(BaseModel):
+    """One query of a batch: a metrics page or an aggregate over the same filters."""
+    id: Optional[str] = None
+    type: Literal['metrics', 'aggregate'] = 'metrics'
+    filters: MetricsFilters = Field(default_factory=MetricsFilters)
+    group_by: Optional[str] = None  # aggregate queries only
+    
+    @field_validator('group_by')
+    @classmethod
+    def check_group_by(cls, value):
+        if value is not None and value not in AGGREGATE_GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(AGGREGATE_GROUP_COLUMNS)}")
+        return value
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(min_length=1, max_length=MAX_BATCH_QUERIES)
+
+class BatchResult(BaseModel):
+    """Result of one batch query; failed queries carry status and error instead of data."""
+    id: Optional[str] = None
+    type: str
+    status: int = 200
+    data: Optional[dict] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from datetime import timedelta
-from models import LoginRequest, LoginResponse, MetricsFilters, MetricsResponse
+from models import (
+    LoginRequest, LoginResponse, MetricsFilters, MetricsResponse, MetricsCount,
+    BatchRequest, BatchResponse, TimeSeriesQuery, TimeSeriesResponse,
+    ApproxStatsQuery, ApproxStatsResponse
+)
 from auth import authenticate_user, create_access_token, verify_token, get_user_by_email, ACCESS_TOKEN_EXPIRE_MINUTES
-from services import get_filtered_metrics
+from services.permissions import forbidden_range_columns, is_column_allowed, is_dataset_allowed
+from utils.admission import AdmissionRejected
+from utils.logger import api_logger
 
 router = APIRouter()
 security = HTTPBearer(auto_error=False)
@@ -45,6 +51,15 @@ def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depen
         )
     return user
 
+def require_admin(current_user: dict = Depends(get_current_user)):
+    """Restrict an endpoint to admin users."""
+    if current_user.get('role') != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
 @router.post("/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     """Authenticate user and return JWT token."""
@@ -75,22 +90,282 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 @router.post("/metrics")
 async def get_metrics(
     filters: MetricsFilters,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Get filtered metrics data with pagination for large datasets."""
+    forbidden = forbidden_range_columns(filters.ranges, current_user)
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Filtering by '{forbidden[0]}' requires admin privileges"
+        )
+    _require_dataset(filters.dataset, current_user)
+    
+    from services.export import negotiate_format
+    response_format = negotiate_format(request.headers.get("accept", ""))
+    if response_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Supported formats: application/json, " + ", ".join(_bulk_media_types())
+        )
+    
     try:
         page = filters.page or 1
         page_size = min(filters.page_size or 20, 100)  # Default 20 records, max 100 per page
         
-        metrics_data = get_filtered_metrics(filters, current_user, page, page_size)
-        return metrics_data
+        if response_format != 'json':
+            return await _bulk_metrics_response(filters, current_user, page, page_size, response_format)
+        
+        # Repeated queries reuse the serialized (and compressed) payload
+        from services.processor import admit_query, coalesced_filtered_metrics, response_cache_key
+        from utils.compression import payload_cache, negotiate_encoding
+        cache_key = response_cache_key(filters, current_user, page, page_size)
+        payload = payload_cache.get(cache_key) if cache_key else None
+        if payload is None:
+            # Expensive queries wait for (or are shed by) the admission controller
+            async with admit_query(filters, current_user, page, page_size):
+                metrics_data = await coalesced_filtered_metrics(filters, current_user, page, page_size)
+            if cache_key is None:
+                from utils.json_response import FastJSONResponse
+                return FastJSONResponse(metrics_data)
+            payload = payload_cache.put(cache_key, metrics_data.model_dump_json().encode())
+        return await payload.response(negotiate_encoding(request.headers.get("accept-encoding", "")))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        api_logger.log_system_event("API_ERROR", f"/api/metrics: {e}", level="ERROR")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving metrics: {str(e)}"
+        )
+
+def _require_dataset(dataset: Optional[str], user: dict):
+    """403 for a dataset the user is not granted, 404 for one that does not exist."""
+    from services.loader import dataset_exists
+    if not is_dataset_allowed(dataset, user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"No access to dataset '{dataset}'"
+        )
+    if not dataset_exists(dataset):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset '{dataset}'"
+        )
+
+def _bulk_media_types() -> list:
+    from services.export import available_formats
+    return list(available_formats())
+
+async def _bulk_metrics_response(filters: MetricsFilters, user: dict, page: int, page_size: int, response_format: str):
+    """Columnar JSON or Arrow IPC page built straight from the loaded columns."""
+    from fastapi import Response
+    from utils.profiler import run_in_threadpool
+    from services.export import export_metrics
+    from services.processor import admit_query
+    
+    async with admit_query(filters, user, page, page_size):
+        body, media_type, meta = await run_in_threadpool(
+            export_metrics, filters, user, page, page_size, response_format
+        )
+    return Response(content=body, media_type=media_type, headers={
+        "X-Total-Count": str(meta["total_count"]),
+        "X-Total-Count-Approximate": "true" if meta["total_count_approximate"] else "false"
+    })
+
+@router.post("/metrics/export")
+async def export_metrics(
+    filters: MetricsFilters,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk metrics pages (up to 100k rows) as columnar JSON or, with pyarrow, an Arrow IPC stream."""
+    from services.export import MAX_EXPORT_ROWS, negotiate_format
+    
+    forbidden = forbidden_range_columns(filters.ranges, current_user)
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Filtering by '{forbidden[0]}' requires admin privileges"
+        )
+    _require_dataset(filters.dataset, current_user)
+    response_format = negotiate_format(request.headers.get("accept", ""), default='columnar')
+    if response_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail="Supported formats: " + ", ".join(_bulk_media_types())
+        )
+    
+    try:
+        page = filters.page or 1
+        # Exports default to the largest page rather than the 20-row /metrics page
+        requested = filters.page_size if 'page_size' in filters.model_fields_set else None
+        page_size = min(requested or MAX_EXPORT_ROWS, MAX_EXPORT_ROWS)
+        # Plain JSON clients get the columnar layout: exports never encode per-row objects
+        response_format = 'columnar' if response_format == 'json' else response_format
+        return await _bulk_metrics_response(filters, current_user, page, page_size, response_format)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        api_logger.log_system_event("API_ERROR", f"/api/metrics/export: {e}", level="ERROR")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error exporting metrics: {str(e)}"
+        )
+
+@router.post("/metrics/count", response_model=MetricsCount)
+async def get_metrics_count(
+    filters: MetricsFilters,
+    current_user: dict = Depends(get_current_user)
+):
+    """Exact total count for a filter set (for responses with total_count_approximate)."""
+    from utils.profiler import run_in_threadpool
+    from services.processor import admit_query, get_metrics_count as count_metrics
+    
+    forbidden = forbidden_range_columns(filters.ranges, current_user)
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Filtering by '{forbidden[0]}' requires admin privileges"
+        )
+    _require_dataset(filters.dataset, current_user)
+    
+    try:
+        page_size = min(filters.page_size or 20, 100)
+        # The exact count is the full filter run: admitted like a metrics query, off the event loop
+        async with admit_query(filters, current_user, 1, page_size):
+            return await run_in_threadpool(count_metrics, filters, current_user, page_size)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        api_logger.log_system_event("API_ERROR", f"/api/metrics/count: {e}", level="ERROR")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error counting metrics: {str(e)}"
+        )
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch_query(
+    batch: BatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Run several metrics and aggregate queries with one auth check and shared filtering."""
+    from utils.profiler import run_in_threadpool
+    from services.batch import admit_batch, run_batch
+    
+    try:
+        # The whole batch is admitted like one query of its combined cost
+        async with admit_batch(batch.queries, current_user):
+            return await run_in_threadpool(run_batch, batch.queries, current_user)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
-        print(f"API Error: {str(e)}")  # Debug log
+        api_logger.log_system_event("API_ERROR", f"/api/batch: {e}", level="ERROR")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving metrics: {str(e)}"
         )
 
+@router.post("/timeseries", response_model=TimeSeriesResponse, response_model_exclude_none=True)
+async def get_timeseries(
+    query: TimeSeriesQuery,
+    current_user: dict = Depends(get_current_user)
+):
+    """Bucketed (and optionally LTTB-downsampled) metric series for charts."""
+    from services.timeseries import get_time_series
+    from utils.profiler import run_in_threadpool
+    
+    forbidden = forbidden_range_columns(query.filters.ranges, current_user)
+    forbidden += [metric for metric in query.metrics if not is_column_allowed(metric, current_user)]
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"'{forbidden[0]}' requires admin privileges"
+        )
+    _require_dataset(query.filters.dataset, current_user)
+    
+    try:
+        # Loading a cold dataset and bucketing its rows must not block the event loop
+        return await run_in_threadpool(get_time_series, query, current_user)
+    except Exception as e:
+        api_logger.log_system_event("API_ERROR", f"/api/timeseries: {e}", level="ERROR")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error retrieving time series: {str(e)}"
+        )
+
+@router.post("/stats/approx", response_model=ApproxStatsResponse)
+async def get_approximate_stats(
+    query: ApproxStatsQuery,
+    current_user: dict = Depends(get_current_user)
+):
+    """Approximate distinct counts and metric quantiles over a date range."""
+    from services.aggregates import get_approximate_stats as compute_approximate_stats
+    from services.storage import storage_engine
+    from utils.profiler import run_in_threadpool
+    
+    if storage_engine() is not None:
+        # Sketches are built from the loaded frame, which the SQL backend never loads
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Approximate statistics are not available with STORAGE_BACKEND={storage_engine()}"
+        )
+    if current_user.get('accounts') is not None:
+        # Sketches summarize every account, so they would leak rows outside the grant
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Approximate statistics require access to all accounts"
+        )
+    forbidden = [metric for metric in query.quantiles if not is_column_allowed(metric, current_user)]
+    if forbidden:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"'{forbidden[0]}' requires admin privileges"
+        )
+    _require_dataset(query.dataset, current_user)
+    
+    try:
+        # The first call per dataset (and metric) loads it and builds its sketches
+        return await run_in_threadpool(compute_approximate_stats, query)
+    except Exception as e:
+        api_logger.log_system_event("API_ERROR", f"/api/stats/approx: {e}", level="ERROR")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error computing statistics: {str(e)}"
+        )
+
+@router.get("/datasets")
+async def list_datasets(current_user: dict = Depends(require_admin)):
+    """Admin-only: available datasets, which of them are loaded and the memory budget."""
+    from services.loader import dataset_registry
+    
+    registry = dataset_registry.snapshot()
+    resident = {entry['name']: entry for entry in registry.pop('resident')}
+    return {
+        "datasets": [
+            {"name": name, "loaded": name in resident, **resident.get(name, {})}
+            for name in dataset_registry.names()
+        ],
+        **registry
+    }
+
 @router.get("/logs")
 async def get_logs():
     """Public endpoint to show real-time API activity logs in HTML format."""
@@ -106,8 +381,9 @@ async def get_logs_json():
     """Alternative endpoint for JSON formatted logs (pretty printed)."""
     from datetime import datetime
     from utils.logger import api_logger
-    from fastapi.responses import JSONResponse
-    import json
+    from utils.log_stream import format_log_entry, format_stats
+    from utils.admission import admission_controller
+    from utils.json_response import FastJSONResponse
     
     # Get recent logs and stats
     recent_logs = api_logger.get_recent_logs(limit=20)
@@ -117,31 +393,52 @@ async def get_logs_json():
         "api_status": "RUNNING",
         "timestamp": datetime.now().isoformat(),
         "server_location": "Render.com",
-        "statistics": {
-            "total_requests": stats["total_requests"],
-            "success_rate": f"{stats['success_rate']}%",
-            "average_response_time": f"{stats['average_response_time']}ms",
-            "status_codes": stats["status_codes"],
-            "logs_in_memory": stats["active_logs_count"]  # Campo correto
-        },
-        "recent_requests": [
-            {
-                "time": log["time_formatted"],
-                "method": log["method"],
-                "path": log["path"],
-                "status": log["status_code"],
-                "user": log["user"],
-                "response_time": f"{log['response_time_ms']}ms" if log["response_time_ms"] else "N/A",
-                "level": log["level"]
-            }
-            for log in recent_logs
-        ],
+        "statistics": format_stats(stats),
+        "recent_requests": [format_log_entry(log) for log in recent_logs],
+        "admission": admission_controller.snapshot(),
         "message": "Real-time API monitoring - JSON format",
-        "note": "Use /api/logs for HTML view or /api/logs/json for JSON"
+        "note": "Use /api/logs for HTML view, /api/logs/json for JSON or /api/logs/stream for live events"
     }
     
-    # Return pretty-printed JSON
-    return JSONResponse(
+    # Encoded directly (no jsonable_encoder pass over the nested entries)
+    return FastJSONResponse(
         content=data,
         headers={"Content-Type": "application/json; charset=utf-8"}
-    )
\ No newline at end of file
+    )
+
+@router.get("/logs/stream")
+async def stream_logs(request: Request):
+    """Server-sent events stream of new log entries and periodic stat deltas."""
+    from fastapi.responses import StreamingResponse
+    from utils.log_stream import log_broadcaster
+    
+    return StreamingResponse(
+        log_broadcaster.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/profiles")
+async def list_profiles(current_user: dict = Depends(require_admin)):
+    """Admin-only: summaries of the most recent slow-request profiles."""
+    from utils.profiler import profile_store
+    from utils import config
+    
+    return {
+        "profiling_enabled": config.PROFILING_ENABLED,
+        "threshold_ms": config.PROFILING_THRESHOLD_MS,
+        "profiles": profile_store.list()
+    }
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: int, current_user: dict = Depends(require_admin)):
+    """Admin-only: full stack samples (or cProfile output) of one profile."""
+    from utils.profiler import profile_store
+    
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile
@@ -1,9 +1,15 @@
 """
 Business logic services for data processing, filtering, and metrics calculation.
+Submodules load on first use so importing the package does not pull in pandas.
 """
 
-from .processor import get_filtered_metrics
-
 __all__ = [
     "get_filtered_metrics"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name == "get_filtered_metrics":
+        from .processor import get_filtered_metrics
+        return get_filtered_metrics
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+from models.models import MetricsFilters, AggregateResponse, AggregateRow, ApproxStatsQuery, ApproxStatsResponse
+from .loader import get_dataset_index, get_metrics_store
+from .index import DatasetIndex
+from .filters import is_column_allowed
+from .planner import filter_row_ids
+from .sketches import get_day_sketches, hll_standard_error, kll_rank_error
+from .processor import get_filter_set
+from utils.timing import span
+
+# Additive columns summed by aggregate queries; ratios are derived from the sums
+SUM_COLUMNS = ('impressions', 'clicks', 'interactions', 'conversions', 'cost_micros')
+
+
+def sum_columns(index: DatasetIndex, row_ids: Optional[np.ndarray], codes=None, groups: int = 1) -> dict:
+    """Sum of each additive column per group code (one group when codes is None)."""
+    sums = {}
+    for column in SUM_COLUMNS:
+        if column not in index.df.columns:
+            continue
+        values = index.df[column].to_numpy(dtype='float64', na_value=0.0)
+        if row_ids is not None:
+            values = values[row_ids]
+        if codes is None:
+            sums[column] = np.array([values.sum()])
+        else:
+            sums[column] = np.bincount(codes, weights=values, minlength=groups)
+    return sums
+
+
+def group_codes(index: DatasetIndex, row_ids: Optional[np.ndarray], group_by: str):
+    """(codes per selected row, group labels) for a group-by column."""
+    column = index.df[group_by]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        labels = column.cat.categories.astype(str)
+    elif group_by == 'date':
+        days = column.to_numpy().astype('datetime64[D]')
+        if row_ids is not None:
+            days = days[row_ids]
+        uniques, codes = np.unique(days, return_inverse=True)
+        return codes, pd.DatetimeIndex(uniques).strftime('%Y-%m-%d')
+    else:
+        codes, labels = pd.factorize(column, sort=True)
+        labels = pd.Index(labels).astype(str)
+    if row_ids is not None:
+        codes = codes[row_ids]
+    # Missing group values (code -1) are left out of the groups
+    return codes, labels
+
+
+def _aggregate_row(sums: dict, position: int, rows: int, include_cost: bool, key=None) -> AggregateRow:
+    """Build one AggregateRow from group sums, deriving the ratio KPIs."""
+    value = {column: float(column_sums[position]) for column, column_sums in sums.items()}
+    impressions = value.get('impressions', 0.0)
+    clicks = value.get('clicks', 0.0)
+    conversions = value.get('conversions', 0.0)
+    row = {
+        'key': key,
+        'rows': rows,
+        'impressions': int(impressions),
+        'clicks': int(clicks),
+        'interactions': int(value.get('interactions', 0.0)),
+        'conversions': round(conversions, 2),
+        'conversion_rate': conversions / clicks * 100 if clicks else 0.0,
+        'ctr': clicks / impressions * 100 if impressions else 0.0
+    }
+    if include_cost and 'cost_micros' in value:
+        cost = value['cost_micros']
+        row['cost_micros'] = int(cost)
+        row['cpc'] = cost / clicks if clicks else None
+        row['cpa'] = cost / conversions if conversions else None
+    return AggregateRow.model_validate(row)
+
+
+def store_aggregate(store, filter_set: tuple, group_by: Optional[str], include_cost: bool) -> AggregateResponse:
+    """get_aggregated_metrics run as SUM ... GROUP BY in the SQL store."""
+    with span("aggregate"):
+        result = store.group_sums(filter_set, [], SUM_COLUMNS)
+        sums = {column: result[column].to_numpy(dtype='float64') for column in result.columns[:-1]}
+        totals = _aggregate_row(sums, 0, int(result['row_count'].iloc[0]), include_cost)
+        if not group_by:
+            return AggregateResponse(totals=totals)
+
+        # Missing group values are left out of the groups, like the in-memory path
+        result = store.group_sums(filter_set, [group_by], SUM_COLUMNS).dropna(subset=[group_by])
+        sums = {column: result[column].to_numpy(dtype='float64') for column in result.columns[1:-1]}
+        groups = [
+            _aggregate_row(sums, position, int(rows), include_cost, key=str(key))
+            for position, (key, rows) in enumerate(zip(result[group_by], result['row_count']))
+        ]
+    return AggregateResponse(totals=totals, groups=groups)
+
+
+def get_aggregated_metrics(filters: MetricsFilters, user: dict, group_by: Optional[str] = None,
+                           shared: Optional[dict] = None) -> AggregateResponse:
+    """Totals (and optional per-group sums) over the filtered rows."""
+    filter_set = get_filter_set(filters, user)
+    store = get_metrics_store(filters.dataset)
+    if store is not None:
+        return store_aggregate(store, filter_set, group_by, is_column_allowed('cost_micros', user))
+    index = get_dataset_index(filters.dataset)
+    with span("filter"):
+        row_ids = filter_row_ids(index, *filter_set, shared=shared)
+    include_cost = is_column_allowed('cost_micros', user)
+
+    with span("aggregate"):
+        rows = index.n if row_ids is None else len(row_ids)
+        totals = _aggregate_row(sum_columns(index, row_ids), 0, rows, include_cost)
+        if not group_by:
+            return AggregateResponse(totals=totals)
+
+        codes, labels = group_codes(index, row_ids, group_by)
+        valid = codes >= 0
+        if not valid.all():
+            codes = codes[valid]
+            row_ids = (np.arange(index.n) if row_ids is None else row_ids)[valid]
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = sum_columns(index, row_ids, codes, len(labels))
+        groups = [
+            _aggregate_row(sums, position, int(counts[position]), include_cost, key=labels[position])
+            for position in np.flatnonzero(counts)
+        ]
+    return AggregateResponse(totals=totals, groups=groups)
+
+
+def get_approximate_stats(query: ApproxStatsQuery) -> ApproxStatsResponse:
+    """Distinct counts and quantiles for a date range by merging per-day sketches (no row scan)."""
+    sketches = get_day_sketches(get_dataset_index(query.dataset))
+    with span("aggregate"):
+        lo, hi = sketches.day_range(query.start_date, query.end_date)
+        distinct = {
+            column: int(round(sketches.distinct_count(column, lo, hi)))
+            for column in query.distinct if column in sketches.distinct
+        }
+        quantiles = {}
+        for metric, qs in query.quantiles.items():
+            values = sketches.quantiles(metric, qs, lo, hi)
+            quantiles[metric] = {str(q): value for q, value in zip(qs, values)}
+    return ApproxStatsResponse(
+        rows=sketches.rows(lo, hi),
+        days=hi - lo,
+        distinct=distinct,
+        quantiles=quantiles,
+        error={
+            "distinct_relative_standard_error": round(hll_standard_error(), 4),
+            "quantile_rank_error": round(kll_rank_error(), 4)
+        }
+    )
@@ -0,0 +1,119 @@
+import sys
+from contextlib import asynccontextmanager
+from models.models import BatchQuery, BatchResponse, BatchResult
+from .loader import dataset_exists, get_dataset_index, get_metrics_store
+from .filters import forbidden_range_columns
+from .permissions import is_dataset_allowed
+from .planner import cached_row_ids, evaluate_shared_predicates, has_filters
+from .processor import estimate_query_cost, get_filter_set, get_filtered_metrics
+from .aggregates import get_aggregated_metrics
+from utils.profiler import run_in_threadpool
+from utils import config
+from utils.admission import admission_controller
+from utils.logger import api_logger
+from utils.timing import span
+from typing import List
+
+# Same page size cap as POST /api/metrics
+MAX_PAGE_SIZE = 100
+
+
+def _run_query(query: BatchQuery, user: dict, shared: dict) -> BatchResult:
+    """Execute one batch query; failures are reported in the result, not raised."""
+    filters = query.filters
+    try:
+        if query.type == 'aggregate':
+            data = get_aggregated_metrics(filters, user, query.group_by, shared=shared)
+        else:
+            page = filters.page or 1
+            page_size = min(filters.page_size or 20, MAX_PAGE_SIZE)
+            data = get_filtered_metrics(filters, user, page, page_size, shared=shared)
+        return BatchResult(id=query.id, type=query.type, data=data.model_dump(exclude_none=True))
+    except Exception as e:
+        api_logger.log_system_event("BATCH_QUERY_FAILED", f"{query.id or query.type}: {e}", level="ERROR")
+        return BatchResult(id=query.id, type=query.type, status=500, error=f"Error retrieving metrics: {str(e)}")
+
+
+def run_batch(queries: List[BatchQuery], user: dict) -> BatchResponse:
+    """Run several metrics/aggregate queries, evaluating common sub-filters once."""
+    results = [None] * len(queries)
+    runnable = []
+    for position, query in enumerate(queries):
+        forbidden = forbidden_range_columns(query.filters.ranges, user)
+        if forbidden:
+            results[position] = BatchResult(
+                id=query.id, type=query.type, status=403,
+                error=f"Filtering by '{forbidden[0]}' requires admin privileges"
+            )
+        elif not is_dataset_allowed(query.filters.dataset, user):
+            results[position] = BatchResult(
+                id=query.id, type=query.type, status=403,
+                error=f"No access to dataset '{query.filters.dataset}'"
+            )
+        else:
+            runnable.append(position)
+
+    # Predicates used by several queries (e.g. the dashboard date range) run once
+    # per dataset; row ids of one dataset are meaningless in another
+    by_dataset = {}
+    for position in runnable:
+        dataset = queries[position].filters.dataset
+        if dataset_exists(dataset):
+            by_dataset.setdefault(dataset, []).append(position)
+        else:
+            results[position] = BatchResult(
+                id=queries[position].id, type=queries[position].type, status=404,
+                error=f"Unknown dataset '{dataset}'"
+            )
+
+    for dataset, positions in by_dataset.items():
+        if get_metrics_store(dataset) is not None:
+            # SQL backend: each query's filters are pushed down to the database
+            for position in positions:
+                results[position] = _run_query(queries[position], user, None)
+            continue
+        index = get_dataset_index(dataset)
+        # Filter sets with a cached result are served from the query cache instead
+        filter_sets = [get_filter_set(queries[position].filters, user) for position in positions]
+        pending = [
+            filter_set for filter_set in filter_sets
+            if has_filters(*filter_set) and cached_row_ids(index, *filter_set) is None
+        ]
+        with span("filter"):
+            shared = evaluate_shared_predicates(index, pending)
+        for position in positions:
+            results[position] = _run_query(queries[position], user, shared)
+    return BatchResponse(results=results)
+
+
+def estimate_batch_cost(queries: List[BatchQuery], user: dict) -> float:
+    """Admission cost of a batch: the sum of its queries' costs.
+
+    Aggregates read every matching row, so they are charged as a page that
+    covers all of them; queries that will be rejected cost nothing.
+    """
+    cost = 0.0
+    for query in queries:
+        filters = query.filters
+        if (forbidden_range_columns(filters.ranges, user) or not is_dataset_allowed(filters.dataset, user)
+                or not dataset_exists(filters.dataset)):
+            continue
+        if query.type == 'aggregate':
+            cost += estimate_query_cost(filters, user, 1, sys.maxsize)
+        else:
+            cost += estimate_query_cost(filters, user, filters.page or 1, min(filters.page_size or 20, MAX_PAGE_SIZE))
+    return cost
+
+
+@asynccontextmanager
+async def admit_batch(queries: List[BatchQuery], user: dict):
+    """Hold admission budget for a whole batch while it runs (see processor.admit_query).
+
+    Raises AdmissionRejected when the batch cannot be admitted in time.
+    """
+    if not config.ADMISSION_ENABLED:
+        yield
+        return
+    cost = await run_in_threadpool(estimate_batch_cost, queries, user)
+    async with admission_controller.admit(user.get('email') or user.get('role'), cost):
+        yield
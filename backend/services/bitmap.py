@@ -0,0 +1,196 @@
+from typing import List
+
+import numpy as np
+
+# Roaring layout: row ids are split into 2**16-row chunks; each chunk is stored
+# as a sorted uint16 array while sparse, or as a 65536-bit bitmap once it holds
+# more than ARRAY_MAX_SIZE rows (8KB either way at that size).
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+ARRAY_MAX_SIZE = 4096
+_LOW_MASK = CHUNK_SIZE - 1
+_WORD = np.dtype('<u8')
+# Set bits of each byte value, for NumPy < 2.0 (no np.bitwise_count)
+_BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1, dtype=np.uint8)
+
+
+def _is_words(container: np.ndarray) -> bool:
+    return container.dtype == _WORD
+
+
+def _to_words(container: np.ndarray) -> np.ndarray:
+    if _is_words(container):
+        return container
+    bits = np.zeros(CHUNK_SIZE, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits, bitorder='little').view(_WORD)
+
+
+def _to_values(container: np.ndarray) -> np.ndarray:
+    if not _is_words(container):
+        return container
+    bits = np.unpackbits(container.view(np.uint8), bitorder='little').view(bool)
+    return np.flatnonzero(bits).astype(np.uint16)
+
+
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(_BYTE_POPCOUNT[np.ascontiguousarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+
+def _cardinality(container: np.ndarray) -> int:
+    if _is_words(container):
+        return _popcount(container)
+    return len(container)
+
+
+def _compact(container: np.ndarray):
+    """Container in its smallest form (None when empty)."""
+    size = _cardinality(container)
+    if size == 0:
+        return None
+    if _is_words(container) and size <= ARRAY_MAX_SIZE:
+        return _to_values(container)
+    if not _is_words(container) and size > ARRAY_MAX_SIZE:
+        return _to_words(container)
+    return container
+
+
+def _member(container: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Whether each low (uint16) value is in the container."""
+    if _is_words(container):
+        low = low.astype(np.uint64)
+        return ((container[low >> np.uint64(6)] >> (low & np.uint64(63))) & np.uint64(1)).astype(bool)
+    if len(container) == 0:
+        return np.zeros(len(low), dtype=bool)
+    positions = np.searchsorted(container, low).clip(max=len(container) - 1)
+    return container[positions] == low
+
+
+class RowBitmap:
+    """Compressed set of row ids (roaring-style containers) with set algebra.
+
+    Used for filter results kept in caches and for precomputed row sets
+    (shared batch predicates, per-account rows) that are intersected with
+    query results.
+    """
+
+    def __init__(self, keys=None, containers: List[np.ndarray] = None):
+        self.keys = np.asarray(keys if keys is not None else [], dtype=np.int64)
+        self.containers = containers or []
+        self._size = sum(_cardinality(container) for container in self.containers)
+
+    @classmethod
+    def from_row_ids(cls, row_ids) -> 'RowBitmap':
+        """Bitmap of ascending, unique row ids."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if len(row_ids) == 0:
+            return cls()
+        high = row_ids >> CHUNK_BITS
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(high)) + 1])
+        ends = np.append(starts[1:], len(row_ids))
+        containers = []
+        for start, end in zip(starts, ends):
+            low = (row_ids[start:end] & _LOW_MASK).astype(np.uint16)
+            containers.append(_to_words(low) if len(low) > ARRAY_MAX_SIZE else low)
+        return cls(high[starts], containers)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> 'RowBitmap':
+        """Bitmap of the True positions of a boolean mask."""
+        return cls.from_row_ids(np.flatnonzero(mask))
+
+    def to_row_ids(self, dtype=np.int64) -> np.ndarray:
+        """Ascending row ids."""
+        if not self.containers:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate([
+            (int(key) << CHUNK_BITS) + _to_values(container).astype(dtype)
+            for key, container in zip(self.keys, self.containers)
+        ]).astype(dtype, copy=False)
+
+    def contains(self, row_ids: np.ndarray) -> np.ndarray:
+        """Membership mask for row ids (in any order)."""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        found = np.zeros(len(row_ids), dtype=bool)
+        if len(row_ids) == 0 or not self.containers:
+            return found
+        high = row_ids >> CHUNK_BITS
+        order = None
+        if len(high) > 1 and np.any(high[1:] < high[:-1]):
+            order = np.argsort(high, kind='stable')
+            high = high[order]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(high)) + 1])
+        ends = np.append(starts[1:], len(high))
+        slots = np.searchsorted(self.keys, high[starts])
+        low = (row_ids if order is None else row_ids[order]) & _LOW_MASK
+        sorted_found = np.zeros(len(high), dtype=bool)
+        for start, end, slot in zip(starts, ends, slots):
+            if slot < len(self.keys) and self.keys[slot] == high[start]:
+                sorted_found[start:end] = _member(self.containers[slot], low[start:end].astype(np.uint16))
+        if order is None:
+            return sorted_found
+        found[order] = sorted_found
+        return found
+
+    def __and__(self, other: 'RowBitmap') -> 'RowBitmap':
+        _, mine, theirs = np.intersect1d(self.keys, other.keys, assume_unique=True, return_indices=True)
+        keys, containers = [], []
+        for i, j in zip(mine, theirs):
+            a, b = self.containers[i], other.containers[j]
+            if _is_words(a) and _is_words(b):
+                container = _compact(a & b)
+            elif _is_words(a) or _is_words(b):
+                values, words = (b, a) if _is_words(a) else (a, b)
+                container = _compact(values[_member(words, values)])
+            else:
+                container = _compact(np.intersect1d(a, b, assume_unique=True))
+            if container is not None:
+                keys.append(self.keys[i])
+                containers.append(container)
+        return RowBitmap(keys, containers)
+
+    def __or__(self, other: 'RowBitmap') -> 'RowBitmap':
+        keys = np.union1d(self.keys, other.keys)
+        containers = []
+        for key in keys:
+            a, b = self._container(key), other._container(key)
+            if a is None or b is None:
+                containers.append(a if b is None else b)
+            elif _is_words(a) or _is_words(b):
+                containers.append(_to_words(a) | _to_words(b))
+            else:
+                containers.append(_compact(np.union1d(a, b)))
+        return RowBitmap(keys, containers)
+
+    def __sub__(self, other: 'RowBitmap') -> 'RowBitmap':
+        """Rows in this set and not in `other` (ANDNOT)."""
+        keys, containers = [], []
+        for key, a in zip(self.keys, self.containers):
+            b = other._container(key)
+            if b is None:
+                container = a
+            elif _is_words(a):
+                container = _compact(a & ~_to_words(b))
+            elif _is_words(b):
+                container = _compact(a[~_member(b, a)])
+            else:
+                container = _compact(np.setdiff1d(a, b, assume_unique=True))
+            if container is not None:
+                keys.append(key)
+                containers.append(container)
+        return RowBitmap(keys, containers)
+
+    def _container(self, key):
+        slot = np.searchsorted(self.keys, key)
+        if slot < len(self.keys) and self.keys[slot] == key:
+            return self.containers[slot]
+        return None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + sum(container.nbytes for container in self.containers)
@@ -0,0 +1,147 @@
+import io
+import json
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.models import MetricsFilters
+from .filters import is_column_allowed
+from .index import DatasetIndex
+from .loader import get_dataset_index, get_metrics_store
+from .processor import page_row_ids, store_page
+from utils.json_response import dumps
+from utils.timing import span
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_MEDIA_TYPE = "application/vnd.metrics.columnar+json"
+JSON_MEDIA_TYPE = "application/json"
+
+# Columns of bulk responses, in order (restricted ones are projected away per role)
+EXPORT_COLUMNS = (
+    'date', 'account_id', 'campaign_id', 'impressions', 'clicks', 'interactions',
+    'conversions', 'cost_micros', 'ctr', 'conversion_rate', 'cpc', 'cpa'
+)
+# Largest page a bulk (columnar/Arrow) request may ask for
+MAX_EXPORT_ROWS = 100_000
+
+
+def available_formats() -> dict:
+    """Media type -> format name of the bulk formats this server can produce."""
+    formats = {COLUMNAR_MEDIA_TYPE: 'columnar'}
+    if pa is not None:
+        formats[ARROW_MEDIA_TYPE] = 'arrow'
+    return formats
+
+
+def negotiate_format(accept: str, default: str = 'json') -> Optional[str]:
+    """'arrow', 'columnar' or 'json' from an Accept header (None if nothing offered is acceptable)."""
+    if not accept:
+        return default
+    formats = {JSON_MEDIA_TYPE: 'json', **available_formats()}
+    best, best_quality = None, 0.0
+    for item in accept.split(","):
+        media_type, _, params = item.strip().partition(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        name = default if media_type in ("*/*", "application/*") else formats.get(media_type)
+        if name and quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def export_columns(index: DatasetIndex, user: dict) -> List[str]:
+    """Columns the user may read, in export order."""
+    return [column for column in EXPORT_COLUMNS if column in index.df.columns and is_column_allowed(column, user)]
+
+
+def _category_values(categories: pd.Index) -> np.ndarray:
+    """Category values, as int64 when they are numeric ids parsed as strings."""
+    if categories.dtype.kind not in 'iuf':
+        numeric = pd.to_numeric(categories, errors='coerce')
+        if len(numeric) and not numeric.isna().any():
+            return numeric.to_numpy().astype(np.int64)
+    return categories.to_numpy()
+
+
+def column_values(index: DatasetIndex, column: str, row_ids: np.ndarray) -> np.ndarray:
+    """Values of a column at row_ids, straight from the loaded arrays (ids decoded, dates as days)."""
+    series = index.df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()[row_ids]
+        values = _category_values(series.cat.categories)[codes]
+        if (codes < 0).any():
+            values = values.astype(object)
+            values[codes < 0] = None
+        return values
+    values = series.to_numpy()[row_ids]
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[D]')
+    return values
+
+
+def _json_values(values: np.ndarray) -> np.ndarray:
+    # Dates as YYYY-MM-DD strings; other arrays are encoded as-is (NaN -> null)
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='D')
+    return values
+
+
+def columnar_body(index: DatasetIndex, row_ids: np.ndarray, columns: List[str], meta: dict) -> bytes:
+    """Compact column-oriented JSON: {"columns": [...], "data": {column: [values]}, ...meta}."""
+    data = {column: _json_values(column_values(index, column, row_ids)) for column in columns}
+    return dumps({**meta, "columns": columns, "data": data})
+
+
+def arrow_body(index: DatasetIndex, row_ids: np.ndarray, columns: List[str], meta: dict) -> bytes:
+    """Arrow IPC stream of the columns (pagination details in the schema metadata)."""
+    table = pa.table(
+        {column: pa.array(column_values(index, column, row_ids)) for column in columns},
+        metadata={key: json.dumps(value) for key, value in meta.items()}
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def export_metrics(filters: MetricsFilters, user: dict, page: int, page_size: int, fmt: str):
+    """(body, media type, pagination meta) of a metrics page in a bulk format."""
+    page_size = min(page_size, MAX_EXPORT_ROWS)
+    start_idx = (page - 1) * page_size
+    store = get_metrics_store(filters.dataset)
+    if store is not None:
+        # SQL backend: only the page is read; ids are encoded like the loaded frame's
+        df_page, total_count = store_page(store, filters, user, start_idx, page_size)
+        for column in ('account_id', 'campaign_id'):
+            if column in df_page.columns:
+                df_page[column] = df_page[column].astype('category')
+        index, row_ids, total_count_approximate = DatasetIndex(df_page), np.arange(len(df_page)), False
+    else:
+        index = get_dataset_index(filters.dataset)
+        row_ids, total_count, total_count_approximate = page_row_ids(
+            index, filters, user, start_idx, start_idx + page_size
+        )
+    meta = {
+        "total_count": total_count,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": ((total_count - 1) // page_size) + 1 if total_count > 0 else 1,
+        "total_count_approximate": total_count_approximate
+    }
+    columns = export_columns(index, user)
+    with span("serialize"):
+        if fmt == 'arrow':
+            return arrow_body(index, row_ids, columns, meta), ARROW_MEDIA_TYPE, meta
+        return columnar_body(index, row_ids, columns, meta), COLUMNAR_MEDIA_TYPE, meta
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 
+from .permissions import RESTRICTED_COLUMNS, forbidden_range_columns, is_column_allowed
 
 def filter_metrics_by_date(df: pd.DataFrame, start_date: str = None, end_date: str = None):
     """Filter metrics by date range."""
@@ -11,13 +13,67 @@ def filter_metrics_by_date(df: pd.DataFrame, start_date: str = None, end_date: s
         df = df[df['date'].dt.normalize() <= end_parsed]
     return df
 
+def campaign_search_mask(series: pd.Series, search_term: str) -> pd.Series:
+    """Case-insensitive id search; categorical columns only scan their distinct values."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        matches = series.cat.categories.astype(str).str.contains(search_term, case=False, regex=False)
+        mask = np.isin(series.cat.codes.to_numpy(), np.flatnonzero(matches))
+        return pd.Series(mask, index=series.index)
+    return series.astype(str).str.contains(search_term, case=False, na=False, regex=False)
+
+# Range operators, applied in-place on reusable chunk buffers
+RANGE_OPERATORS = {
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal
+}
+RANGE_CHUNK_SIZE = 1 << 16
+
+def normalize_ranges(ranges) -> tuple:
+    """Turn RangeFilter models into a hashable, order-independent predicate tuple."""
+    predicates = set()
+    for range_filter in ranges or ():
+        for op in RANGE_OPERATORS:
+            bound = getattr(range_filter, op)
+            if bound is not None:
+                predicates.add((range_filter.column, op, float(bound)))
+    return tuple(sorted(predicates))
+
+def range_mask(df: pd.DataFrame, predicates: tuple, chunk_size: int = RANGE_CHUNK_SIZE) -> np.ndarray:
+    """Evaluate all range predicates as one fused boolean mask.
+
+    Works chunk by chunk with preallocated buffers, so no full-length
+    temporary is created per predicate (NaN never matches).
+    """
+    n = len(df)
+    mask = np.ones(n, dtype=bool)
+    if not predicates or n == 0:
+        return mask
+    columns = [(df[column].to_numpy(), RANGE_OPERATORS[op], bound) for column, op, bound in predicates]
+    scratch = np.empty(min(chunk_size, n), dtype=bool)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk_mask = mask[start:stop]
+        chunk_scratch = scratch[:stop - start]
+        for values, operator, bound in columns:
+            operator(values[start:stop], bound, out=chunk_scratch)
+            np.logical_and(chunk_mask, chunk_scratch, out=chunk_mask)
+    return mask
+
+def filter_metrics_by_ranges(df: pd.DataFrame, predicates: tuple = None):
+    """Filter metrics by numeric range predicates (see normalize_ranges)."""
+    if predicates:
+        df = df[range_mask(df, predicates)]
+    return df
+
 def search_metrics(df: pd.DataFrame, search_term: str = None):
     """Search metrics by campaign name or ID."""
     if search_term:
         if 'campaign_name' in df.columns:
-            df = df[df['campaign_name'].str.contains(search_term, case=False, na=False)]
+            df = df[df['campaign_name'].str.contains(search_term, case=False, na=False, regex=False)]
         elif 'campaign_id' in df.columns:
-            df = df[df['campaign_id'].astype(str).str.contains(search_term, case=False, na=False)]
+            df = df[campaign_search_mask(df['campaign_id'], search_term)]
     return df
 
 def sort_metrics(df: pd.DataFrame, sort_by: str = None, sort_order: str = "asc"):
@@ -31,6 +87,8 @@ def sort_metrics(df: pd.DataFrame, sort_by: str = None, sort_order: str = "asc")
 
 def apply_user_permissions(df: pd.DataFrame, user: dict):
     """Apply user role-based permissions to data."""
-    if user.get('role') != 'admin' and 'cost_micros' in df.columns:
-        df = df.drop('cost_micros', axis=1)
+    if user.get('role') != 'admin':
+        restricted = [column for column in RESTRICTED_COLUMNS if column in df.columns]
+        if restricted:
+            df = df.drop(restricted, axis=1)
     return df
\ No newline at end of file
@@ -0,0 +1,211 @@
+import threading
+import numpy as np
+import pandas as pd
+from functools import cached_property, reduce
+from .bitmap import RowBitmap
+
+# Number of quantiles kept per numeric column for selectivity estimates
+QUANTILE_STEPS = 256
+# Rows sampled to build the quantiles of large columns
+QUANTILE_SAMPLE_SIZE = 200_000
+
+
+def row_id_dtype(n: int):
+    """Smallest integer type able to address n rows (halves cached row-id memory)."""
+    return np.int32 if n < 2**31 else np.int64
+
+
+class DatasetIndex:
+    """Secondary indexes and statistics over the loaded metrics frame.
+
+    Structures are built lazily on first use and are read-only afterwards,
+    so one index can be shared by concurrent requests.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 0):
+        self.df = df
+        self.version = version
+        self.n = len(df)
+        self.id_dtype = row_id_dtype(self.n)
+        self._quantiles = {}
+        self._account_rows = {}
+        self._account_lock = threading.Lock()
+        # Structures other modules build over this index (e.g. day sketches),
+        # released together with it when the dataset is reloaded or evicted
+        self.derived = {}
+        # Called after large structures are added, so the owner can re-check its memory budget
+        self.on_grow = None
+
+    def build(self, columns=()):
+        """Build every lazy structure now (and quantiles of `columns`), e.g. at startup."""
+        self.date_order
+        self.sorted_dates
+        self._campaign_postings
+        self.account_bitmaps
+        for column in columns:
+            if column in self.df.columns:
+                self.column_quantiles(column)
+        self.grown()
+        return self
+
+    def grown(self):
+        """Tell the owner that structures were added (see on_grow)."""
+        if self.on_grow is not None:
+            self.on_grow()
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the structures built so far, derived ones included.
+
+        Arrays that are views of the frame's columns are not counted.
+        """
+        built = self.__dict__
+        arrays = [built[name] for name in ('dates', 'date_order', 'sorted_dates') if name in built]
+        for name in ('_campaign_encoding', '_account_encoding'):
+            if name in built:
+                arrays.append(built[name][0])
+        if '_campaign_postings' in built:
+            arrays.extend(built['_campaign_postings'])
+        arrays.extend(quantiles for quantiles, _ in list(self._quantiles.values()))
+        total = sum(array.nbytes for array in arrays if array.flags.owndata)
+        bitmaps = list(built.get('account_bitmaps', {}).values())
+        with self._account_lock:
+            bitmaps.extend(self._account_rows.values())
+        total += sum(bitmap.nbytes for bitmap in bitmaps)
+        return total + sum(getattr(value, 'nbytes', 0) for value in list(self.derived.values()))
+
+    # Date index: a permutation of row ids ordered by date
+
+    @cached_property
+    def dates(self) -> np.ndarray:
+        return self.df['date'].to_numpy()
+
+    @cached_property
+    def date_order(self) -> np.ndarray:
+        return np.argsort(self.dates, kind='stable').astype(self.id_dtype)
+
+    @cached_property
+    def sorted_dates(self) -> np.ndarray:
+        return self.dates[self.date_order]
+
+    def date_bounds(self, start=None, end=None):
+        """Positions [lo, hi) in date_order covering start <= date <= end."""
+        lo = 0 if start is None else int(np.searchsorted(self.sorted_dates, start, side='left'))
+        hi = self.n if end is None else int(np.searchsorted(self.sorted_dates, end, side='right'))
+        return lo, max(lo, hi)
+
+    # Campaign index: posting lists of row ids per distinct campaign
+
+    @cached_property
+    def _campaign_encoding(self):
+        column = self.df['campaign_id']
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.cat.codes.to_numpy(), column.cat.categories
+        codes, uniques = pd.factorize(column, sort=True)
+        return codes, pd.Index(uniques)
+
+    @property
+    def campaign_codes(self) -> np.ndarray:
+        return self._campaign_encoding[0]
+
+    @property
+    def campaign_values(self) -> pd.Index:
+        return self._campaign_encoding[1]
+
+    @cached_property
+    def _campaign_postings(self):
+        codes = self.campaign_codes
+        order = np.argsort(codes, kind='stable').astype(self.id_dtype)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.campaign_values))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # Rows with missing ids (code -1) sort first; skip them
+        return order[int((codes < 0).sum()):], offsets
+
+    def campaign_posting_sizes(self, codes: np.ndarray) -> int:
+        """Total rows of the given campaign codes (exact, O(len(codes)))."""
+        _, offsets = self._campaign_postings
+        return int((offsets[codes + 1] - offsets[codes]).sum())
+
+    def campaign_rows(self, codes: np.ndarray) -> np.ndarray:
+        """Row ids (ascending) of the given campaign codes."""
+        if len(codes) == 0:
+            return np.empty(0, dtype=self.id_dtype)
+        if self.campaign_posting_sizes(codes) * 8 > self.n:
+            # Broad match: one pass over the codes beats merging many postings
+            return np.flatnonzero(self.campaign_code_mask(codes)[self.campaign_codes]).astype(self.id_dtype)
+        order, offsets = self._campaign_postings
+        parts = [order[offsets[code]:offsets[code + 1]] for code in codes]
+        return np.sort(np.concatenate(parts))
+
+    def campaign_code_mask(self, codes: np.ndarray) -> np.ndarray:
+        """Lookup table code -> selected, with a trailing False slot for missing ids (-1)."""
+        lookup = np.zeros(len(self.campaign_values) + 1, dtype=bool)
+        lookup[codes] = True
+        return lookup
+
+    def search_campaign_codes(self, search_term: str) -> np.ndarray:
+        """Codes of campaigns whose id contains the term (case-insensitive)."""
+        matches = self.campaign_values.astype(str).str.contains(search_term, case=False, regex=False)
+        return np.flatnonzero(matches)
+
+    # Account index: a row bitmap per account, for row-level access control
+
+    @cached_property
+    def _account_encoding(self):
+        column = self.df['account_id']
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.cat.codes.to_numpy(), column.cat.categories
+        codes, uniques = pd.factorize(column, sort=True)
+        return codes, pd.Index(uniques)
+
+    @cached_property
+    def account_bitmaps(self) -> dict:
+        """Account id (as str) -> RowBitmap of its rows."""
+        codes, values = self._account_encoding
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        bounds = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+        return {
+            str(value): RowBitmap.from_row_ids(order[bounds[code]:bounds[code + 1]])
+            for code, value in enumerate(values)
+        }
+
+    def account_rows(self, accounts) -> RowBitmap:
+        """Rows of any of the given account ids (union computed once per account set)."""
+        key = tuple(sorted(str(account) for account in accounts))
+        with self._account_lock:
+            rows = self._account_rows.get(key)
+        if rows is None:
+            bitmaps = [self.account_bitmaps[account] for account in key if account in self.account_bitmaps]
+            rows = reduce(RowBitmap.__or__, bitmaps, RowBitmap())
+            with self._account_lock:
+                self._account_rows[key] = rows
+        return rows
+
+    # Column statistics for range selectivity
+
+    def column_quantiles(self, column: str):
+        """(quantiles, null fraction) of a numeric column, computed once."""
+        cached = self._quantiles.get(column)
+        if cached is None:
+            values = self.df[column].to_numpy(dtype='float64', na_value=np.nan)
+            if len(values) > QUANTILE_SAMPLE_SIZE:
+                step = len(values) // QUANTILE_SAMPLE_SIZE
+                values = values[::step]
+            nulls = np.isnan(values)
+            valid = values[~nulls]
+            quantiles = (np.quantile(valid, np.linspace(0, 1, QUANTILE_STEPS + 1))
+                         if len(valid) else np.empty(0))
+            cached = (quantiles, float(nulls.mean()) if len(values) else 0.0)
+            self._quantiles[column] = cached
+        return cached
+
+    def estimate_fraction_below(self, column: str, value: float, inclusive: bool) -> float:
+        """Estimated fraction of non-null rows with column < value (<= if inclusive)."""
+        quantiles, null_fraction = self.column_quantiles(column)
+        if len(quantiles) == 0:
+            return 0.0
+        side = 'right' if inclusive else 'left'
+        position = np.searchsorted(quantiles, value, side=side)
+        return (1.0 - null_fraction) * min(1.0, position / len(quantiles))
@@ -1,82 +1,276 @@
 import pandas as pd
-import random
-from datetime import datetime, timedelta
+import threading
+import time
 from functools import lru_cache
+from typing import Optional
 import os
+from utils.logger import api_logger
+from utils import config
+from utils.timing import span
+from utils.compression import payload_cache
+from .index import DatasetIndex
+from .planner import clear_result_cache, filter_row_ids
+from .registry import DATASET_NAME_PATTERN, DEFAULT_DATASET, DatasetRegistry, UnknownDataset
+from .storage import MetricsStore, storage_engine
 
-# Global cache for the CSV data (load once, use many times)
-_METRICS_CACHE = None
-_CACHE_TIMESTAMP = None
+# Parse-time schema: dictionary-encoded ids, explicit numeric types.
+# Integers are parsed as int64 (read_csv silently wraps out-of-range values for
+# narrower types) and then narrowed after a range check (see _narrow_unsigned).
+METRICS_SCHEMA = {
+    'account_id': 'category',
+    'campaign_id': 'category',
+    'impressions': 'int64',
+    'clicks': 'int64',
+    'interactions': 'int64',
+    'cost_micros': 'int64',
+    'conversions': 'float64'
+}
+UNSIGNED_COLUMNS = ('impressions', 'clicks', 'interactions', 'cost_micros')
+# float32 is used only if every value survives the round trip within this tolerance
+FLOAT32_TOLERANCE = 0.005
+
+# Loaded frames live in dataset_registry (below); embedded SQL stores per dataset
+# (STORAGE_BACKEND=sqlite/duckdb) are opened lazily and hold no rows in memory
+_METRICS_STORES = {}
+_STORE_LOCK = threading.Lock()
 
 def clear_cache():
     """Clear the global cache to force reload."""
-    global _METRICS_CACHE, _CACHE_TIMESTAMP
-    _METRICS_CACHE = None
-    _CACHE_TIMESTAMP = None
+    dataset_registry.clear()
+    with _STORE_LOCK:
+        _METRICS_STORES.clear()
+    clear_result_cache()
+    payload_cache.clear()
 
 def _get_csv_path():
     """Helper to get CSV path."""
+    if config.METRICS_CSV_PATH:
+        return config.METRICS_CSV_PATH
     current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(current_dir, 'data', 'metrics.csv')
 
-def _load_csv_with_cache():
-    """Load CSV with intelligent caching - O(1) after first load."""
-    global _METRICS_CACHE, _CACHE_TIMESTAMP
-    
-    csv_path = _get_csv_path()
-    
+def _get_datasets_dir():
+    """Directory of named datasets, one <name>.csv per dataset."""
+    if config.DATASETS_DIR:
+        return config.DATASETS_DIR
+    current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(current_dir, 'data', 'datasets')
+
+def _dataset_path(name: str):
+    """CSV of a dataset (None if there is no such source)."""
+    if name == DEFAULT_DATASET:
+        return _get_csv_path()
+    if not DATASET_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(_get_datasets_dir(), name + '.csv')
+    return path if os.path.isfile(path) else None
+
+def _discover_datasets() -> list:
+    """Names of every available dataset, the default one first."""
     try:
-        # Check if file was modified (cache invalidation)
-        file_mtime = os.path.getmtime(csv_path)
-        
-        if _METRICS_CACHE is None or _CACHE_TIMESTAMP != file_mtime:
-            # Load CSV without forcing incompatible data types
-            df = pd.read_csv(csv_path)
-            df['date'] = pd.to_datetime(df['date']).dt.normalize()
-            
-            # Optimize data types after loading (safer approach)
+        files = sorted(os.listdir(_get_datasets_dir()))
+    except OSError:
+        files = []
+    names = [f[:-4] for f in files if f.endswith('.csv') and DATASET_NAME_PATTERN.match(f[:-4])]
+    return [DEFAULT_DATASET] + [name for name in names if name != DEFAULT_DATASET]
+
+def _narrow_unsigned(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast non-negative integer columns to the narrowest unsigned width that fits."""
+    for column in UNSIGNED_COLUMNS:
+        if column in df.columns and df[column].notna().all() and (df[column] >= 0).all():
+            df[column] = pd.to_numeric(df[column], downcast='unsigned')
+    return df
+
+def _to_float32_if_exact(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Convert a float column to float32 when precision allows."""
+    if column in df.columns and df[column].dtype == 'float64':
+        as_float32 = df[column].astype('float32')
+        error = (as_float32.astype('float64') - df[column]).abs().max()
+        if pd.isna(error) or error <= FLOAT32_TOLERANCE:
+            df[column] = as_float32
+    return df
+
+def apply_metrics_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the compact schema to an already materialized frame."""
+    for column, dtype in METRICS_SCHEMA.items():
+        if column in df.columns and str(df[column].dtype) != dtype:
             try:
-                # Convert to more efficient types where possible
-                if 'impressions' in df.columns:
-                    df['impressions'] = pd.to_numeric(df['impressions'], downcast='integer')
-                if 'clicks' in df.columns:
-                    df['clicks'] = pd.to_numeric(df['clicks'], downcast='integer')
-                if 'conversions' in df.columns:
-                    df['conversions'] = pd.to_numeric(df['conversions'], downcast='float')
-            except Exception:
-                # Keep original types if conversion fails
-                pass
-            
-            # Cache the data
-            _METRICS_CACHE = df
-            _CACHE_TIMESTAMP = file_mtime
-        
-        return _METRICS_CACHE.copy()  # Return copy to avoid mutations
-        
-    except Exception:
-        # Fallback to sample data
-        if _METRICS_CACHE is None:
-            from .sample import create_sample_data
-            _METRICS_CACHE = create_sample_data(100)
-        return _METRICS_CACHE.copy()
-
-@lru_cache(maxsize=32)  # Cache filtered results
-def load_metrics_data_filtered(start_date=None, end_date=None, search_term=None):
-    """Load metrics with basic filters applied - cached for performance."""
-    df = _load_csv_with_cache()
-    
-    # Apply filters efficiently
-    if start_date:
-        df = df[df['date'] >= pd.to_datetime(start_date)]
-    if end_date:
-        df = df[df['date'] <= pd.to_datetime(end_date)]
-    if search_term:
-        # Efficient string search
-        mask = df['campaign_id'].astype(str).str.contains(search_term, case=False, na=False)
-        df = df[mask]
-    
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError, OverflowError):
+                pass  # keep the original type for unexpected values
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    return _narrow_unsigned(df)
+
+def read_metrics_csv(csv_path: str) -> pd.DataFrame:
+    """Parse metrics.csv directly into the compact schema."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtype = {column: dtype for column, dtype in METRICS_SCHEMA.items() if column in header}
+    try:
+        df = pd.read_csv(csv_path, dtype=dtype, parse_dates=['date'], date_format='%Y-%m-%d')
+    except (TypeError, ValueError, OverflowError):
+        # Unexpected values (negative counts, blanks...): permissive parse, then convert
+        df = apply_metrics_schema(pd.read_csv(csv_path))
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    return _narrow_unsigned(df)
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Materialize KPI columns once so requests can sort/filter on them for free.
+
+    conversion_rate and ctr are percentages (0 when there is no denominator,
+    like the original per-page computation); cpc and cpa are in micros and
+    NaN when undefined (no clicks / no conversions). They are kept in float64
+    (float32 rounding shows up in responses and breaks ties differently when
+    sorting), and computed before conversions is narrowed (see compact_floats).
+    """
+    if not {'clicks', 'conversions'} <= set(df.columns):
+        return df
+    clicks = df['clicks'].astype('float64')
+    conversions = df['conversions'].astype('float64')
+    df['conversion_rate'] = (conversions / clicks.replace(0, 1) * 100).fillna(0)
+    if 'impressions' in df.columns:
+        impressions = df['impressions'].astype('float64')
+        df['ctr'] = (clicks / impressions.replace(0, 1) * 100).fillna(0)
+    if 'cost_micros' in df.columns:
+        cost = df['cost_micros'].astype('float64')
+        df['cpc'] = cost / clicks.where(clicks > 0)
+        df['cpa'] = cost / conversions.where(conversions > 0)
     return df
 
+def compact_floats(df: pd.DataFrame) -> pd.DataFrame:
+    """Narrow conversions to float32 when precision allows (after add_derived_columns)."""
+    return _to_float32_if_exact(df, 'conversions')
+
+def dataset_memory_bytes(df: pd.DataFrame) -> int:
+    """Deep in-memory size of a dataset's frame (its index is measured by DatasetIndex.nbytes)."""
+    return int(df.memory_usage(deep=True).sum())
+
+def _load_frame(csv_path: str) -> pd.DataFrame:
+    """Parse a metrics CSV into the compact schema with derived KPIs."""
+    return compact_floats(add_derived_columns(read_metrics_csv(csv_path)))
+
+def _fallback_frame(name: str):
+    """Sample data when metrics.csv cannot be read (named datasets have no fallback)."""
+    if name != DEFAULT_DATASET:
+        return None
+    from .sample import create_sample_data
+    return compact_floats(add_derived_columns(apply_metrics_schema(create_sample_data(100))))
+
+# Every dataset is loaded on first use with its own index; cold ones are
+# evicted (least recently used first) beyond DATASET_MEMORY_BUDGET_MB
+dataset_registry = DatasetRegistry(
+    _dataset_path, _discover_datasets, _load_frame, dataset_memory_bytes, fallback=_fallback_frame
+)
+
+def dataset_exists(dataset: Optional[str] = None) -> bool:
+    """Whether a dataset selector names an available dataset (None is the default one)."""
+    return dataset_registry.exists(dataset or DEFAULT_DATASET)
+
+@span("load")
+def get_dataset(dataset: Optional[str] = None) -> pd.DataFrame:
+    """Shared, cached dataset (no copy - callers must not mutate it).
+
+    Raises UnknownDataset for a name with no source.
+    """
+    return dataset_registry.get(dataset or DEFAULT_DATASET).df
+
+def get_dataset_index(dataset: Optional[str] = None) -> DatasetIndex:
+    """Index over a dataset, rebuilt lazily after each reload."""
+    with span("load"):
+        return dataset_registry.get(dataset or DEFAULT_DATASET).index
+
+def get_resident_index(dataset: Optional[str] = None) -> Optional[DatasetIndex]:
+    """Index of a dataset that is loaded and current, or None (never loads)."""
+    entry = dataset_registry.resident(dataset or DEFAULT_DATASET)
+    return entry.index if entry is not None else None
+
+def _get_store_path(name: str, csv_path: str, engine: str) -> str:
+    """Database file of a SQL store (next to the CSV; STORAGE_DB_PATH overrides the default one)."""
+    if config.STORAGE_DB_PATH and name == DEFAULT_DATASET:
+        return config.STORAGE_DB_PATH
+    return os.path.splitext(csv_path)[0] + ('.duckdb' if engine == 'duckdb' else '.sqlite')
+
+def get_metrics_store(dataset: Optional[str] = None):
+    """SQL store of a dataset, or None with the in-memory backend.
+
+    The CSV is imported on first use and again whenever it changes. Without
+    a CSV or an imported database, None is returned and the in-memory path
+    serves its sample data.
+    """
+    engine = storage_engine()
+    if engine is None:
+        return None
+    name = dataset or DEFAULT_DATASET
+    csv_path = _dataset_path(name)
+    if csv_path is None:
+        raise UnknownDataset(name)
+    store = _METRICS_STORES.get(name)
+    if store is not None and store.engine == engine and store.is_current(csv_path):
+        api_logger.record_cache_access("dataset", hit=True)
+        return store
+    with _STORE_LOCK:
+        store = _METRICS_STORES.get(name)
+        if store is not None and store.engine == engine and store.is_current(csv_path):
+            return store
+        db_path = _get_store_path(name, csv_path, engine)
+        if not os.path.exists(csv_path) and not os.path.exists(db_path):
+            return None
+        api_logger.record_cache_access("dataset", hit=False)
+        load_start = time.perf_counter()
+        with span("load"):
+            store = MetricsStore.open(csv_path, db_path, engine)
+        # New version for query keys and cached responses of this dataset
+        dataset_registry.version_for(name, ('store', db_path, store.meta['source_mtime']))
+        _METRICS_STORES[name] = store
+        api_logger.record_dataset_load(time.perf_counter() - load_start, store.rows, dataset=name)
+    return store
+
+def get_resident_store(dataset: Optional[str] = None):
+    """SQL store of a dataset if it is open and current, or None (never imports)."""
+    engine = storage_engine()
+    name = dataset or DEFAULT_DATASET
+    store = _METRICS_STORES.get(name)
+    csv_path = _dataset_path(name)
+    if engine is None or store is None or csv_path is None:
+        return None
+    return store if store.engine == engine and store.is_current(csv_path) else None
+
+def get_dataset_version(dataset: Optional[str] = None) -> int:
+    """Version of a dataset (new on every reload, unique across datasets, 0 before the first load)."""
+    return dataset_registry.version(dataset or DEFAULT_DATASET)
+
+def get_dataset_info() -> dict:
+    """Version, size and source of the loaded default dataset, plus all resident datasets (without loading)."""
+    entry = dataset_registry.peek(DEFAULT_DATASET)
+    store = _METRICS_STORES.get(DEFAULT_DATASET)
+    info = {
+        "loaded": entry is not None or store is not None,
+        "version": get_dataset_version(),
+        "rows": len(entry.df) if entry is not None else (store.rows if store is not None else 0),
+        "memory_bytes": entry.memory_bytes if entry is not None else 0,
+        "source": os.path.basename(_get_csv_path()),
+        "storage": storage_engine() or "memory",
+        "datasets": dataset_registry.snapshot()
+    }
+    if store is not None:
+        info["store"] = {"rows": store.rows, "file_bytes": store.nbytes, "path": os.path.basename(store.path)}
+    return info
+
+def _load_csv_with_cache():
+    """Load CSV with intelligent caching - O(1) after first load."""
+    return get_dataset().copy()  # Return copy to avoid mutations
+
+def load_metrics_data_filtered(start_date=None, end_date=None, search_term=None, ranges=None):
+    """Load metrics with basic filters applied.
+    
+    Filtering goes through the query planner (cached row ids per filter set);
+    `ranges` is a predicate tuple from filters.normalize_ranges.
+    """
+    index = get_dataset_index()
+    with span("filter"):
+        row_ids = filter_row_ids(index, start_date, end_date, search_term, ranges)
+    return index.df.copy() if row_ids is None else index.df.iloc[row_ids]
+
 def load_metrics_data():
     """Standard loader - uses cache for O(1) performance after first load."""
     return _load_csv_with_cache()
@@ -87,8 +281,9 @@ def get_total_rows_count():
     """Get accurate total row count."""
     try:
         # If we have cached data, use its length for accuracy
-        if _METRICS_CACHE is not None:
-            return len(_METRICS_CACHE)
+        entry = dataset_registry.peek(DEFAULT_DATASET)
+        if entry is not None:
+            return len(entry.df)
         
         # Otherwise count lines in file
         csv_path = _get_csv_path()
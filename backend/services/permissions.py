@@ -0,0 +1,26 @@
+# Kept free of pandas/numpy so routes can check access without loading the data stack
+from typing import Optional
+
+from models.models import DEFAULT_DATASET
+
+# Columns only admins may see, sort or filter on (cost and cost-derived KPIs)
+RESTRICTED_COLUMNS = ('cost_micros', 'cpc', 'cpa')
+
+
+def is_column_allowed(column: str, user: dict) -> bool:
+    """Whether a user may read (and therefore sort or filter by) a column."""
+    return user.get('role') == 'admin' or column not in RESTRICTED_COLUMNS
+
+def is_dataset_allowed(dataset: Optional[str], user: dict) -> bool:
+    """Whether a user may query a dataset: the default one, or named ones granted to them.
+
+    Named datasets are denied by default, so tenants stay apart even for users
+    without account grants; admins may query every dataset.
+    """
+    if user.get('role') == 'admin' or (dataset or DEFAULT_DATASET) == DEFAULT_DATASET:
+        return True
+    return dataset in (user.get('datasets') or ())
+
+def forbidden_range_columns(ranges, user: dict) -> list:
+    """Columns of range filters the user is not allowed to filter by."""
+    return [r.column for r in ranges or () if not is_column_allowed(r.column, user)]
@@ -0,0 +1,409 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.logger import api_logger
+from .bitmap import RowBitmap
+from .filters import RANGE_OPERATORS, range_mask
+from .index import DatasetIndex
+
+# Cached filter results (compressed row bitmaps) per dataset version and predicate set
+RESULT_CACHE_SIZE = 32
+# Use a partial sort when the requested window is this small a fraction of the rows
+PARTIAL_SORT_RATIO = 8
+# Rows examined per step by early-terminating scans
+SCAN_CHUNK_SIZE = 1 << 14
+
+
+class Predicate:
+    """One filter condition that can start a plan or refine candidate row ids."""
+
+    name = "predicate"
+
+    @property
+    def key(self) -> tuple:
+        """Hashable identity, equal for predicates selecting the same rows."""
+        raise NotImplementedError
+
+    def estimate(self, index: DatasetIndex) -> float:
+        """Estimated fraction of rows that match (0-1)."""
+        raise NotImplementedError
+
+    def row_ids(self, index: DatasetIndex) -> np.ndarray:
+        """All matching row ids, ascending."""
+        raise NotImplementedError
+
+    def refine(self, index: DatasetIndex, row_ids: np.ndarray) -> np.ndarray:
+        """Subset of candidate row ids that match (order preserved)."""
+        raise NotImplementedError
+
+
+class DateRangePredicate(Predicate):
+    name = "date"
+
+    def __init__(self, start_date=None, end_date=None):
+        self.start = pd.to_datetime(start_date).normalize().to_datetime64() if start_date else None
+        self.end = pd.to_datetime(end_date).normalize().to_datetime64() if end_date else None
+
+    @property
+    def key(self):
+        return (self.name, self.start, self.end)
+
+    def estimate(self, index):
+        lo, hi = index.date_bounds(self.start, self.end)
+        return (hi - lo) / max(index.n, 1)
+
+    def row_ids(self, index):
+        lo, hi = index.date_bounds(self.start, self.end)
+        if lo == 0 and hi == index.n:
+            return np.arange(index.n, dtype=index.id_dtype)
+        return np.sort(index.date_order[lo:hi])
+
+    def refine(self, index, row_ids):
+        dates = index.dates[row_ids]
+        keep = np.ones(len(row_ids), dtype=bool)
+        if self.start is not None:
+            keep &= dates >= self.start
+        if self.end is not None:
+            keep &= dates <= self.end
+        return row_ids[keep]
+
+
+class CampaignSearchPredicate(Predicate):
+    name = "search"
+
+    def __init__(self, search_term: str):
+        self.search_term = search_term
+        self._codes = None
+
+    @property
+    def key(self):
+        return (self.name, self.search_term)
+
+    def codes(self, index):
+        if self._codes is None:
+            self._codes = index.search_campaign_codes(self.search_term)
+        return self._codes
+
+    def estimate(self, index):
+        return index.campaign_posting_sizes(self.codes(index)) / max(index.n, 1)
+
+    def row_ids(self, index):
+        return index.campaign_rows(self.codes(index))
+
+    def refine(self, index, row_ids):
+        lookup = index.campaign_code_mask(self.codes(index))
+        return row_ids[lookup[index.campaign_codes[row_ids]]]
+
+
+class ColumnRangePredicate(Predicate):
+    """All range bounds on a single column (e.g. 1000 < impressions <= 5000)."""
+
+    def __init__(self, column: str, bounds: List[tuple]):
+        self.column = column
+        self.bounds = bounds  # [(op, value), ...]
+        self.name = f"range:{column}"
+
+    @property
+    def key(self):
+        return (self.name, tuple(sorted(self.bounds)))
+
+    def estimate(self, index):
+        low, high = 0.0, index.estimate_fraction_below(self.column, np.inf, True)
+        for op, value in self.bounds:
+            if op in ('gt', 'gte'):
+                low = max(low, index.estimate_fraction_below(self.column, value, op == 'gt'))
+            else:
+                high = min(high, index.estimate_fraction_below(self.column, value, op == 'lte'))
+        return max(0.0, high - low)
+
+    def _match(self, values):
+        keep = np.ones(len(values), dtype=bool)
+        for op, value in self.bounds:
+            keep &= RANGE_OPERATORS[op](values, value)
+        return keep
+
+    def row_ids(self, index):
+        predicates = tuple((self.column, op, value) for op, value in self.bounds)
+        return np.flatnonzero(range_mask(index.df, predicates)).astype(index.id_dtype)
+
+    def refine(self, index, row_ids):
+        values = index.df[self.column].to_numpy()[row_ids]
+        return row_ids[self._match(values)]
+
+
+class AccountPredicate(Predicate):
+    """Row-level access control: only rows of the accounts a user is granted."""
+
+    name = "accounts"
+
+    def __init__(self, accounts):
+        self.accounts = tuple(sorted(str(account) for account in accounts))
+
+    @property
+    def key(self):
+        return (self.name, self.accounts)
+
+    def estimate(self, index):
+        return len(index.account_rows(self.accounts)) / max(index.n, 1)
+
+    def row_ids(self, index):
+        return index.account_rows(self.accounts).to_row_ids(index.id_dtype)
+
+    def refine(self, index, row_ids):
+        return row_ids[index.account_rows(self.accounts).contains(row_ids)]
+
+
+class QueryPlan:
+    """Predicates ordered by estimated selectivity (most selective first)."""
+
+    def __init__(self, index: DatasetIndex, predicates: List[Predicate]):
+        self.index = index
+        self.estimates = {id(p): p.estimate(index) for p in predicates}
+        self.predicates = sorted(predicates, key=lambda p: self.estimates[id(p)])
+        self.steps = []
+
+    def execute(self, shared: Optional[dict] = None) -> Optional[np.ndarray]:
+        """Ascending matching row ids, or None when there is nothing to filter.
+
+        `shared` maps predicate keys to their row bitmaps (see
+        evaluate_shared_predicates); candidates are probed against those
+        instead of evaluating the predicates again.
+        """
+        if not self.predicates:
+            return None
+        shared = shared if shared is not None else {}
+        row_ids = None
+        for predicate in self.predicates:
+            known = shared.get(predicate.key)
+            if row_ids is None:
+                if known is not None:
+                    row_ids = known.to_row_ids(self.index.id_dtype)
+                else:
+                    row_ids = predicate.row_ids(self.index)
+            elif len(row_ids):
+                if known is not None:
+                    row_ids = row_ids[known.contains(row_ids)]
+                else:
+                    row_ids = predicate.refine(self.index, row_ids)
+            self.steps.append({
+                "predicate": predicate.name,
+                "estimated_rows": int(round(self.estimates[id(predicate)] * self.index.n)),
+                "rows_after": int(len(row_ids))
+            })
+        return row_ids
+
+    def estimated_rows(self) -> int:
+        """Estimated matches of all predicates combined (assumes independence)."""
+        fraction = 1.0
+        for predicate in self.predicates:
+            fraction *= self.estimates[id(predicate)]
+        return int(round(fraction * self.index.n))
+
+    def first_matches(self, needed: int, by_date: bool = False, chunk_size: int = SCAN_CHUNK_SIZE):
+        """First `needed` matching row ids in row order (date order if by_date).
+
+        Scans candidates chunk by chunk and stops as soon as enough matches
+        are found. Returns (row_ids, complete); complete means the scan
+        reached the end, so the row ids are all the matches.
+        """
+        lo, hi = 0, self.index.n
+        predicates = self.predicates
+        if by_date:
+            # The date predicate becomes the scan range of the date-ordered ids
+            dates = [p for p in predicates if isinstance(p, DateRangePredicate)]
+            if dates:
+                lo, hi = self.index.date_bounds(dates[0].start, dates[0].end)
+            predicates = [p for p in predicates if not isinstance(p, DateRangePredicate)]
+        found, count = [], 0
+        for start in range(lo, hi, chunk_size):
+            stop = min(start + chunk_size, hi)
+            if by_date:
+                row_ids = self.index.date_order[start:stop]
+            else:
+                row_ids = np.arange(start, stop, dtype=self.index.id_dtype)
+            for predicate in predicates:
+                if len(row_ids):
+                    row_ids = predicate.refine(self.index, row_ids)
+            found.append(row_ids)
+            count += len(row_ids)
+            if count >= needed and stop < hi:
+                return np.concatenate(found)[:needed], False
+        matches = np.concatenate(found) if found else np.empty(0, dtype=self.index.id_dtype)
+        return matches, True
+
+    def explain(self) -> List[dict]:
+        """Executed steps with estimated vs actual row counts."""
+        return list(self.steps)
+
+
+def has_filters(start_date=None, end_date=None, search_term=None, ranges=(), accounts=None) -> bool:
+    """Whether a filter set restricts the rows at all."""
+    return bool(start_date or end_date or search_term or ranges) or accounts is not None
+
+
+def build_predicates(start_date=None, end_date=None, search_term=None, ranges=(),
+                     accounts=None) -> List[Predicate]:
+    """Predicates for the given filters (ranges as from filters.normalize_ranges).
+
+    `accounts` restricts rows to those account ids; None means every account.
+    """
+    predicates = []
+    if accounts is not None:
+        predicates.append(AccountPredicate(accounts))
+    if start_date or end_date:
+        predicates.append(DateRangePredicate(start_date, end_date))
+    if search_term:
+        predicates.append(CampaignSearchPredicate(search_term))
+    by_column = {}
+    for column, op, value in ranges or ():
+        by_column.setdefault(column, []).append((op, value))
+    for column, bounds in by_column.items():
+        predicates.append(ColumnRangePredicate(column, bounds))
+    return predicates
+
+
+def plan_query(index: DatasetIndex, start_date=None, end_date=None, search_term=None,
+               ranges=(), accounts=None) -> QueryPlan:
+    """Build (but do not run) a plan for the given filters."""
+    return QueryPlan(index, build_predicates(start_date, end_date, search_term, ranges, accounts))
+
+
+def evaluate_shared_predicates(index: DatasetIndex, filter_sets) -> dict:
+    """Row bitmaps of every predicate used by more than one filter set, evaluated once.
+
+    `filter_sets` holds (start_date, end_date, search_term, ranges, accounts)
+    tuples, e.g. the queries of one batch request.
+    """
+    counts = {}
+    for filter_set in filter_sets:
+        for predicate in build_predicates(*filter_set):
+            entry = counts.setdefault(predicate.key, [predicate, 0])
+            entry[1] += 1
+    shared = {}
+    for key, (predicate, count) in counts.items():
+        if count > 1:
+            shared[key] = RowBitmap.from_row_ids(predicate.row_ids(index))
+    return shared
+
+
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+def clear_result_cache():
+    """Drop all cached filter results."""
+    with _result_cache_lock:
+        _result_cache.clear()
+
+
+def _result_key(index: DatasetIndex, start_date, end_date, search_term, ranges, accounts) -> tuple:
+    accounts = None if accounts is None else tuple(sorted(str(account) for account in accounts))
+    return (index.version, start_date, end_date, search_term, tuple(ranges or ()), accounts)
+
+
+def cached_row_ids(index: DatasetIndex, start_date=None, end_date=None, search_term=None,
+                   ranges=(), accounts=None) -> Optional[RowBitmap]:
+    """Cached filter result if there is one (does not evaluate or count as a cache access)."""
+    with _result_cache_lock:
+        return _result_cache.get(_result_key(index, start_date, end_date, search_term, ranges, accounts))
+
+
+def filter_row_ids(index: DatasetIndex, start_date=None, end_date=None, search_term=None,
+                   ranges=(), accounts=None, shared: Optional[dict] = None) -> Optional[np.ndarray]:
+    """Matching row ids (ascending) with an LRU cache; None means all rows.
+
+    Results are cached as compressed bitmaps and decoded on every hit.
+    """
+    if not has_filters(start_date, end_date, search_term, ranges, accounts):
+        return None
+    key = _result_key(index, start_date, end_date, search_term, ranges, accounts)
+    with _result_cache_lock:
+        cached = _result_cache.get(key)
+        if cached is not None:
+            _result_cache.move_to_end(key)
+    api_logger.record_cache_access("query", hit=cached is not None)
+    if cached is not None:
+        row_ids = cached.to_row_ids(index.id_dtype)
+    else:
+        row_ids = plan_query(index, start_date, end_date, search_term, ranges, accounts).execute(shared)
+        with _result_cache_lock:
+            _result_cache[key] = RowBitmap.from_row_ids(row_ids)
+            while len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+    row_ids.setflags(write=False)
+    return row_ids
+
+
+def _category_ranks(index: DatasetIndex, column: str) -> np.ndarray:
+    """Sort rank of each category of a column: numeric order when every category is a number.
+
+    Ids are parsed as string categories, which sort lexicographically ('10000' < '25').
+    """
+    key = ('category_ranks', column)
+    ranks = index.derived.get(key)
+    if ranks is None:
+        categories = index.df[column].cat.categories
+        values = pd.to_numeric(categories, errors='coerce') if categories.dtype.kind not in 'iuf' else categories
+        if len(values) and not pd.isna(values).any():
+            order = np.argsort(np.asarray(values), kind='stable')
+        else:
+            order = np.arange(len(categories))
+        ranks = np.empty(len(categories), dtype=np.min_scalar_type(max(len(categories) - 1, 0)))
+        ranks[order] = np.arange(len(categories))
+        index.derived[key] = ranks
+    return ranks
+
+
+def _sort_keys(index: DatasetIndex, column: str, row_ids: Optional[np.ndarray]):
+    """(keys, nulls) of a column restricted to row_ids; nulls is None if there are none."""
+    series = index.df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        if row_ids is not None:
+            codes = codes[row_ids]
+        nulls = codes < 0
+        # Null codes (-1) get an arbitrary rank; they are moved last by the caller
+        values = _category_ranks(index, column)[codes] if len(series.cat.categories) else codes
+        return values, (nulls if nulls.any() else None)
+    values = series.to_numpy()
+    nulls = pd.isna(values) if values.dtype.kind in 'fmM' else None
+    if row_ids is not None:
+        values = values[row_ids]
+        nulls = None if nulls is None else nulls[row_ids]
+    return values, (nulls if nulls is not None and nulls.any() else None)
+
+
+def sort_row_ids(index: DatasetIndex, row_ids: Optional[np.ndarray], sort_by: str,
+                 ascending: bool = True, limit: Optional[int] = None) -> np.ndarray:
+    """Row ids ordered by a column, nulls last.
+
+    With `limit`, only the first `limit` ids are returned, selected with a
+    partial sort when that is a small fraction of the candidates.
+    """
+    ids = np.arange(index.n, dtype=index.id_dtype) if row_ids is None else row_ids
+    keys, nulls = _sort_keys(index, sort_by, row_ids)
+
+    # Nulls always go last, regardless of direction (pandas semantics)
+    tail = ids[:0]
+    if nulls is not None:
+        tail = ids[nulls]
+        ids, keys = ids[~nulls], keys[~nulls]
+    if not ascending:
+        keys = -(keys.view('int64') if keys.dtype.kind == 'M' else keys.astype('float64'))
+
+    if limit is not None and 0 < limit and limit * PARTIAL_SORT_RATIO < len(keys):
+        # Partial sort that stays stable: everything below the limit-th key,
+        # then the earliest rows equal to it
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        below = np.flatnonzero(keys < kth)
+        ties = np.flatnonzero(keys == kth)[:limit - len(below)]
+        top = np.concatenate([below, ties])
+        return ids[top[np.argsort(keys[top], kind='stable')]]
+    ordered = ids[np.argsort(keys, kind='stable')]
+    if len(tail):
+        ordered = np.concatenate([ordered, tail])
+    return ordered if limit is None else ordered[:limit]
@@ -1,98 +1,313 @@
+import numpy as np
 import pandas as pd
-from models.models import MetricsFilters, MetricsResponse, MetricData, MetricsResponsePublic, MetricDataPublic
-from .loader import load_metrics_data
-from .filters import filter_metrics_by_date, search_metrics, sort_metrics, apply_user_permissions
-from typing import Union
+from contextlib import asynccontextmanager
+from models.models import MetricsFilters, MetricsResponse, MetricData, MetricsResponsePublic, MetricDataPublic, MetricsCount
+from .loader import get_dataset_index, get_dataset_version, get_metrics_store, get_resident_index, get_resident_store
+from .filters import apply_user_permissions, is_column_allowed, normalize_ranges
+from .planner import cached_row_ids, filter_row_ids, has_filters, plan_query, sort_row_ids
+from .storage import storage_engine
+from utils.profiler import run_in_threadpool
+from utils import config
+from utils.admission import admission_controller
+from utils.coalescing import SingleFlight
+from utils.timing import span
+from pydantic import TypeAdapter
+from typing import List, Optional, Union
 
 
-def get_filtered_metrics(filters: MetricsFilters, user: dict, page: int = 1, page_size: int = 20) -> Union[MetricsResponse, MetricsResponsePublic]:
-    """Optimized function to get filtered metrics with smart caching - shows ALL data."""
-    try:
-        page_size = min(page_size, 1000)  # Allow more records per page for complete data access
-        
-        # Load complete data first, then apply filters
-        if filters.start_date or filters.end_date or filters.search:
-            # Use filtered loader only when filters are applied
-            from .loader import load_metrics_data_filtered
-            df = load_metrics_data_filtered(
-                start_date=filters.start_date,
-                end_date=filters.end_date, 
-                search_term=filters.search
-            )
-        else:
-            # Load all data when no filters (complete dataset)
-            df = load_metrics_data()
-        
-        # Fast sorting (only if needed)
-        if filters.sort_by:
-            df = sort_metrics(df, filters.sort_by, filters.sort_order)
-        
+def get_filter_set(filters: MetricsFilters, user: dict) -> tuple:
+    """(start_date, end_date, search_term, ranges, accounts) as understood by the planner.
+
+    `accounts` is the user's account grant (None when unrestricted), so row-level
+    access control is applied like any other filter.
+    """
+    # Range predicates on columns the user may not read are never applied
+    ranges = normalize_ranges(
+        [r for r in filters.ranges or () if is_column_allowed(r.column, user)]
+    )
+    return filters.start_date, filters.end_date, filters.search, ranges, user.get('accounts')
+
+
+def page_row_ids(index, filters: MetricsFilters, user: dict, start_idx: int, end_idx: int,
+                 shared: Optional[dict] = None) -> tuple:
+    """(row ids of rows start_idx:end_idx, total_count, total_count_approximate) for a query.
+
+    `shared` holds sub-filter row ids already evaluated for a batch request.
+    """
+    filter_set = get_filter_set(filters, user)
+    
+    # Sorting only if needed; restricted columns would leak their ordering
+    sort_by = filters.sort_by
+    if not (sort_by and sort_by in index.df.columns and is_column_allowed(sort_by, user)):
+        sort_by = None
+    ascending = (filters.sort_order or 'asc').lower() == 'asc'
+    
+    # Approximate count mode: pages in row order (or date order) come from a scan that
+    # stops once the page is filled, unless the full result is already cached
+    early_scan = (
+        filters.count_mode == 'approximate' and has_filters(*filter_set)
+        and (sort_by is None or (sort_by == 'date' and ascending))
+        and cached_row_ids(index, *filter_set) is None
+    )
+    total_count_approximate = False
+    
+    if early_scan:
+        with span("filter"):
+            plan = plan_query(index, *filter_set)
+            row_ids, complete = plan.first_matches(end_idx, by_date=sort_by == 'date')
+        # An unfinished scan only knows its matches so far; the total is estimated
+        total_count = len(row_ids) if complete else max(plan.estimated_rows(), len(row_ids))
+        total_count_approximate = not complete
+        sort_by = None  # already in the requested order
+    else:
+        # Filter on row ids: the planner runs the most selective predicate first
+        # and no intermediate frames are materialized
+        with span("filter"):
+            row_ids = filter_row_ids(index, *filter_set, shared=shared)
         # Get total before pagination
-        total_count = len(df)
-        
-        # Efficient pagination (avoid copying large datasets)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        df_page = df.iloc[start_idx:end_idx] if start_idx < len(df) else df.iloc[0:0]
-        
-        # Apply permissions only to paginated data
-        df_page = apply_user_permissions(df_page, user)
-        
-        # Check if user is admin to decide which model to use
-        is_admin = user.get('role') == 'admin'
-        
-        # Vectorized conversion (much faster than iterrows)
-        if not df_page.empty:
-            # Calculate conversion rates vectorized
-            conversion_rates = (df_page['conversions'] / df_page['clicks'].replace(0, 1)) * 100
-            conversion_rates = conversion_rates.fillna(0)
-            
-            # Build metrics list efficiently
-            metrics_list = []
-            for idx, (_, row) in enumerate(df_page.iterrows()):
-                metric_data = {
-                    'date': row['date'].strftime('%Y-%m-%d'),
-                    'campaign_id': int(row['campaign_id']) if 'campaign_id' in row else None,
-                    'campaign_name': f"Campaign {row['campaign_id']}",
-                    'impressions': int(row['impressions']),
-                    'clicks': int(row['clicks']),
-                    'conversions': float(row['conversions']),
-                    'conversion_rate': float(conversion_rates.iloc[idx])
-                }
-                
-                if is_admin:
-                    # Admin users: include cost_micros if present
-                    if 'cost_micros' in row.index and pd.notna(row['cost_micros']):
-                        metric_data['cost_micros'] = int(row['cost_micros'])
-                    metrics_list.append(MetricData.model_validate(metric_data))
-                else:
-                    # Regular users: use public model (no cost_micros field at all)
-                    metrics_list.append(MetricDataPublic.model_validate(metric_data))
-        else:
-            metrics_list = []
+        total_count = index.n if row_ids is None else len(row_ids)
+    
+    # Fast sorting: only the rows up to the requested page have to be ordered
+    if sort_by:
+        with span("sort"):
+            row_ids = sort_row_ids(index, row_ids, sort_by, ascending=ascending, limit=end_idx)
+    
+    if row_ids is None:
+        page_ids = np.arange(min(start_idx, index.n), min(end_idx, index.n), dtype=index.id_dtype)
+    else:
+        page_ids = row_ids[start_idx:end_idx]
+    return page_ids, total_count, total_count_approximate
+
+
+def store_page(store, filters: MetricsFilters, user: dict, start_idx: int, page_size: int) -> tuple:
+    """(page frame, total_count) of a query run in the SQL store.
+
+    Only readable columns are selected, and sorting follows the same rules
+    as the in-memory path.
+    """
+    filter_set = get_filter_set(filters, user)
+    sort_by = filters.sort_by
+    if not (sort_by and sort_by in store.columns and is_column_allowed(sort_by, user)):
+        sort_by = None
+    ascending = (filters.sort_order or 'asc').lower() == 'asc'
+    columns = [column for column in store.columns if is_column_allowed(column, user)]
+    with span("filter"):
+        total_count = store.count(*filter_set)
+    with span("paginate"):
+        df_page = store.page(filter_set, columns, sort_by, ascending, limit=page_size, offset=start_idx)
+    return df_page, total_count
+
+
+def get_filtered_metrics(filters: MetricsFilters, user: dict, page: int = 1, page_size: int = 20,
+                         shared: Optional[dict] = None) -> Union[MetricsResponse, MetricsResponsePublic]:
+    """Optimized function to get filtered metrics with smart caching - shows ALL data.
+    
+    `shared` holds sub-filter row ids already evaluated for a batch request.
+    Errors propagate to the caller (the route or batch result reports them).
+    """
+    page_size = min(page_size, 1000)  # Allow more records per page for complete data access
+    
+    start_idx = (page - 1) * page_size
+    end_idx = start_idx + page_size
+    
+    store = get_metrics_store(filters.dataset)
+    if store is not None:
+        # SQL backend: filter, sort, limit and offset run in the database
+        df_page, total_count = store_page(store, filters, user, start_idx, page_size)
+        total_count_approximate = False
+    else:
+        index = get_dataset_index(filters.dataset)
+        page_ids, total_count, total_count_approximate = page_row_ids(
+            index, filters, user, start_idx, end_idx, shared=shared
+        )
         
-        # Return appropriate response model
-        if is_admin:
-            return MetricsResponse(
-                metrics=metrics_list,
-                total_count=total_count,
-                page=page,
-                page_size=page_size,
-                total_pages=((total_count - 1) // page_size) + 1 if total_count > 0 else 1
-            )
-        else:
-            return MetricsResponsePublic(
-                metrics=metrics_list,
-                total_count=total_count,
-                page=page,
-                page_size=page_size,
-                total_pages=((total_count - 1) // page_size) + 1 if total_count > 0 else 1
-            )
-    except Exception as e:
-        print(f"Error in get_filtered_metrics: {str(e)}")
-        # Return appropriate empty response based on user role
-        is_admin = user.get('role') == 'admin'
-        if is_admin:
-            return MetricsResponse(metrics=[], total_count=0, page=1, page_size=page_size, total_pages=1)
+        # Efficient pagination (only the page is materialized)
+        with span("paginate"):
+            df_page = index.df.iloc[page_ids]
+    
+    # Apply permissions only to paginated data
+    df_page = apply_user_permissions(df_page, user)
+    
+    # Check if user is admin to decide which model to use
+    is_admin = user.get('role') == 'admin'
+    
+    with span("serialize"):
+        metrics_list = _build_metrics_list(df_page, is_admin)
+    
+    # Return appropriate response model
+    if is_admin:
+        return MetricsResponse(
+            metrics=metrics_list,
+            total_count=total_count,
+            page=page,
+            page_size=page_size,
+            total_pages=((total_count - 1) // page_size) + 1 if total_count > 0 else 1,
+            total_count_approximate=total_count_approximate
+        )
+    else:
+        return MetricsResponsePublic(
+            metrics=metrics_list,
+            total_count=total_count,
+            page=page,
+            page_size=page_size,
+            total_pages=((total_count - 1) // page_size) + 1 if total_count > 0 else 1,
+            total_count_approximate=total_count_approximate
+        )
+
+
+def query_key(filters: MetricsFilters, user: dict, page: int, page_size: int) -> tuple:
+    """Identity of a metrics query: equal keys get equal responses."""
+    accounts = user.get('accounts')
+    accounts = None if accounts is None else tuple(sorted(accounts))
+    return (
+        get_dataset_version(filters.dataset), user.get('role'), accounts, filters.model_dump_json(), page, page_size
+    )
+
+
+# Identical metrics queries running at the same time share one computation
+_inflight_queries = SingleFlight("inflight_query")
+
+
+async def coalesced_filtered_metrics(filters: MetricsFilters, user: dict, page: int = 1,
+                                     page_size: int = 20) -> Union[MetricsResponse, MetricsResponsePublic]:
+    """get_filtered_metrics off the event loop, joining an identical query already in flight."""
+    return await _inflight_queries.run(
+        query_key(filters, user, page, page_size), get_filtered_metrics, filters, user, page, page_size
+    )
+
+
+def estimate_query_cost(filters: MetricsFilters, user: dict, page: int, page_size: int) -> float:
+    """Admission cost of a metrics query: 1 plus rows scanned, sorted and paged past, in units."""
+    filter_set = get_filter_set(filters, user)
+    filtered = has_filters(*filter_set)
+    store = get_metrics_store(filters.dataset)
+    if store is not None:
+        # No statistics for the SQL store: a filtered query is charged as a full scan
+        rows = store.rows
+        scanned = rows if filtered else 0
+        sorted_rows = rows if filters.sort_by and is_column_allowed(filters.sort_by, user) else 0
+        return 1 + (scanned + sorted_rows + min(page * page_size, rows)) / config.ADMISSION_ROWS_PER_UNIT
+    index = get_dataset_index(filters.dataset)
+    cached = cached_row_ids(index, *filter_set) if filtered else None
+    if cached is not None:
+        scanned, rows = 0, len(cached)
+    elif filtered:
+        plan = plan_query(index, *filter_set)
+        # Range predicates scan their whole column; date and campaign lookups only touch matches
+        rows = plan.estimated_rows()
+        scanned = index.n if filter_set[3] else rows
+    else:
+        scanned, rows = 0, index.n
+    sort_by = filters.sort_by
+    sorted_rows = rows if sort_by and is_column_allowed(sort_by, user) else 0
+    depth = min(page * page_size, rows)
+    return 1 + (scanned + sorted_rows + depth) / config.ADMISSION_ROWS_PER_UNIT
+
+
+@asynccontextmanager
+async def admit_query(filters: MetricsFilters, user: dict, page: int, page_size: int):
+    """Hold admission budget while the query runs (joining an identical in-flight query is free).
+
+    Raises AdmissionRejected when the query cannot be admitted in time.
+    """
+    key = query_key(filters, user, page, page_size)
+    if not config.ADMISSION_ENABLED or _inflight_queries.running(key):
+        yield
+        return
+    # Estimating may load (or import) the dataset, which must not block the event loop
+    cost = await run_in_threadpool(estimate_query_cost, filters, user, page, page_size)
+    async with admission_controller.admit(user.get('email') or user.get('role'), cost):
+        yield
+
+
+def response_cache_key(filters: MetricsFilters, user: dict, page: int, page_size: int) -> Optional[tuple]:
+    """Key for caching the serialized response, or None if the rows are not cached yet.
+    
+    Only results served from the query cache (or the unfiltered dataset) are
+    worth keeping serialized; responses depend on the dataset version, the
+    filters and the user's role and account grant. Runs on the event loop, so
+    it never loads: a dataset that is not resident yet counts as uncached.
+    """
+    filter_set = get_filter_set(filters, user)
+    if storage_engine() is not None:
+        # Filtered SQL results are not cached
+        if has_filters(*filter_set) or get_resident_store(filters.dataset) is None:
+            return None
+    else:
+        index = get_resident_index(filters.dataset)
+        if index is None or (has_filters(*filter_set) and cached_row_ids(index, *filter_set) is None):
+            return None
+    return query_key(filters, user, page, page_size)
+
+
+def get_metrics_count(filters: MetricsFilters, user: dict, page_size: int = 20) -> MetricsCount:
+    """Exact total_count for a filter set (caches the matching rows for later pages)."""
+    filter_set = get_filter_set(filters, user)
+    store = get_metrics_store(filters.dataset)
+    if store is not None:
+        with span("filter"):
+            total_count = store.count(*filter_set)
+    else:
+        index = get_dataset_index(filters.dataset)
+        with span("filter"):
+            row_ids = filter_row_ids(index, *filter_set)
+        total_count = index.n if row_ids is None else len(row_ids)
+    return MetricsCount(
+        total_count=total_count,
+        total_pages=((total_count - 1) // page_size) + 1 if total_count > 0 else 1
+    )
+
+
+# Whole pages are validated in one call instead of a model_validate per row
+_ADMIN_ROWS = TypeAdapter(List[MetricData])
+_PUBLIC_ROWS = TypeAdapter(List[MetricDataPublic])
+
+
+def _float_values(values: pd.Series) -> list:
+    """Python floats of a column; float32 values are read back as their shortest decimal (2.29, not 2.2899999)."""
+    if values.dtype == 'float32':
+        return values.astype(str).astype('float64').tolist()
+    return values.astype('float64').tolist()
+
+
+def _build_metrics_list(df_page: pd.DataFrame, is_admin: bool) -> list:
+    """Convert a page of rows into response models, column by column."""
+    if df_page.empty:
+        return []
+    
+    # Derived KPIs are precomputed by the loader; fall back for frames without them
+    if 'conversion_rate' not in df_page.columns:
+        from .loader import add_derived_columns
+        df_page = add_derived_columns(df_page.copy())
+    
+    # Python values per field, converted once per column
+    columns = {
+        'date': df_page['date'].dt.strftime('%Y-%m-%d').tolist(),
+        'campaign_name': ('Campaign ' + df_page['campaign_id'].astype(str)).tolist(),
+        'impressions': df_page['impressions'].astype('int64').tolist(),
+        'clicks': df_page['clicks'].astype('int64').tolist(),
+        'conversions': _float_values(df_page['conversions']),
+        'conversion_rate': df_page['conversion_rate'].astype('float64').tolist(),
+        'ctr': df_page['ctr'].astype('float64').tolist() if 'ctr' in df_page.columns else [0.0] * len(df_page)
+    }
+    if not is_admin:
+        # Regular users: use public model (no cost fields at all)
+        return _PUBLIC_ROWS.validate_python([dict(zip(columns, row)) for row in zip(*columns.values())])
+    
+    # Admin users: include cost_micros and cost-derived KPIs where present
+    optional = {}
+    if 'cost_micros' in df_page.columns:
+        cost = df_page['cost_micros']
+        if cost.notna().all():
+            optional['cost_micros'] = cost.astype('int64').tolist()
         else:
-            return MetricsResponsePublic(metrics=[], total_count=0, page=1, page_size=page_size, total_pages=1)
\ No newline at end of file
+            optional['cost_micros'] = [None if pd.isna(value) else int(value) for value in cost.tolist()]
+    for column in ('cpc', 'cpa'):
+        if column in df_page.columns:
+            values = df_page[column].astype('float64')
+            optional[column] = values.astype(object).where(values.notna(), None).tolist()
+    names = list(columns) + list(optional)
+    rows = zip(*columns.values(), *optional.values())
+    return _ADMIN_ROWS.validate_python([
+        {name: value for name, value in zip(names, row) if value is not None} for row in rows
+    ])
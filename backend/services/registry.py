@@ -0,0 +1,231 @@
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from models.models import DATASET_NAME_REGEX, DEFAULT_DATASET
+from utils import config
+from utils.logger import api_logger
+from .index import DatasetIndex
+
+DATASET_NAME_PATTERN = re.compile(DATASET_NAME_REGEX)
+
+
+class UnknownDataset(KeyError):
+    """No metrics source with this name."""
+
+
+def source_stamp(path: str) -> tuple:
+    """Identity of a source file's contents: (path, mtime, size). Raises OSError if missing."""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class LoadedDataset:
+    """A resident dataset: its frame, index and the source it was loaded from."""
+
+    def __init__(self, name: str, df: pd.DataFrame, version: int, stamp: Optional[tuple],
+                 frame_bytes: int):
+        self.name = name
+        self.df = df
+        self.index = DatasetIndex(df, version)
+        self.version = version
+        self.stamp = stamp  # None for fallback data without a source file
+        self.frame_bytes = frame_bytes
+        self.loaded_at = self.last_used = time.time()
+
+    @property
+    def memory_bytes(self) -> int:
+        """The frame plus everything built over it so far (index structures, sketches)."""
+        return self.frame_bytes + self.index.nbytes
+
+
+class DatasetRegistry:
+    """Named metrics datasets, loaded on first use and evicted LRU under a memory budget.
+
+    `resolve` maps a name to its CSV path (None if unknown), `discover` lists
+    the available names, `load` parses a CSV into a frame and `fallback`
+    optionally supplies a frame for a name whose source cannot be read.
+    Versions are unique across datasets and stay the same while a source
+    file is unchanged, so version-keyed caches never mix datasets and stay
+    valid across an eviction and reload.
+    """
+
+    def __init__(self, resolve: Callable[[str], Optional[str]], discover: Callable[[], List[str]],
+                 load: Callable[[str], pd.DataFrame], measure: Callable[[pd.DataFrame], int],
+                 fallback: Optional[Callable[[str], Optional[pd.DataFrame]]] = None):
+        self._resolve = resolve
+        self._discover = discover
+        self._load = load
+        self._measure = measure
+        self._fallback = fallback
+        self._entries: "OrderedDict[str, LoadedDataset]" = OrderedDict()  # least recently used first
+        self._versions: Dict[str, tuple] = {}  # name -> (stamp, version) of the latest load
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.stats = {'loads': 0, 'evictions': 0}
+
+    def names(self) -> List[str]:
+        return self._discover()
+
+    def exists(self, name: str) -> bool:
+        return self._resolve(name) is not None
+
+    def version(self, name: str) -> int:
+        """Version of the dataset's latest load (0 if it was never loaded)."""
+        with self._lock:
+            entry = self._versions.get(name)
+        return entry[1] if entry else 0
+
+    def version_for(self, name: str, stamp: Optional[tuple]) -> int:
+        """Stable version for a source state: reused while the stamp is unchanged."""
+        with self._lock:
+            known = self._versions.get(name)
+            if known is not None and stamp is not None and known[0] == stamp:
+                return known[1]
+            version = next(self._counter)
+            self._versions[name] = (stamp, version)
+            return version
+
+    def _fresh(self, name: str, stamp: Optional[tuple]) -> Optional[LoadedDataset]:
+        """The resident entry if it is still current, marked as just used (call with the lock held)."""
+        entry = self._entries.get(name)
+        # A source that went missing keeps serving what was loaded from it
+        if entry is None or (stamp is not None and entry.stamp != stamp):
+            return None
+        self._entries.move_to_end(name)
+        entry.last_used = time.time()
+        return entry
+
+    def get(self, name: str = DEFAULT_DATASET) -> LoadedDataset:
+        """The dataset, loading (or reloading a changed source) on demand."""
+        path = self._resolve(name)
+        if path is None:
+            raise UnknownDataset(name)
+        try:
+            stamp = source_stamp(path)
+        except OSError:
+            stamp = None
+        with self._lock:
+            entry = self._fresh(name, stamp)
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        if entry is not None:
+            api_logger.record_cache_access("dataset", hit=True)
+            return entry
+
+        # One load per dataset at a time; other datasets stay available meanwhile
+        with load_lock:
+            with self._lock:
+                entry = self._fresh(name, stamp)
+            if entry is not None:
+                return entry
+            api_logger.record_cache_access("dataset", hit=False)
+            load_start = time.perf_counter()
+            try:
+                if stamp is None:
+                    raise FileNotFoundError(path)
+                df = self._load(path)
+            except Exception:
+                with self._lock:
+                    entry = self._entries.get(name)
+                if entry is not None:
+                    return entry  # keep serving the last good load
+                df = self._fallback(name) if self._fallback else None
+                if df is None:
+                    raise
+                stamp = None
+            entry = LoadedDataset(name, df, self.version_for(name, stamp), stamp, self._measure(df))
+            # Index structures and sketches are built later; each addition re-checks the budget
+            entry.index.on_grow = lambda: self.enforce_budget(keep=name)
+            with self._lock:
+                self._entries[name] = entry
+                self._entries.move_to_end(name)
+                self.stats['loads'] += 1
+                evicted = self._evict(keep=name)
+            api_logger.record_dataset_load(time.perf_counter() - load_start, len(df), entry.memory_bytes, name)
+        self._log_evictions(evicted)
+        return entry
+
+    def enforce_budget(self, keep: str):
+        """Evict least recently used datasets until the budget holds again, sparing `keep`."""
+        with self._lock:
+            evicted = self._evict(keep=keep)
+        self._log_evictions(evicted)
+
+    def _log_evictions(self, evicted: List[LoadedDataset]):
+        for victim in evicted:
+            api_logger.record_dataset_eviction(victim.name)
+            api_logger.log_system_event(
+                "DATASET_EVICTED", f"{victim.name} ({victim.memory_bytes / 1e6:.1f} MB, least recently used)"
+            )
+
+    def _evict(self, keep: str) -> List[LoadedDataset]:
+        """Drop least recently used datasets until the budget holds (call with the lock held)."""
+        budget = config.DATASET_MEMORY_BUDGET_MB * 1024 * 1024
+        if budget <= 0:
+            return []
+        sizes = {name: entry.memory_bytes for name, entry in self._entries.items()}
+        total = sum(sizes.values())
+        evicted = []
+        for name in list(self._entries):
+            if total <= budget:
+                break
+            if name == keep:
+                continue  # the dataset just requested stays, even alone over budget
+            entry = self._entries.pop(name)
+            total -= sizes[name]
+            evicted.append(entry)
+        self.stats['evictions'] += len(evicted)
+        return evicted
+
+    def resident(self, name: str = DEFAULT_DATASET) -> Optional[LoadedDataset]:
+        """The resident entry if its source is unchanged, without loading it (None otherwise)."""
+        path = self._resolve(name)
+        if path is None:
+            return None
+        try:
+            stamp = source_stamp(path)
+        except OSError:
+            stamp = None
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or (stamp is not None and entry.stamp != stamp):
+            return None
+        return entry
+
+    def peek(self, name: str = DEFAULT_DATASET) -> Optional[LoadedDataset]:
+        """The resident entry, without loading or touching its LRU position."""
+        with self._lock:
+            return self._entries.get(name)
+
+    def clear(self):
+        """Drop every resident dataset (reloads get new versions)."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            resident = [
+                {
+                    'name': entry.name,
+                    'version': entry.version,
+                    'rows': len(entry.df),
+                    'memory_bytes': entry.memory_bytes,
+                    'last_used': entry.last_used
+                }
+                for entry in reversed(self._entries.values())
+            ]
+            stats = dict(self.stats)
+        return {
+            'resident': resident,
+            'memory_bytes': sum(entry['memory_bytes'] for entry in resident),
+            'memory_budget_bytes': config.DATASET_MEMORY_BUDGET_MB * 1024 * 1024,
+            **stats
+        }
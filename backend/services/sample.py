@@ -1,21 +1,69 @@
+import numpy as np
 import pandas as pd
 import random
 from datetime import datetime, timedelta
 
+BASE_DATE = datetime(2024, 8, 1)
+BASE_CAMPAIGN_ID = 6320590000
+BASE_ACCOUNT_ID = 8181642239
 
-def create_sample_data(page_size: int = 20):
+
+def create_sample_data(page_size: int = 20, seed: int = None):
     """Create sample data when CSV loading fails."""
+    rng = random.Random(seed)
     data = []
-    base_date = datetime(2024, 8, 1)
     for i in range(page_size):
         data.append({
-            'date': base_date + timedelta(days=i),
-            'campaign_id': 6320590000 + i,
-            'impressions': random.randint(10000, 50000),
-            'clicks': random.randint(500, 2000), 
-            'conversions': round(random.uniform(20, 100), 2),
-            'cost_micros': random.randint(1000000, 5000000),
-            'account_id': 8181642239,
-            'interactions': random.randint(600, 2500)
+            'date': BASE_DATE + timedelta(days=i),
+            'campaign_id': BASE_CAMPAIGN_ID + i,
+            'impressions': rng.randint(10000, 50000),
+            'clicks': rng.randint(500, 2000),
+            'conversions': round(rng.uniform(20, 100), 2),
+            'cost_micros': rng.randint(1000000, 5000000),
+            'account_id': BASE_ACCOUNT_ID,
+            'interactions': rng.randint(600, 2500)
         })
-    return pd.DataFrame(data)
\ No newline at end of file
+    return pd.DataFrame(data)
+
+
+def create_synthetic_data(rows: int, seed: int = 42, campaigns: int = 500,
+                          accounts: int = 20, days: int = 730):
+    """Deterministic large dataset with the same schema as create_sample_data.
+
+    Vectorized so millions of rows can be generated in seconds; the same
+    (rows, seed, campaigns, accounts, days) always yields identical data.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Each campaign belongs to one account, like the real export
+    campaign_ids = BASE_CAMPAIGN_ID + np.arange(campaigns, dtype=np.int64) * 7919
+    campaign_accounts = BASE_ACCOUNT_ID + rng.integers(0, accounts, size=campaigns) * 104729
+    campaign_idx = rng.integers(0, campaigns, size=rows)
+
+    impressions = rng.lognormal(mean=8.0, sigma=1.2, size=rows).astype(np.int64) + 1
+    clicks = rng.binomial(impressions, 0.03)
+    interactions = clicks + rng.binomial(impressions - clicks, 0.005)
+    conversions = np.round(clicks * rng.beta(2, 40, size=rows), 2)
+    cost_micros = (clicks * rng.gamma(2.0, 600000, size=rows)).astype(np.int64)
+
+    day_offsets = np.sort(rng.integers(0, days, size=rows))
+    dates = pd.Timestamp(BASE_DATE - timedelta(days=days)) + pd.to_timedelta(day_offsets, unit='D')
+
+    return pd.DataFrame({
+        'account_id': campaign_accounts[campaign_idx],
+        'campaign_id': campaign_ids[campaign_idx],
+        'cost_micros': cost_micros,
+        'clicks': clicks,
+        'conversions': conversions,
+        'impressions': impressions,
+        'interactions': interactions,
+        'date': dates
+    })
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 42, **kwargs):
+    """Write a synthetic dataset in the metrics.csv format (YYYY-MM-DD dates)."""
+    df = create_synthetic_data(rows, seed=seed, **kwargs)
+    df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+    df.to_csv(path, index=False)
+    return path
@@ -0,0 +1,229 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from models.models import SKETCH_DISTINCT_COLUMNS
+from .index import DatasetIndex
+
+# HyperLogLog precision: 2**12 registers, standard error 1.04 / sqrt(4096) ~ 1.6%
+HLL_PRECISION = 12
+# KLL accuracy parameter: ~1.65% normalized rank error at k=200 (99% confidence)
+KLL_K = 200
+
+
+def hll_standard_error(precision: int = HLL_PRECISION) -> float:
+    """Relative standard error of a HyperLogLog estimate."""
+    return 1.04 / math.sqrt(1 << precision)
+
+
+def kll_rank_error(k: int = KLL_K) -> float:
+    """Normalized rank error of a KLL sketch (99% confidence, empirical 3.3 / k)."""
+    return 3.3 / k
+
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64 (64 for zero)."""
+    words = words.copy()
+    zeros = np.zeros(len(words), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (words >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+
+def hll_positions(hashes: np.ndarray, precision: int = HLL_PRECISION):
+    """(register index, rank) of each 64-bit hash."""
+    hashes = hashes.astype(np.uint64, copy=False)
+    registers = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    ranks = np.minimum(_leading_zeros(hashes << np.uint64(precision)), 64 - precision) + 1
+    return registers, ranks.astype(np.uint8)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over 64-bit hashes."""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        registers, ranks = hll_positions(hashes, self.precision)
+        np.maximum.at(self.registers, registers, ranks)
+        return self
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Small range: linear counting is more accurate
+            estimate = m * math.log(m / empty)
+        return float(estimate)
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin-Lang-Liberty compactors).
+
+    Level h holds items of weight 2**h; a full level is sorted and every
+    other item (random offset) is promoted to the next level.
+    """
+
+    def __init__(self, k: int = KLL_K, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                kept = items[len(items) - len(items) % 2:]  # odd item stays at this level
+                promoted = items[self._rng.integers(2):len(items) - len(kept):2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = kept
+                level = 0  # capacities shrink when a level is added
+                continue
+            level += 1
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch'):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    @property
+    def count(self) -> int:
+        return int(sum(len(items) << level for level, items in enumerate(self.levels)))
+
+    def quantiles(self, qs) -> List[Optional[float]]:
+        if self.count == 0:
+            return [None for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return [float(items[order][min(position, len(items) - 1)]) for position in positions]
+
+
+class DaySketches:
+    """Per-day partition sketches of one dataset, merged for date-range queries."""
+
+    def __init__(self, index: DatasetIndex):
+        self.index = index
+        days = index.dates.astype('datetime64[D]')
+        self.days, self.day_codes = np.unique(days, return_inverse=True)
+        self.day_rows = np.bincount(self.day_codes, minlength=len(self.days))
+        self.distinct = {column: self._build_hll(column) for column in SKETCH_DISTINCT_COLUMNS
+                         if column in index.df.columns}
+        self._quantiles: Dict[str, List[KLLSketch]] = {}
+        self._lock = threading.Lock()
+
+    def _build_hll(self, column: str) -> np.ndarray:
+        """HyperLogLog registers per day (days x 2**precision)."""
+        series = self.index.df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy().astype(np.int64)
+            values = series.cat.categories.to_numpy()
+        else:
+            codes, values = pd.factorize(series)
+        valid = codes >= 0
+        # Hash each distinct value once; rows only gather their value's (register, rank)
+        registers, ranks = hll_positions(pd.util.hash_array(np.asarray(values)))
+        codes = codes[valid]
+        cells = self.day_codes[valid].astype(np.int64) * (1 << HLL_PRECISION) + registers[codes]
+        matrix = np.zeros((len(self.days), 1 << HLL_PRECISION), dtype=np.uint8)
+        np.maximum.at(matrix.reshape(-1), cells, ranks[codes])
+        return matrix
+
+    def _quantile_sketches(self, metric: str) -> List[KLLSketch]:
+        """KLL sketch per day for a metric, built on first use."""
+        with self._lock:
+            sketches = self._quantiles.get(metric)
+            built = sketches is None
+            if built:
+                values = self.index.df[metric].to_numpy(dtype=np.float64, na_value=np.nan)
+                order = np.argsort(self.day_codes, kind='stable')
+                bounds = np.concatenate([[0], np.cumsum(self.day_rows)])
+                sketches = [
+                    KLLSketch(seed=day).update(values[order[bounds[day]:bounds[day + 1]]])
+                    for day in range(len(self.days))
+                ]
+                self._quantiles[metric] = sketches
+        if built:
+            self.index.grown()
+        return sketches
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the partitions and every sketch built so far."""
+        total = self.days.nbytes + self.day_codes.nbytes + self.day_rows.nbytes
+        total += sum(matrix.nbytes for matrix in self.distinct.values())
+        with self._lock:
+            sketches = [sketch for day_sketches in self._quantiles.values() for sketch in day_sketches]
+        return total + sum(items.nbytes for sketch in sketches for items in sketch.levels)
+
+    def day_range(self, start_date=None, end_date=None):
+        """Partition positions [lo, hi) covering start_date <= day <= end_date."""
+        lo, hi = 0, len(self.days)
+        if start_date:
+            lo = int(np.searchsorted(self.days, np.datetime64(pd.to_datetime(start_date).date()), 'left'))
+        if end_date:
+            hi = int(np.searchsorted(self.days, np.datetime64(pd.to_datetime(end_date).date()), 'right'))
+        return lo, max(lo, hi)
+
+    def rows(self, lo: int, hi: int) -> int:
+        return int(self.day_rows[lo:hi].sum())
+
+    def distinct_count(self, column: str, lo: int, hi: int) -> float:
+        if hi <= lo:
+            return 0.0
+        registers = self.distinct[column][lo:hi].max(axis=0)
+        return HyperLogLog(registers=registers).estimate()
+
+    def quantiles(self, metric: str, qs, lo: int, hi: int) -> List[Optional[float]]:
+        merged = KLLSketch()
+        for sketch in self._quantile_sketches(metric)[lo:hi]:
+            merged.merge(sketch)
+        return merged.quantiles(qs)
+
+
+_day_sketches_lock = threading.Lock()
+
+
+def get_day_sketches(index: DatasetIndex) -> DaySketches:
+    """Sketches of a dataset, built once per index (so rebuilt when the dataset is reloaded)."""
+    with _day_sketches_lock:
+        sketches = index.derived.get('day_sketches')
+        built = sketches is None
+        if built:
+            sketches = index.derived['day_sketches'] = DaySketches(index)
+    if built:
+        index.grown()
+    return sketches
@@ -0,0 +1,303 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from utils import config
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+# Bumped when the table layout changes, so databases built by older code are re-imported
+STORE_FORMAT = 2
+# Columns of the metrics table, in order (derived KPIs are materialized at import
+# like the in-memory loader does; columns missing from the CSV are left out)
+STORE_COLUMNS = (
+    ('date', 'TEXT'),
+    ('account_id', 'TEXT'),
+    ('campaign_id', 'TEXT'),
+    ('impressions', 'BIGINT'),
+    ('clicks', 'BIGINT'),
+    ('interactions', 'BIGINT'),
+    ('cost_micros', 'BIGINT'),
+    ('conversions', 'DOUBLE'),
+    ('conversion_rate', 'DOUBLE'),
+    ('ctr', 'DOUBLE'),
+    ('cpc', 'DOUBLE'),
+    ('cpa', 'DOUBLE')
+)
+INDEXED_COLUMNS = ('date', 'campaign_id', 'account_id')
+# Id columns, stored as text; sorted numerically when every id is a number
+ID_COLUMNS = ('account_id', 'campaign_id')
+# CSV rows parsed and inserted per step, so imports run in bounded memory
+IMPORT_CHUNK_ROWS = 250_000
+
+SQL_OPERATORS = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+
+def storage_engine() -> Optional[str]:
+    """'sqlite' or 'duckdb' as configured by STORAGE_BACKEND (None for the in-memory frame).
+
+    DuckDB falls back to SQLite when the package is not installed.
+    """
+    backend = config.STORAGE_BACKEND
+    if backend == 'duckdb':
+        return 'duckdb' if duckdb is not None else 'sqlite'
+    return 'sqlite' if backend == 'sqlite' else None
+
+
+def _connect(path: str, engine: str):
+    if engine == 'duckdb':
+        return duckdb.connect(path)
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+def _day(value) -> str:
+    """Date filter value as stored (YYYY-MM-DD), parsed like the in-memory date filter."""
+    return pd.to_datetime(value).strftime('%Y-%m-%d')
+
+
+def _read_meta(path: str, engine: str) -> Optional[dict]:
+    """Import metadata of an existing database (None if missing or unreadable)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = _connect(path, engine)
+        try:
+            return dict(conn.execute("SELECT key, value FROM store_meta").fetchall())
+        finally:
+            conn.close()
+    except Exception:
+        return None
+
+
+def _insert_chunk(conn, engine: str, chunk: pd.DataFrame, columns: List[str]):
+    if engine == 'duckdb':
+        conn.register('metrics_chunk', chunk)
+        conn.execute(f"INSERT INTO metrics SELECT row_id, {', '.join(columns)} FROM metrics_chunk")
+        conn.unregister('metrics_chunk')
+        return
+    placeholders = ', '.join('?' * (len(columns) + 1))
+    # tolist() gives Python scalars; NaN is stored as NULL
+    rows = zip(*(chunk[column].tolist() for column in ['row_id', *columns]))
+    conn.executemany(f"INSERT INTO metrics VALUES ({placeholders})", rows)
+
+
+def import_csv(csv_path: str, path: str, engine: str = 'sqlite') -> dict:
+    """Import metrics.csv into a database at path (built aside, then swapped in atomically)."""
+    from .loader import add_derived_columns
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = _connect(tmp_path, engine)
+    try:
+        if engine == 'sqlite':
+            # A half-written file is discarded anyway, so skip the journal
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+        columns, rows = None, 0
+        numeric_ids = set(ID_COLUMNS)
+        chunks = pd.read_csv(
+            csv_path, dtype={'account_id': str, 'campaign_id': str}, chunksize=IMPORT_CHUNK_ROWS
+        )
+        for chunk in chunks:
+            chunk['date'] = pd.to_datetime(chunk['date']).dt.strftime('%Y-%m-%d')
+            chunk = add_derived_columns(chunk)
+            if columns is None:
+                columns = [name for name, _ in STORE_COLUMNS if name in chunk.columns]
+                types = dict(STORE_COLUMNS)
+                definitions = ', '.join(f"{name} {types[name]}" for name in columns)
+                # SQLite: row_id is the rowid, so the table itself is stored in file order
+                row_id = "BIGINT" if engine == 'duckdb' else "INTEGER PRIMARY KEY"
+                conn.execute(f"CREATE TABLE metrics (row_id {row_id}, {definitions})")
+            for column in list(numeric_ids):
+                ids = chunk[column].dropna() if column in chunk.columns else None
+                if ids is None or pd.to_numeric(ids, errors='coerce').isna().any():
+                    numeric_ids.discard(column)
+            chunk['row_id'] = range(rows, rows + len(chunk))
+            _insert_chunk(conn, engine, chunk, columns)
+            rows += len(chunk)
+        if columns is None:
+            raise ValueError(f"{csv_path} has no header")
+        for column in INDEXED_COLUMNS:
+            if column in columns:
+                conn.execute(f"CREATE INDEX idx_metrics_{column} ON metrics ({column})")
+        if engine == 'sqlite':
+            conn.execute("ANALYZE")
+        stat = os.stat(csv_path)
+        meta = {
+            'format': str(STORE_FORMAT),
+            'source': os.path.abspath(csv_path),
+            'source_mtime': repr(stat.st_mtime),
+            'source_size': str(stat.st_size),
+            'rows': str(rows),
+            'columns': json.dumps(columns),
+            'numeric_ids': json.dumps(sorted(numeric_ids))
+        }
+        conn.execute("CREATE TABLE store_meta (key TEXT, value TEXT)")
+        conn.executemany("INSERT INTO store_meta VALUES (?, ?)", list(meta.items()))
+        conn.commit()
+    except BaseException:
+        conn.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, path)
+    return meta
+
+
+def is_current(meta: Optional[dict], csv_path: str) -> bool:
+    """Whether a database's import metadata still matches the CSV (a missing CSV keeps it)."""
+    if meta is None or meta.get('format') != str(STORE_FORMAT):
+        return False
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return True  # serve the imported data without its source
+    return meta.get('source_mtime') == repr(stat.st_mtime) and meta.get('source_size') == str(stat.st_size)
+
+
+class MetricsStore:
+    """The metrics table in an embedded SQL database (SQLite, or DuckDB when selected).
+
+    Filters, sorting, limit and offset are pushed down as SQL, so only the
+    requested page is materialized and memory use does not grow with the data.
+    """
+
+    def __init__(self, path: str, engine: str, meta: dict):
+        self.path = path
+        self.engine = engine
+        self.meta = meta
+        self.rows = int(meta['rows'])
+        self.columns = json.loads(meta['columns'])
+        self.numeric_ids = set(json.loads(meta['numeric_ids']))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shared = None  # DuckDB: one database handle, a cursor per thread
+        self._campaigns = None
+
+    @classmethod
+    def open(cls, csv_path: str, path: str, engine: str = 'sqlite') -> 'MetricsStore':
+        """Store for csv_path, (re)importing it when the database is missing or stale."""
+        meta = _read_meta(path, engine)
+        if not is_current(meta, csv_path):
+            meta = import_csv(csv_path, path, engine)
+        return cls(path, engine, meta)
+
+    def is_current(self, csv_path: str) -> bool:
+        return is_current(self.meta, csv_path)
+
+    def connection(self):
+        """This thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.engine == 'duckdb':
+                with self._lock:
+                    if self._shared is None:
+                        self._shared = duckdb.connect(self.path, read_only=True)
+                conn = self._shared.cursor()
+            else:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params=()) -> list:
+        return self.connection().execute(sql, list(params)).fetchall()
+
+    def campaign_values(self) -> pd.Index:
+        """Distinct campaign ids (read once from the campaign index)."""
+        if self._campaigns is None:
+            rows = self.execute("SELECT DISTINCT campaign_id FROM metrics WHERE campaign_id IS NOT NULL")
+            self._campaigns = pd.Index(sorted(row[0] for row in rows), dtype=object)
+        return self._campaigns
+
+    def _in_values(self, column: str, values: list) -> Tuple[str, object]:
+        """`column IN (values)` with the list bound as a single parameter."""
+        if self.engine == 'duckdb':
+            return f"{column} IN (SELECT unnest(?))", [str(value) for value in values]
+        return f"{column} IN (SELECT value FROM json_each(?))", json.dumps([str(value) for value in values])
+
+    def where_clause(self, start_date=None, end_date=None, search_term=None, ranges=(),
+                     accounts=None) -> Tuple[str, list]:
+        """SQL WHERE clause and parameters for a planner filter set (see processor.get_filter_set)."""
+        clauses, params = [], []
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(_day(start_date))
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(_day(end_date))
+        if search_term:
+            # Same matching as the in-memory campaign index, then index lookups
+            campaigns = self.campaign_values()
+            matches = campaigns[campaigns.str.contains(search_term, case=False, regex=False)].tolist()
+            clause, param = self._in_values('campaign_id', matches)
+            clauses.append(clause)
+            params.append(param)
+        for column, op, bound in ranges or ():
+            if column in self.columns:
+                clauses.append(f"{column} {SQL_OPERATORS[op]} ?")
+                params.append(bound)
+        if accounts is not None:
+            clause, param = self._in_values('account_id', list(accounts))
+            clauses.append(clause)
+            params.append(param)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, *filter_set) -> int:
+        """Rows matching a filter set."""
+        where, params = self.where_clause(*filter_set)
+        if not where:
+            return self.rows
+        return int(self.execute(f"SELECT COUNT(*) FROM metrics{where}", params)[0][0])
+
+    def page(self, filter_set: tuple, columns: List[str], sort_by: Optional[str] = None,
+             ascending: bool = True, limit: int = 20, offset: int = 0) -> pd.DataFrame:
+        """Rows offset:offset+limit of a filtered (and sorted) query, as a frame.
+
+        Order matches the in-memory path: stable (ties in file order), nulls last.
+        """
+        where, params = self.where_clause(*filter_set)
+        order = "row_id"
+        if sort_by:
+            # Numeric ids sort as numbers, like the in-memory path
+            key = f"CAST({sort_by} AS BIGINT)" if sort_by in self.numeric_ids else sort_by
+            order = f"{key} {'ASC' if ascending else 'DESC'} NULLS LAST, row_id"
+        rows = self.execute(
+            f"SELECT {', '.join(columns)} FROM metrics{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            [*params, limit, offset]
+        )
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def group_sums(self, filter_set: tuple, group_by: List[str], columns: List[str]) -> pd.DataFrame:
+        """Sums of columns (nulls count as 0) and the row count `row_count` per group, as a frame.
+
+        Groups are ordered by their group_by values; without group_by there is
+        one row over all matches.
+        """
+        where, params = self.where_clause(*filter_set)
+        columns = [column for column in columns if column in self.columns]
+        select = [*group_by, *(f"COALESCE(SUM({column}), 0)" for column in columns), "COUNT(*)"]
+        sql = f"SELECT {', '.join(select)} FROM metrics{where}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+        return pd.DataFrame.from_records(self.execute(sql, params), columns=[*group_by, *columns, 'row_count'])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the database file."""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
@@ -0,0 +1,183 @@
+import numpy as np
+from typing import Optional
+from models.models import TimeSeriesQuery, TimeSeriesResponse, TimeSeries
+import pandas as pd
+from .loader import get_dataset_index, get_metrics_store
+from .index import DatasetIndex
+from .planner import filter_row_ids
+from .processor import get_filter_set
+from .aggregates import SUM_COLUMNS, sum_columns, group_codes
+from utils.timing import span
+
+# numpy unit and step (in that unit) of each bucket interval
+INTERVAL_UNITS = {
+    'day': ('D', 1),
+    'week': ('D', 7),
+    'month': ('M', 1)
+}
+# Ratio metrics: (numerator, denominator, scale)
+RATIO_METRICS = {
+    'conversion_rate': ('conversions', 'clicks', 100.0),
+    'ctr': ('clicks', 'impressions', 100.0),
+    'cpc': ('cost_micros', 'clicks', 1.0),
+    'cpa': ('cost_micros', 'conversions', 1.0)
+}
+# Decimals kept in the payload
+VALUE_DECIMALS = 4
+
+
+def bucket_starts(days: np.ndarray, interval: str) -> np.ndarray:
+    """Start of the bucket containing each day (weeks start on Monday)."""
+    if interval == 'month':
+        return days.astype('datetime64[M]')
+    if interval == 'week':
+        # 1970-01-01 was a Thursday, so day + 3 counts days since the previous Monday
+        ordinal = days.astype('int64')
+        return (ordinal - (ordinal + 3) % 7).astype('datetime64[D]')
+    return days
+
+
+def bucket_count(first_day, last_day, interval: str) -> int:
+    """Number of buckets spanned by [first_day, last_day] at an interval."""
+    first, last = bucket_starts(np.array([first_day, last_day]), interval)
+    unit, step = INTERVAL_UNITS[interval]
+    return int((last - first).astype(f'timedelta64[{unit}]').astype('int64')) // step + 1
+
+
+def choose_interval(first_day, last_day, max_points: int) -> str:
+    """Finest interval whose bucket count fits in max_points (month otherwise)."""
+    for interval in ('day', 'week'):
+        if bucket_count(first_day, last_day, interval) <= max_points:
+            return interval
+    return 'month'
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the visual shape."""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    # Inner points are split into threshold - 2 buckets of (almost) equal size
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # The next bucket's average is the third triangle vertex
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        next_x = x[next_start:next_stop].mean()
+        next_y = y[next_start:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def _metric_values(sums: dict, metric: str) -> np.ndarray:
+    """Series values of one metric from per-bucket column sums."""
+    if metric in RATIO_METRICS:
+        numerator, denominator, scale = RATIO_METRICS[metric]
+        top, bottom = sums[numerator], sums[denominator]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(bottom > 0, top / bottom * scale, 0.0)
+        return values
+    return sums[metric]
+
+
+def _build_series(sums: dict, metrics, timestamps, x, max_points: int, downsample: str,
+                  key: Optional[str] = None) -> TimeSeries:
+    """One series, downsampled on its first metric so all metrics stay aligned."""
+    values = {metric: _metric_values(sums, metric) for metric in metrics}
+    if downsample == 'lttb' and len(x) > max_points:
+        keep = lttb_indices(x, values[metrics[0]], max_points)
+        timestamps = timestamps[keep]
+        values = {metric: series[keep] for metric, series in values.items()}
+    return TimeSeries(
+        key=key,
+        timestamps=timestamps.tolist(),
+        values={metric: np.round(series, VALUE_DECIMALS).tolist() for metric, series in values.items()}
+    )
+
+
+def store_day_sums(store, filter_set: tuple, group_by: Optional[str] = None) -> DatasetIndex:
+    """Index over per-day (and per-group) sums from the SQL store.
+
+    Bucket and group sums of these rows equal those of the rows they summarize,
+    so the series are built exactly like the in-memory ones.
+    """
+    with span("filter"):
+        df = store.group_sums(filter_set, ['date'] + ([group_by] if group_by else []), SUM_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    return DatasetIndex(df)
+
+
+def get_time_series(query: TimeSeriesQuery, user: dict, shared: Optional[dict] = None) -> TimeSeriesResponse:
+    """Per-bucket series over the filtered rows (payload bounded by max_points per series)."""
+    filter_set = get_filter_set(query.filters, user)
+    store = get_metrics_store(query.filters.dataset)
+    if store is not None:
+        index, row_ids = store_day_sums(store, filter_set, query.group_by), None
+    else:
+        index: DatasetIndex = get_dataset_index(query.filters.dataset)
+        with span("filter"):
+            row_ids = filter_row_ids(index, *filter_set, shared=shared)
+
+    with span("aggregate"):
+        days = index.dates.astype('datetime64[D]')
+        if row_ids is not None:
+            days = days[row_ids]
+        if len(days) == 0:
+            return TimeSeriesResponse(interval=query.interval or 'day', buckets=0, series=[])
+
+        first_day, last_day = days.min(), days.max()
+        interval = query.interval or choose_interval(first_day, last_day, query.max_points)
+        unit, step = INTERVAL_UNITS[interval]
+        starts = bucket_starts(days, interval)
+        first_bucket = bucket_starts(np.array([first_day]), interval)[0]
+        # Dense bucket codes, so empty buckets are charted as zeros
+        bucket_codes = (starts - first_bucket).astype(f'timedelta64[{unit}]').astype('int64') // step
+        buckets = int(bucket_codes.max()) + 1
+        bucket_times = first_bucket + np.arange(buckets) * np.timedelta64(step, unit)
+        timestamps = np.datetime_as_string(bucket_times.astype('datetime64[D]'), unit='D')
+        x = np.arange(buckets, dtype='float64')
+
+        if not query.group_by:
+            sums = sum_columns(index, row_ids, bucket_codes, buckets)
+            series = [_build_series(sums, query.metrics, timestamps, x, query.max_points, query.downsample)]
+            return TimeSeriesResponse(interval=interval, buckets=buckets, series=series)
+
+        codes, labels = group_codes(index, row_ids, query.group_by)
+        valid = codes >= 0
+        if not valid.all():
+            codes, bucket_codes = codes[valid], bucket_codes[valid]
+            row_ids = (np.arange(index.n) if row_ids is None else row_ids)[valid]
+        # Keep the `top` groups by total of the first metric's base column
+        rank_column = RATIO_METRICS.get(query.metrics[0], (query.metrics[0],))[0]
+        totals = sum_columns(index, row_ids, codes, len(labels))[rank_column]
+        top_groups = [group for group in np.argsort(-totals, kind='stable')[:query.top] if totals[group] > 0]
+
+        # One pass over the rows of the kept groups: combined (group rank, bucket) codes
+        rank = np.full(len(labels), -1, dtype=np.int64)
+        rank[top_groups] = np.arange(len(top_groups))
+        row_rank = rank[codes]
+        kept = row_rank >= 0
+        kept_rows = (np.arange(index.n) if row_ids is None else row_ids)[kept]
+        combined = row_rank[kept] * buckets + bucket_codes[kept]
+        sums = sum_columns(index, kept_rows, combined, len(top_groups) * buckets)
+
+        series = []
+        for position, group in enumerate(top_groups):
+            window = slice(position * buckets, (position + 1) * buckets)
+            group_sums = {column: values[window] for column, values in sums.items()}
+            series.append(_build_series(
+                group_sums, query.metrics, timestamps, x, query.max_points, query.downsample,
+                key=labels[group]
+            ))
+    return TimeSeriesResponse(interval=interval, buckets=buckets, series=series)
@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from models.models import MetricsFilters, RANGE_FILTER_COLUMNS
+from utils.logger import api_logger
+
+# Queries replayed after loading so their code paths and caches are hot: (role, filters)
+WARMUP_QUERIES = (
+    ('admin', {}),
+    ('user', {}),
+    ('admin', {'sort_by': 'date', 'sort_order': 'desc'}),
+    ('admin', {'sort_by': 'impressions', 'sort_order': 'desc'}),
+)
+
+# Steps in execution order (reported as progress by /ready)
+WARMUP_STEPS = ('load', 'index', 'rollups', 'queries')
+
+
+class WarmupState:
+    """Progress of the startup warmup, shared with the readiness endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "pending"  # pending -> running -> ready | failed
+        self.step = None
+        self.completed_steps = []
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+
+    def start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self.completed_steps = []
+            self.error = None
+
+    def begin_step(self, step: str):
+        with self._lock:
+            self.step = step
+
+    def complete_step(self, step: str):
+        with self._lock:
+            self.completed_steps.append(step)
+            self.step = None
+
+    def finish(self, error: Optional[str] = None):
+        with self._lock:
+            self.status = "failed" if error else "ready"
+            self.error = error
+            self.finished_at = time.time()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def snapshot(self) -> dict:
+        """Readiness report: status, progress and dataset details."""
+        from .loader import get_dataset_info
+        with self._lock:
+            report = {
+                "status": self.status,
+                "step": self.step,
+                "progress": round(len(self.completed_steps) / len(WARMUP_STEPS), 2),
+                "completed_steps": list(self.completed_steps),
+                "error": self.error
+            }
+            started_at, finished_at = self.started_at, self.finished_at
+        if started_at:
+            report["started_at"] = datetime.fromtimestamp(started_at, timezone.utc).isoformat()
+            report["duration_seconds"] = round((finished_at or time.time()) - started_at, 3)
+        report["dataset"] = get_dataset_info()
+        return report
+
+
+def warm_up(state: WarmupState):
+    """Load the dataset, build its indexes and rollups and replay common queries."""
+    from .loader import get_dataset_index, get_metrics_store
+    from .processor import get_filtered_metrics
+    from .sketches import get_day_sketches
+
+    state.start()
+    api_logger.log_system_event("WARMUP_STARTED", "Loading dataset and building indexes")
+    try:
+        state.begin_step('load')
+        # The SQL store is imported (and indexed) here; the in-memory frame is left unloaded
+        store = get_metrics_store()
+        index = get_dataset_index() if store is None else None
+        rows = store.rows if store is not None else index.n
+        state.complete_step('load')
+
+        state.begin_step('index')
+        if index is not None:
+            index.build(RANGE_FILTER_COLUMNS)
+        state.complete_step('index')
+
+        state.begin_step('rollups')
+        if index is not None:
+            get_day_sketches(index)
+        state.complete_step('rollups')
+
+        state.begin_step('queries')
+        for role, filters in WARMUP_QUERIES:
+            get_filtered_metrics(MetricsFilters(**filters), {'role': role}, 1, 20)
+        state.complete_step('queries')
+    except Exception as e:
+        state.finish(error=str(e))
+        api_logger.log_system_event("WARMUP_FAILED", str(e), level="ERROR")
+        return
+    state.finish()
+    api_logger.log_system_event(
+        "WARMUP_COMPLETED", f"Ready in {time.time() - state.started_at:.2f}s ({rows} rows)"
+    )
+
+
+# Global warmup state (see main.py lifespan and /ready)
+warmup_state = WarmupState()
@@ -3,5 +3,6 @@ Utility functions and helper modules for common operations.
 """
 
 from .logger import api_logger, APILogger
+from .prometheus import render_metrics
 
-__all__ = ["api_logger", "APILogger"]
\ No newline at end of file
+__all__ = ["api_logger", "APILogger", "render_metrics"]
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Cost-aware admission control.
+Each query is charged an estimated cost against a global and a per-user
+budget. Queries over budget wait (bounded queue, bounded time) for running
+ones to finish; when the wait times out or the queue is full they are
+rejected with a Retry-After hint instead of piling up on the worker.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from utils import config
+
+
+REJECTION_DETAILS = {
+    'user': "Too many expensive queries running for this user",
+    'global': "Server is busy, try again shortly"
+}
+
+
+class AdmissionRejected(Exception):
+    """A query was shed: 429 when the user's own budget is exhausted, 503 when the server is."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Weighted concurrency limits per user and for the whole worker."""
+
+    def __init__(self, global_budget: float, user_budget: float, max_queue: int = 64,
+                 queue_timeout: float = 2.0):
+        self.global_budget = global_budget
+        self.user_budget = user_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_use = 0.0
+        self.waiting = 0
+        self._user_in_use = {}
+        self._waiters = []  # (loop, future) of queued queries, woken on every release
+        self._lock = threading.Lock()
+        self.stats = {'admitted': 0, 'queued': 0, 'rejected_user': 0, 'rejected_global': 0}
+
+    def _blocker(self, user: str, cost: float) -> Optional[str]:
+        """Which budget a query of this cost does not fit in (None if it fits)."""
+        if self._user_in_use.get(user, 0.0) + cost > self.user_budget:
+            return 'user'
+        if self.in_use + cost > self.global_budget:
+            return 'global'
+        return None
+
+    def _charge(self, user: str, cost: float):
+        self.in_use += cost
+        self._user_in_use[user] = self._user_in_use.get(user, 0.0) + cost
+        self.stats['admitted'] += 1
+
+    def _reject(self, blocker: str, detail: str):
+        with self._lock:
+            self.stats['rejected_' + blocker] += 1
+        status_code = 429 if blocker == 'user' else 503
+        raise AdmissionRejected(status_code, detail, max(1, math.ceil(self.queue_timeout)))
+
+    async def acquire(self, user: str, cost: float) -> float:
+        """Wait until the query fits both budgets; returns the cost charged."""
+        # A query costlier than a whole budget still runs, alone
+        cost = min(cost, self.user_budget, self.global_budget)
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.queue_timeout
+        queued = False
+        try:
+            while True:
+                with self._lock:
+                    blocker = self._blocker(user, cost)
+                    if blocker is None:
+                        self._charge(user, cost)
+                        return cost
+                    remaining = deadline - time.monotonic()
+                    queue_full = not queued and self.waiting >= self.max_queue
+                    if remaining > 0 and not queue_full:
+                        if not queued:
+                            queued = True
+                            self.waiting += 1
+                            self.stats['queued'] += 1
+                        waiter = loop.create_future()
+                        self._waiters.append((loop, waiter))
+                if queue_full:
+                    self._reject('global', "Server is busy, too many queued queries")
+                if remaining <= 0:
+                    self._reject(blocker, REJECTION_DETAILS[blocker])
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._lock:
+                        if (loop, waiter) in self._waiters:
+                            self._waiters.remove((loop, waiter))
+        finally:
+            if queued:
+                with self._lock:
+                    self.waiting -= 1
+
+    def release(self, user: str, cost: float):
+        with self._lock:
+            self.in_use = max(0.0, self.in_use - cost)
+            remaining = self._user_in_use.get(user, 0.0) - cost
+            if remaining > 1e-9:
+                self._user_in_use[user] = remaining
+            else:
+                self._user_in_use.pop(user, None)
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    @asynccontextmanager
+    async def admit(self, user: str, cost: float):
+        """Hold `cost` of both budgets for the duration of the block."""
+        charged = await self.acquire(user, cost)
+        try:
+            yield charged
+        finally:
+            self.release(user, charged)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'in_use': round(self.in_use, 3),
+                'global_budget': self.global_budget,
+                'user_budget': self.user_budget,
+                'waiting': self.waiting,
+                **self.stats
+            }
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Global controller for /api/metrics queries (see services.processor.admit_query)
+admission_controller = AdmissionController(
+    config.ADMISSION_GLOBAL_BUDGET,
+    config.ADMISSION_USER_BUDGET,
+    max_queue=config.ADMISSION_MAX_QUEUE,
+    queue_timeout=config.ADMISSION_QUEUE_TIMEOUT_MS / 1000
+)
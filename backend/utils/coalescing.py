@@ -0,0 +1,46 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight computation,
+run in the threadpool so the event loop keeps serving other requests.
+"""
+
+import asyncio
+from typing import Callable, Dict, Hashable, Tuple
+
+from utils.profiler import run_in_threadpool
+
+from utils.logger import api_logger
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and shares its result."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+
+    async def run(self, key: Hashable, func: Callable, *args):
+        """Result of func(*args), joining an identical call that is already running."""
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        task = self._calls.get(call_key)
+        api_logger.record_cache_access(self.name, hit=task is not None)
+        if task is None:
+            # The computation is its own task: a cancelled (disconnected) caller
+            # does not cancel it for the callers that joined it
+            task = loop.create_task(run_in_threadpool(func, *args))
+            self._calls[call_key] = task
+            task.add_done_callback(lambda done: self._finish(call_key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, call_key, task: asyncio.Task):
+        self._calls.pop(call_key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def running(self, key: Hashable) -> bool:
+        """Whether a call with this key is in flight on the current event loop."""
+        return (asyncio.get_running_loop(), key) in self._calls
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,182 @@
+"""
+Response compression helpers.
+Negotiates gzip/brotli/zstd from Accept-Encoding (brotli and zstd only when
+the optional `brotli` / `zstandard` packages are installed) and keeps a small
+cache of serialized payloads with their compressed variants, so repeated
+cache hits are sent without serializing or compressing again.
+"""
+
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Response
+from utils.profiler import run_in_threadpool
+
+from utils import config
+from utils.logger import api_logger
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+# Content types worth compressing (prefix match)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Streams are sent as they are produced and never buffered for compression
+NON_COMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _compress_zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+# Available encoders in server preference order (best ratio/speed first)
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _compress_zstd
+if brotli is not None:
+    ENCODERS["br"] = _compress_brotli
+ENCODERS["gzip"] = _compress_gzip
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best available encoding accepted by the client (None for identity)."""
+    if not config.COMPRESSION_ENABLED or not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = [
+        (accepted.get(encoding, wildcard), -position, encoding)
+        for position, encoding in enumerate(ENCODERS)
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether responses of this content type should be compressed."""
+    content_type = (content_type or "").lower()
+    if content_type.startswith(NON_COMPRESSIBLE_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(";")[0].endswith("+json")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with a negotiated encoding."""
+    return ENCODERS[encoding](body)
+
+
+def _offloaded(body: bytes) -> bool:
+    """Whether compressing a body would block the event loop for long (see COMPRESSION_THREADPOOL_SIZE)."""
+    return len(body) >= config.COMPRESSION_THREADPOOL_SIZE
+
+
+async def compress_async(body: bytes, encoding: str) -> bytes:
+    """compress() for async code: large bodies are compressed in the threadpool."""
+    if _offloaded(body):
+        return await run_in_threadpool(compress, body, encoding)
+    return compress(body, encoding)
+
+
+class CachedPayload:
+    """Serialized response body plus its compressed variants (built on demand)."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.variants = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]):
+        """(body, content-encoding) for the negotiated encoding."""
+        if encoding is None or len(self.body) < config.COMPRESSION_MIN_SIZE:
+            return self.body, None
+        with self._lock:
+            compressed = self.variants.get(encoding)
+        api_logger.record_cache_access("compressed_payload", hit=compressed is not None)
+        if compressed is None:
+            compressed = compress(self.body, encoding)
+            with self._lock:
+                self.variants[encoding] = compressed
+        return compressed, encoding
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+    async def response(self, encoding: Optional[str] = None) -> Response:
+        """Response with the (possibly precompressed) body; large new variants are compressed off the loop."""
+        if encoding is not None and encoding not in self.variants and _offloaded(self.body):
+            body, content_encoding = await run_in_threadpool(self.encoded, encoding)
+        else:
+            body, content_encoding = self.encoded(encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+class PayloadCache:
+    """LRU of serialized responses keyed by request identity."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[CachedPayload]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+        api_logger.record_cache_access("response", hit=payload is not None)
+        return payload
+
+    def put(self, key, body: bytes, media_type: str = "application/json") -> CachedPayload:
+        payload = CachedPayload(body, media_type)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Global cache of serialized query responses
+payload_cache = PayloadCache(config.RESPONSE_CACHE_SIZE)
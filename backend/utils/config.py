@@ -0,0 +1,70 @@
+"""
+Runtime configuration read from environment variables.
+Values are read at import time; tests may monkeypatch the module attributes.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Parse an integer environment variable, falling back to the default."""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Parse a boolean environment variable (1/true/yes/on)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Metrics dataset location (defaults to backend/data/metrics.csv)
+METRICS_CSV_PATH = os.getenv("METRICS_CSV_PATH")
+
+# Named datasets selectable per request: one <name>.csv each (defaults to
+# backend/data/datasets). Loaded datasets beyond the memory budget are evicted
+# least recently used first (0 disables eviction)
+DATASETS_DIR = os.getenv("DATASETS_DIR")
+DATASET_MEMORY_BUDGET_MB = _env_int("DATASET_MEMORY_BUDGET_MB", 2048)
+
+# Where /api/metrics reads rows from: "memory" (the whole CSV as one DataFrame),
+# "sqlite" or "duckdb" (an embedded database imported from the CSV, see
+# services/storage.py). The database defaults to the CSV path with a .sqlite/.duckdb suffix
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").strip().lower()
+STORAGE_DB_PATH = os.getenv("STORAGE_DB_PATH")
+
+# Per-stage timing breakdown in the Server-Timing response header
+SERVER_TIMING_ENABLED = _env_bool("SERVER_TIMING_ENABLED", False)
+
+# Opt-in profiling of slow requests (see middleware/profiling_middleware.py)
+PROFILING_ENABLED = _env_bool("PROFILING_ENABLED", False)
+PROFILING_THRESHOLD_MS = _env_int("PROFILING_THRESHOLD_MS", 500)
+PROFILING_SAMPLE_INTERVAL_MS = _env_int("PROFILING_SAMPLE_INTERVAL_MS", 5)
+PROFILING_MAX_PROFILES = _env_int("PROFILING_MAX_PROFILES", 20)
+PROFILING_PATHS = tuple(
+    path.strip() for path in os.getenv("PROFILING_PATHS", "/api/metrics").split(",") if path.strip()
+)
+
+# Response compression (gzip always; br/zstd when brotli/zstandard are installed)
+COMPRESSION_ENABLED = _env_bool("COMPRESSION_ENABLED", True)
+COMPRESSION_MIN_SIZE = _env_int("COMPRESSION_MIN_SIZE", 1024)
+# Bodies this large are compressed in the threadpool instead of on the event loop
+COMPRESSION_THREADPOOL_SIZE = _env_int("COMPRESSION_THREADPOOL_SIZE", 65536)
+# Serialized (and compressed) /api/metrics responses kept for repeated queries
+RESPONSE_CACHE_SIZE = _env_int("RESPONSE_CACHE_SIZE", 64)
+
+# Load the dataset, build indexes/rollups and replay common queries at startup (see /ready)
+WARMUP_ENABLED = _env_bool("WARMUP_ENABLED", True)
+
+# Admission control for /api/metrics (see utils/admission.py). Budgets are in
+# cost units: 1 per query plus 1 per ADMISSION_ROWS_PER_UNIT rows scanned or sorted
+ADMISSION_ENABLED = _env_bool("ADMISSION_ENABLED", True)
+ADMISSION_GLOBAL_BUDGET = _env_int("ADMISSION_GLOBAL_BUDGET", 16)
+ADMISSION_USER_BUDGET = _env_int("ADMISSION_USER_BUDGET", 8)
+ADMISSION_ROWS_PER_UNIT = _env_int("ADMISSION_ROWS_PER_UNIT", 250000)
+ADMISSION_MAX_QUEUE = _env_int("ADMISSION_MAX_QUEUE", 64)
+ADMISSION_QUEUE_TIMEOUT_MS = _env_int("ADMISSION_QUEUE_TIMEOUT_MS", 2000)
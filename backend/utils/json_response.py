@@ -0,0 +1,67 @@
+"""
+Fast JSON encoding for API responses.
+Uses orjson when it is installed (NumPy arrays and scalars, dates and
+datetimes are encoded natively) and falls back to the stdlib encoder with the
+same conversions otherwise. Pydantic models are dumped in JSON mode.
+"""
+
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value: Any):
+    """Conversions for types neither encoder handles natively."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    # NumPy values only exist once the data path imported it; never import it here
+    np = sys.modules.get('numpy')
+    if np is None:
+        pass
+    elif isinstance(value, np.ndarray):
+        if value.dtype.kind == 'M':
+            return np.datetime_as_string(value, unit='D' if value.dtype == 'datetime64[D]' else 's').tolist()
+        if value.dtype.kind == 'f' and np.isnan(value).any():
+            value = np.where(np.isnan(value), None, value)
+        return value.tolist()
+    elif isinstance(value, np.generic):
+        value = value.item()
+        return None if isinstance(value, float) and value != value else value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        """Encode content as compact UTF-8 JSON."""
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Encode content as compact UTF-8 JSON."""
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast encoder (application default, see main.py)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,152 @@
+"""
+Server-sent events fan-out for the real-time logs dashboard.
+Pushes new log entries and periodic stat deltas to every subscriber.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from .logger import api_logger, APILogger
+
+# Per-subscriber buffer: a slow client loses its oldest events, never blocks the server
+SUBSCRIBER_BUFFER_SIZE = 100
+STATS_INTERVAL_SECONDS = 3.0
+HEARTBEAT_SECONDS = 15.0
+
+
+def format_log_entry(log: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact view of a log entry used by the dashboard (JSON and SSE)."""
+    return {
+        "time": log["time_formatted"],
+        "method": log["method"],
+        "path": log["path"],
+        "status": log["status_code"],
+        "user": log["user"],
+        "response_time": f"{log['response_time_ms']}ms" if log["response_time_ms"] else "N/A",
+        "level": log["level"]
+    }
+
+
+def format_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard view of APILogger.get_stats()."""
+    return {
+        "total_requests": stats["total_requests"],
+        "success_rate": f"{stats['success_rate']}%",
+        "average_response_time": f"{stats['average_response_time']}ms",
+        "status_codes": stats["status_codes"],
+        "logs_in_memory": stats["active_logs_count"]
+    }
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _Subscriber:
+    """Bounded event buffer for a single client."""
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event: str, data: Any):
+        """Enqueue an event, discarding the oldest one when the buffer is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((event, data))
+
+
+class LogBroadcaster:
+    """Fan-out of APILogger entries and stat deltas to SSE subscribers."""
+
+    def __init__(self, logger: APILogger, buffer_size: int = SUBSCRIBER_BUFFER_SIZE,
+                 stats_interval: float = STATS_INTERVAL_SECONDS):
+        self.logger = logger
+        self.buffer_size = buffer_size
+        self.stats_interval = stats_interval
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats_task: Optional[asyncio.Task] = None
+        self._last_stats: Dict[str, Any] = {}
+        logger.add_listener(self.publish)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, log_entry: Dict[str, Any]):
+        """Logger callback - may run on the event loop or in a worker thread."""
+        loop = self._loop
+        if not self._subscribers or loop is None or loop.is_closed():
+            return
+        data = format_log_entry(log_entry)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout("log", data)
+        else:
+            loop.call_soon_threadsafe(self._fanout, "log", data)
+
+    def _fanout(self, event: str, data: Any):
+        for subscriber in list(self._subscribers):
+            subscriber.put(event, data)
+
+    def _subscribe(self) -> _Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = _Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        if self._stats_task is None or self._stats_task.done():
+            self._last_stats = format_stats(self.logger.get_stats())
+            self._stats_task = self._loop.create_task(self._stats_loop())
+        return subscriber
+
+    def _unsubscribe(self, subscriber: _Subscriber):
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._stats_task is not None:
+            self._stats_task.cancel()
+            self._stats_task = None
+
+    async def _stats_loop(self):
+        """Compute stats once per interval for all subscribers, send only changes."""
+        while self._subscribers:
+            await asyncio.sleep(self.stats_interval)
+            stats = format_stats(self.logger.get_stats())
+            delta = {key: value for key, value in stats.items()
+                     if self._last_stats.get(key) != value}
+            self._last_stats = stats
+            if delta:
+                self._fanout("stats", delta)
+
+    async def stream(self, request=None, heartbeat: float = HEARTBEAT_SECONDS):
+        """Async generator of SSE frames: a snapshot, then live log/stats events."""
+        subscriber = self._subscribe()
+        try:
+            yield format_sse("snapshot", {
+                "statistics": self._last_stats,
+                "recent_requests": [
+                    format_log_entry(log) for log in self.logger.get_recent_logs(limit=20)
+                ]
+            })
+            while True:
+                if request is not None and await request.is_disconnected():
+                    break
+                try:
+                    event, data = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscriber.dropped:
+                    yield format_sse("dropped", {"count": subscriber.dropped})
+                    subscriber.dropped = 0
+                yield format_sse(event, data)
+        finally:
+            self._unsubscribe(subscriber)
+
+
+# Global broadcaster attached to the global logger
+log_broadcaster = LogBroadcaster(api_logger)
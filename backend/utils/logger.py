@@ -4,11 +4,17 @@ Captures HTTP requests, responses, and system events.
 """
 
 import logging
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Any
 from collections import deque
+from itertools import islice
 import json
 
+# Latency histogram bucket bounds in seconds (Prometheus-style cumulative buckets)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
 class APILogger:
     """Ultra-fast thread-safe logger optimized for high performance."""
     
@@ -20,6 +26,20 @@ class APILogger:
             'success_count': 0,
             'response_times': deque(maxlen=20)  # Only keep last 20 for avg calculation
         }
+        
+        # Monotonic counters for the Prometheus exposition (never reset by the buffer)
+        self._lock = threading.Lock()
+        self.start_time = time.time()
+        self.request_counts = {}  # (method, route, status_code) -> count
+        self.latency_histograms = {}  # route -> [bucket counts..., +Inf count, sum]
+        self.cache_stats = {}  # cache name -> {'hits': n, 'misses': n}
+        self.stage_stats = {}  # (route, stage) -> [count, total seconds]
+        self.dataset_stats = {
+            'loads': 0,
+            'last_load_seconds': 0.0
+        }
+        self.dataset_gauges = {}  # resident dataset -> {'rows': n, 'memory_bytes': n}
+        self._listeners = []  # callbacks notified of every new log entry
         self.setup_logging()
     
     def setup_logging(self):
@@ -27,9 +47,27 @@ class APILogger:
         self.logger = logging.getLogger("marketing_api")
         self.logger.setLevel(logging.INFO)
     
+    def add_listener(self, callback):
+        """Register a callback invoked with each new log entry (push consumers)."""
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Unregister a log entry callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify_listeners(self, log_entry: Dict[str, Any]):
+        """Push a new entry to listeners; a failing listener never breaks logging."""
+        for listener in self._listeners:
+            try:
+                listener(log_entry)
+            except Exception:
+                pass
+    
     def log_request(self, method: str, path: str, client_ip: str, 
                    status_code: int, response_time: float = None, 
-                   user_email: str = None, error: str = None):
+                   user_email: str = None, error: str = None,
+                   route: str = None):
         """Optimized request logging with minimal overhead."""
         
         timestamp = datetime.now()
@@ -62,9 +100,12 @@ class APILogger:
                 self.stats['success_count'] += 1
             if response_time_ms:
                 self.stats['response_times'].append(response_time_ms)
+            self._record_request_metrics(method, route or path.split("?", 1)[0],
+                                         status_code, response_time)
         
         # Add to buffer
         self.logs.append(log_entry)
+        self._notify_listeners(log_entry)
         
         # Log to Python logger (como antes)
         log_message = f"{method} {path} - {status_code} - {client_ip}"
@@ -80,8 +121,72 @@ class APILogger:
         else:
             self.logger.info(log_message)
     
-    def log_system_event(self, event: str, details: str = None):
-        """Log system events (startup, errors, etc.)."""
+    def _record_request_metrics(self, method: str, route: str, status_code: int,
+                                response_time: float = None):
+        """Update request counters and the latency histogram for a route."""
+        with self._lock:
+            key = (method, route, status_code)
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+            
+            if response_time is None:
+                return
+            histogram = self.latency_histograms.get(route)
+            if histogram is None:
+                histogram = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+                self.latency_histograms[route] = histogram
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if response_time <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(LATENCY_BUCKETS)] += 1
+            histogram[-1] += response_time
+    
+    def record_cache_access(self, cache: str, hit: bool):
+        """Count a hit or miss for a named cache (dataset, query, ...)."""
+        with self._lock:
+            stats = self.cache_stats.setdefault(cache, {'hits': 0, 'misses': 0})
+            stats['hits' if hit else 'misses'] += 1
+    
+    def record_dataset_load(self, duration: float, rows: int, memory_bytes: int = 0, dataset: str = 'default'):
+        """Record a completed dataset (re)load."""
+        with self._lock:
+            self.dataset_stats['loads'] += 1
+            self.dataset_stats['last_load_seconds'] = duration
+            self.dataset_gauges[dataset] = {'rows': rows, 'memory_bytes': memory_bytes}
+    
+    def record_dataset_eviction(self, dataset: str):
+        """Drop the gauges of a dataset that is no longer resident."""
+        with self._lock:
+            self.dataset_gauges.pop(dataset, None)
+    
+    def record_stage_timings(self, route: str, spans: Dict[str, float]):
+        """Accumulate per-stage durations (seconds) of one request."""
+        with self._lock:
+            for stage, duration in spans.items():
+                stats = self.stage_stats.setdefault((route, stage), [0, 0.0])
+                stats[0] += 1
+                stats[1] += duration
+    
+    def get_metrics_snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the monotonic counters for exporters."""
+        with self._lock:
+            return {
+                "start_time": self.start_time,
+                "request_counts": dict(self.request_counts),
+                "latency_histograms": {
+                    route: list(hist) for route, hist in self.latency_histograms.items()
+                },
+                "cache_stats": {
+                    name: dict(stats) for name, stats in self.cache_stats.items()
+                },
+                "dataset_stats": dict(self.dataset_stats),
+                "dataset_gauges": {name: dict(gauges) for name, gauges in self.dataset_gauges.items()},
+                "stage_stats": {key: list(stats) for key, stats in self.stage_stats.items()}
+            }
+    
+    def log_system_event(self, event: str, details: str = None, level: str = "INFO"):
+        """Log system events (startup, errors, etc.); level is INFO or ERROR."""
         
         timestamp = datetime.now()
         
@@ -91,27 +196,25 @@ class APILogger:
             "method": "SYSTEM",
             "path": event,
             "client_ip": "internal",
-            "status_code": 200,
-            "level": "INFO",
+            "status_code": 500 if level == "ERROR" else 200,
+            "level": level,
             "response_time_ms": None,
             "user": "system",
             "error": details
         }
         
         self.logs.append(log_entry)
-        self.logger.info(f"SYSTEM EVENT: {event}" + (f" - {details}" if details else ""))
+        self._notify_listeners(log_entry)
+        message = f"SYSTEM EVENT: {event}" + (f" - {details}" if details else "")
+        if level == "ERROR":
+            self.logger.error(message)
+        else:
+            self.logger.info(message)
     
     def get_recent_logs(self, limit: int = None) -> List[Dict[str, Any]]:
         """Get recent logs (most recent first)."""
-        logs_list = list(self.logs)
-        
-        # Reverse to show most recent first
-        logs_list.reverse()
-        
-        if limit:
-            logs_list = logs_list[:limit]
-            
-        return logs_list
+        # Walk the deque from the right so only `limit` entries are copied
+        return list(islice(reversed(self.logs), limit or None))
     
     def get_stats(self) -> Dict[str, Any]:
         """Get pre-calculated stats for maximum performance."""
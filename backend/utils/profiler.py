@@ -0,0 +1,224 @@
+"""
+Low-overhead request profiling for diagnosing slow requests in production.
+A single background thread samples the stacks of threads serving profiled
+requests; cProfile is used only for explicitly flagged requests.
+"""
+
+import cProfile
+import functools
+import io
+import itertools
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+from . import config
+
+MAX_STACK_DEPTH = 64
+TOP_STACKS = 50
+
+
+def _collapse_stack(frame) -> str:
+    """Collapse a frame chain into 'module:function;...' (root first)."""
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        parts.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class SamplingSession:
+    """Stack samples collected for one request."""
+
+    def __init__(self, thread_ids):
+        self.thread_ids = set(thread_ids)
+        self.samples = Counter()
+        self.sample_count = 0
+
+    def attach_thread(self, thread_id: int):
+        """Also sample a worker thread doing work for this request."""
+        self.thread_ids.add(thread_id)
+
+    def detach_thread(self, thread_id: int):
+        """Stop sampling a worker thread once it is done with this request."""
+        self.thread_ids.discard(thread_id)
+
+
+class StackSampler:
+    """Shared sampling thread; idle (blocked on an event) when nothing is profiled."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start_session(self, thread_id: Optional[int] = None) -> SamplingSession:
+        session = SamplingSession([thread_id or threading.get_ident()])
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="request-stack-sampler", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+        return session
+
+    def stop_session(self, session: SamplingSession) -> SamplingSession:
+        with self._lock:
+            self._sessions.discard(session)
+        return session
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            for session in sessions:
+                for thread_id in list(session.thread_ids):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        session.samples[_collapse_stack(frame)] += 1
+                session.sample_count += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class CProfileSession:
+    """Deterministic profile of a flagged request (higher overhead)."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.worker_profilers = []
+        self._lock = threading.Lock()
+        self.profiler.enable()
+
+    @contextmanager
+    def worker_thread(self):
+        """Profile the calling worker thread too (cProfile only sees the thread it runs in)."""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.worker_profilers.append(profiler)
+
+    def stop(self, limit: int = 40) -> str:
+        self.profiler.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=output)
+        with self._lock:
+            for profiler in self.worker_profilers:
+                stats.add(profiler)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+
+# (sampling session, cProfile session or None) of the request being served,
+# set by the profiling middleware
+request_profile: ContextVar[Optional[tuple]] = ContextVar("request_profile", default=None)
+
+
+def profiled(func: Callable) -> Callable:
+    """func, profiled with the current request when it runs in a worker thread."""
+    profile = request_profile.get()
+    if profile is None:
+        return func
+    session, cprofile_session = profile
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        attached = thread_id not in session.thread_ids
+        session.attach_thread(thread_id)
+        try:
+            if cprofile_session is None:
+                return func(*args, **kwargs)
+            with cprofile_session.worker_thread():
+                return func(*args, **kwargs)
+        finally:
+            if attached:
+                session.detach_thread(thread_id)
+    return run
+
+
+async def run_in_threadpool(func: Callable, *args, **kwargs):
+    """starlette's run_in_threadpool, with the worker thread profiled along with the request."""
+    return await _run_in_threadpool(profiled(func), *args, **kwargs)
+
+
+class ProfileStore:
+    """Bounded in-memory store of the most recent request profiles."""
+
+    def __init__(self, max_profiles: int = 20):
+        self.profiles = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, method: str, path: str, duration: float, mode: str,
+            user: Optional[str] = None, session: Optional[SamplingSession] = None,
+            stats_text: Optional[str] = None) -> Dict[str, Any]:
+        profile = {
+            "id": next(self._ids),
+            "timestamp": datetime.now().isoformat(),
+            "method": method,
+            "path": path,
+            "user": user or "anonymous",
+            "duration_ms": round(duration * 1000, 2),
+            "mode": mode
+        }
+        if session is not None:
+            profile["sample_count"] = session.sample_count
+            profile["stacks"] = [
+                {"stack": stack, "samples": count}
+                for stack, count in session.samples.most_common(TOP_STACKS)
+            ]
+        if stats_text is not None:
+            profile["cprofile"] = stats_text
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Profile summaries, most recent first."""
+        with self._lock:
+            profiles = list(self.profiles)
+        return [
+            {key: value for key, value in profile.items() if key not in ("stacks", "cprofile")}
+            for profile in reversed(profiles)
+        ]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for profile in self.profiles:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+    def clear(self):
+        with self._lock:
+            self.profiles.clear()
+
+
+# Global sampler and store shared by the middleware and the admin endpoints
+stack_sampler = StackSampler(interval=config.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+profile_store = ProfileStore(max_profiles=config.PROFILING_MAX_PROFILES)
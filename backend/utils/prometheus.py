@@ -0,0 +1,121 @@
+"""
+Prometheus text exposition for the API monitoring counters.
+Renders the counters kept by APILogger in the text format (version 0.0.4).
+"""
+
+import os
+import time
+from typing import List
+
+from .logger import APILogger, LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "marketing_api"
+
+
+def _escape(value) -> str:
+    """Escape a label value according to the exposition format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_float(value: float) -> str:
+    """Format a sample value (integers without trailing .0)."""
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def get_process_memory_bytes() -> int:
+    """Resident set size of the current process in bytes (0 if unavailable)."""
+    try:
+        # Linux: current RSS from /proc (cheap, no extra dependency)
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        pass
+    try:
+        # Fallback: peak RSS (kilobytes on Linux, bytes on macOS)
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+    except Exception:
+        return 0
+
+
+def render_metrics(logger: APILogger) -> str:
+    """Render all monitoring counters in Prometheus text format."""
+    snapshot = logger.get_metrics_snapshot()
+    lines: List[str] = []
+
+    def header(name: str, metric_type: str, help_text: str):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {metric_type}")
+
+    # Request counts
+    header("requests_total", "counter", "Total HTTP requests by method, route and status.")
+    for (method, route, status_code), count in sorted(snapshot["request_counts"].items()):
+        lines.append(
+            f'{PREFIX}_requests_total{{method="{_escape(method)}",'
+            f'route="{_escape(route)}",status="{status_code}"}} {count}'
+        )
+
+    # Latency histograms (stored per bucket, exposed cumulatively)
+    header("request_duration_seconds", "histogram", "HTTP request latency by route.")
+    for route, histogram in sorted(snapshot["latency_histograms"].items()):
+        label = f'route="{_escape(route)}"'
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram):
+            cumulative += count
+            lines.append(
+                f'{PREFIX}_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+            )
+        cumulative += histogram[len(LATENCY_BUCKETS)]
+        lines.append(f'{PREFIX}_request_duration_seconds_bucket{{{label},le="+Inf"}} {cumulative}')
+        lines.append(f"{PREFIX}_request_duration_seconds_sum{{{label}}} {histogram[-1]:.6f}")
+        lines.append(f"{PREFIX}_request_duration_seconds_count{{{label}}} {cumulative}")
+
+    # Per-stage timings (only populated when Server-Timing is enabled)
+    header("stage_duration_seconds", "summary", "Time spent per request stage and route.")
+    for (route, stage), (count, total) in sorted(snapshot["stage_stats"].items()):
+        label = f'route="{_escape(route)}",stage="{_escape(stage)}"'
+        lines.append(f"{PREFIX}_stage_duration_seconds_sum{{{label}}} {total:.6f}")
+        lines.append(f"{PREFIX}_stage_duration_seconds_count{{{label}}} {count}")
+
+    # Dataset
+    dataset = snapshot["dataset_stats"]
+    header("dataset_loads_total", "counter", "Number of times the metrics dataset was (re)loaded.")
+    lines.append(f"{PREFIX}_dataset_loads_total {dataset['loads']}")
+    header("dataset_load_seconds", "gauge", "Duration of the most recent dataset load.")
+    lines.append(f"{PREFIX}_dataset_load_seconds {dataset['last_load_seconds']:.6f}")
+    gauges = sorted(snapshot["dataset_gauges"].items())
+    header("dataset_rows", "gauge", "Rows in each loaded dataset.")
+    for name, values in gauges:
+        lines.append(f'{PREFIX}_dataset_rows{{dataset="{_escape(name)}"}} {values["rows"]}')
+    header("dataset_memory_bytes", "gauge", "In-memory size of each loaded dataset.")
+    for name, values in gauges:
+        lines.append(f'{PREFIX}_dataset_memory_bytes{{dataset="{_escape(name)}"}} {values["memory_bytes"]}')
+
+    # Caches
+    header("cache_hits_total", "counter", "Cache hits by cache name.")
+    for name, stats in sorted(snapshot["cache_stats"].items()):
+        lines.append(f'{PREFIX}_cache_hits_total{{cache="{_escape(name)}"}} {stats["hits"]}')
+    header("cache_misses_total", "counter", "Cache misses by cache name.")
+    for name, stats in sorted(snapshot["cache_stats"].items()):
+        lines.append(f'{PREFIX}_cache_misses_total{{cache="{_escape(name)}"}} {stats["misses"]}')
+    header("cache_hit_ratio", "gauge", "Cache hit ratio by cache name (0-1).")
+    for name, stats in sorted(snapshot["cache_stats"].items()):
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0.0
+        lines.append(f'{PREFIX}_cache_hit_ratio{{cache="{_escape(name)}"}} {_format_float(round(ratio, 6))}')
+
+    # Process
+    header("process_resident_memory_bytes", "gauge", "Resident memory size in bytes.")
+    lines.append(f"{PREFIX}_process_resident_memory_bytes {get_process_memory_bytes()}")
+    header("process_start_time_seconds", "gauge", "Start time of the process since unix epoch.")
+    lines.append(f"{PREFIX}_process_start_time_seconds {snapshot['start_time']:.3f}")
+    header("uptime_seconds", "gauge", "Seconds since the API logger was created.")
+    lines.append(f"{PREFIX}_uptime_seconds {time.time() - snapshot['start_time']:.3f}")
+
+    return "\n".join(lines) + "\n"
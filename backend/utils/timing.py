@@ -0,0 +1,46 @@
+"""
+Lightweight per-request stage timing (Server-Timing header).
+Spans are no-ops unless the middleware started a timing context for the request.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Mutable dict shared by the request task and any worker threads it spawns
+_request_spans: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_spans", default=None)
+
+
+def start_request_timing() -> Dict[str, float]:
+    """Begin collecting spans for the current request."""
+    spans: Dict[str, float] = {}
+    _request_spans.set(spans)
+    return spans
+
+
+def stop_request_timing():
+    """Stop collecting spans in the current context."""
+    _request_spans.set(None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a block and add it to the request's stage totals (if timing is on)."""
+    spans = _request_spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans[name] = spans.get(name, 0.0) + (time.perf_counter() - start)
+
+
+def format_server_timing(spans: Dict[str, float], total: Optional[float] = None) -> str:
+    """Render spans (seconds) as a Server-Timing header value (milliseconds)."""
+    parts = [f"{name};dur={duration * 1000:.3f}" for name, duration in spans.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts)
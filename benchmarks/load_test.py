@@ -0,0 +1,241 @@
+"""
+Load-testing harness with a local mock client fleet.
+
+Starts the API with uvicorn (unless --url points at a running instance),
+logs every virtual user in through /api/login and replays the weighted
+request mix of a scenario file for a fixed duration. Reports throughput,
+latency percentiles and error rates per request type.
+
+Usage:
+    python benchmarks/load_test.py --scenario benchmarks/scenarios/dashboard.json \
+        --concurrency 50 --duration 30 --rows 1000000 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCH_DIR, '..', 'backend')
+# Seconds to wait for the server to load and warm its dataset
+STARTUP_TIMEOUT = 300
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _render(value, rng):
+    """Expand scenario placeholders: {"choice": [...]} and {"randint": [a, b]}."""
+    if isinstance(value, dict):
+        if set(value) == {"choice"}:
+            return rng.choice(value["choice"])
+        if set(value) == {"randint"}:
+            return rng.randint(*value["randint"])
+        return {key: _render(item, rng) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_render(item, rng) for item in value]
+    return value
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies, statuses, errors, elapsed):
+    ordered = sorted(latencies)
+    total = len(ordered)
+    failed = sum(count for status, count in statuses.items() if status >= 400) + errors
+    return {
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "transport_errors": errors,
+        "latency_ms": {
+            "p50": round(_percentile(ordered, 50), 2),
+            "p90": round(_percentile(ordered, 90), 2),
+            "p95": round(_percentile(ordered, 95), 2),
+            "p99": round(_percentile(ordered, 99), 2),
+            "max": round(ordered[-1], 2) if ordered else 0.0,
+            "mean": round(sum(ordered) / total, 2) if total else 0.0
+        }
+    }
+
+
+class LoadTest:
+    """Runs a scenario against base_url with `concurrency` virtual users."""
+
+    def __init__(self, base_url, scenario, concurrency, duration, seed=42):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.concurrency = concurrency
+        self.duration = duration
+        self.seed = seed
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    async def _login(self, client, credentials):
+        response = await client.post("/api/login", json=credentials)
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def _virtual_user(self, user_id, client, deadline):
+        rng = random.Random(self.seed + user_id)
+        users = self.scenario["users"]
+        headers = await self._login(client, users[user_id % len(users)])
+        requests = self.scenario["requests"]
+        weights = [request.get("weight", 1) for request in requests]
+        think_min, think_max = self.scenario.get("think_time_ms", [0, 0])
+
+        while time.perf_counter() < deadline:
+            template = rng.choices(requests, weights=weights)[0]
+            name = template.get("name", template["path"])
+            body = _render(template.get("json"), rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    template.get("method", "GET"), template["path"], json=body, headers=headers
+                )
+                self.statuses[name][response.status_code] += 1
+            except httpx.HTTPError:
+                self.errors[name] += 1
+            self.latencies[name].append((time.perf_counter() - start) * 1000)
+            if think_max:
+                await asyncio.sleep(rng.uniform(think_min, think_max) / 1000)
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as client:
+            start = time.perf_counter()
+            deadline = start + self.duration
+            await asyncio.gather(*(
+                self._virtual_user(user_id, client, deadline) for user_id in range(self.concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        all_statuses = Counter()
+        for statuses in self.statuses.values():
+            all_statuses.update(statuses)
+        return {
+            "scenario": self.scenario.get("name"),
+            "concurrency": self.concurrency,
+            "duration_s": round(elapsed, 2),
+            "overall": _summarize(all_latencies, all_statuses, sum(self.errors.values()), elapsed),
+            "by_request": {
+                name: _summarize(values, self.statuses[name], self.errors[name], elapsed)
+                for name, values in sorted(self.latencies.items())
+            }
+        }
+
+
+def start_server(port, workers, csv_path=None):
+    """Start uvicorn on localhost and wait until /ready reports the dataset warm."""
+    env = dict(os.environ)
+    if csv_path:
+        env["METRICS_CSV_PATH"] = os.path.abspath(csv_path)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = time.time() + STARTUP_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"uvicorn did not become ready within {STARTUP_TIMEOUT}s")
+
+
+def warmup(base_url, scenario):
+    """Log in once and hit every request type so the dataset is loaded before measuring."""
+    rng = random.Random(0)
+    with httpx.Client(base_url=base_url, timeout=300) as client:
+        token = client.post("/api/login", json=scenario["users"][0]).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for template in scenario["requests"]:
+            client.request(template.get("method", "GET"), template["path"],
+                           json=_render(template.get("json"), rng), headers=headers)
+
+
+def print_report(report):
+    print(f"\nScenario '{report['scenario']}' - {report['concurrency']} users, {report['duration_s']}s")
+    header = f"{'request':22s} {'count':>8s} {'rps':>8s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["by_request"].items()) + [("TOTAL", report["overall"])]
+    for name, stats in rows:
+        latency = stats["latency_ms"]
+        print(f"{name:22s} {stats['requests']:8d} {stats['throughput_rps']:8.1f} "
+              f"{stats['error_rate'] * 100:6.2f} {latency['p50']:8.1f} {latency['p95']:8.1f} "
+              f"{latency['p99']:8.1f} {latency['max']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the metrics API")
+    parser.add_argument("--scenario", default=os.path.join(BENCH_DIR, "scenarios", "dashboard.json"))
+    parser.add_argument("--concurrency", type=int, default=20, help="number of virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="test duration in seconds")
+    parser.add_argument("--url", help="target an already running instance instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--rows", type=int, help="serve a synthetic dataset of this many rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup", action="store_true", help="send one request before measuring")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        csv_path = None
+        if args.rows:
+            sys.path.insert(0, BENCH_DIR)
+            sys.path.insert(0, BACKEND_DIR)
+            from run_benchmarks import _dataset_path
+            csv_path = _dataset_path(args.rows, args.seed)
+        port = _free_port()
+        process = start_server(port, args.workers, csv_path)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        if args.warmup:
+            warmup(base_url, scenario)
+        report = asyncio.run(LoadTest(base_url, scenario, args.concurrency, args.duration, args.seed).run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
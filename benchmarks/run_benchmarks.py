@@ -0,0 +1,205 @@
+"""
+Reproducible benchmark suite for the metrics pipeline.
+
+Generates a deterministic synthetic dataset (services.sample.create_synthetic_data),
+times each pipeline stage and the end-to-end /api/metrics endpoint, and writes
+JSON results that can be compared across commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 1000000 --output bench.json
+    python benchmarks/run_benchmarks.py --rows 1000000 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.data')
+
+
+def _git_commit():
+    """Current commit hash (or None outside a git checkout)."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _measure(func, repeat):
+    """Run func `repeat` times and summarize wall-clock durations in ms."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "repeat": repeat
+    }
+
+
+def _dataset_path(rows, seed):
+    """Cached synthetic CSV for (rows, seed); generated on first use."""
+    from services.sample import write_synthetic_csv
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"metrics_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {rows:,} synthetic rows (seed={seed})...")
+        tmp_path = path + ".tmp"
+        write_synthetic_csv(tmp_path, rows, seed=seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def run_suite(rows, seed, repeat):
+    """Time every pipeline stage against a synthetic dataset of `rows` rows."""
+    from fastapi.testclient import TestClient
+    from auth import create_access_token
+    from main import app
+    from models import MetricsFilters
+    from services import loader, planner
+    from services import processor
+    from services.filters import filter_metrics_by_date, search_metrics, sort_metrics
+
+    csv_path = _dataset_path(rows, seed)
+    loader._get_csv_path = lambda: csv_path
+
+    def cold_load():
+        loader.clear_cache()
+        loader.load_metrics_data()
+
+    results = {"load_csv": _measure(cold_load, max(1, min(repeat, 3)))}
+    df = loader.load_metrics_data()
+    rows_loaded = len(df)
+
+    # Filtering stages (uncached)
+    mid_date = df['date'].iloc[len(df) // 2].strftime('%Y-%m-%d')
+    end_date = df['date'].iloc[len(df) * 3 // 4].strftime('%Y-%m-%d')
+    search_term = str(df['campaign_id'].iloc[0])[-4:]
+    results["filter_date_range"] = _measure(
+        lambda: filter_metrics_by_date(df, mid_date, end_date), repeat)
+    results["filter_search"] = _measure(
+        lambda: search_metrics(df.drop(columns=['campaign_name'], errors='ignore'), search_term), repeat)
+    results["loader_filtered_uncached"] = _measure(
+        lambda: (planner.clear_result_cache(),
+                 loader.load_metrics_data_filtered(mid_date, end_date, search_term)), repeat)
+
+    # Sorting
+    results["sort_impressions_desc"] = _measure(
+        lambda: sort_metrics(df.copy(), "impressions", "desc"), repeat)
+    results["sort_date_asc"] = _measure(lambda: sort_metrics(df.copy(), "date", "asc"), repeat)
+    index = loader.get_dataset_index()
+    results["sort_row_ids_top_page"] = _measure(
+        lambda: planner.sort_row_ids(index, None, "impressions", ascending=False, limit=100), repeat)
+
+    # Pagination at increasing depths (full processor path, unsorted)
+    admin = {"email": "bench@company.com", "role": "admin"}
+    page_size = 100
+    last_page = max(1, (rows_loaded - 1) // page_size + 1)
+    for label, page in (("first", 1), ("middle", last_page // 2 or 1), ("last", last_page)):
+        results[f"paginate_{label}_page"] = _measure(
+            lambda page=page: processor.get_filtered_metrics(MetricsFilters(), admin, page, page_size),
+            repeat)
+
+    # Serialization of one page to response models and JSON
+    page_df = df.iloc[:1000]
+    results["serialize_1000_rows"] = _measure(
+        lambda: processor.MetricsResponse(
+            metrics=processor._build_metrics_list(page_df, True),
+            total_count=rows_loaded, page=1, page_size=1000, total_pages=1
+        ).model_dump_json(), repeat)
+
+    # End-to-end through the ASGI app
+    client = TestClient(app)
+    token = create_access_token(data={"sub": "user1@company.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    scenarios = {
+        "e2e_unfiltered_page1": {},
+        "e2e_date_range_sorted": {"start_date": mid_date, "end_date": end_date,
+                                  "sort_by": "impressions", "sort_order": "desc"},
+        "e2e_search": {"search": search_term, "page_size": 100},
+        "e2e_deep_page": {"page": last_page // 2 or 1, "page_size": 100},
+    }
+    for name, body in scenarios.items():
+        def call(body=body):
+            response = client.post("/api/metrics", json=body, headers=headers)
+            assert response.status_code == 200, response.text
+        results[name] = _measure(call, repeat)
+
+    return {"rows": rows_loaded, "results": results}
+
+
+def compare(current, baseline_path):
+    """Print median ratios against a previous JSON result file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    baseline_runs = {run["rows"]: run["results"] for run in baseline["runs"]}
+    print(f"\nComparison against {baseline_path} (commit {baseline.get('commit')}):")
+    for run in current["runs"]:
+        previous = baseline_runs.get(run["rows"])
+        if previous is None:
+            continue
+        print(f"  rows={run['rows']:,}")
+        for name, stats in run["results"].items():
+            if name not in previous:
+                continue
+            ratio = stats["median_ms"] / max(previous[name]["median_ms"], 1e-9)
+            flag = "  REGRESSION" if ratio > 1.10 else ""
+            print(f"    {name:28s} {previous[name]['median_ms']:10.2f} -> "
+                  f"{stats['median_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the metrics pipeline")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000],
+                        help="dataset sizes to benchmark (e.g. 1000000 10000000)")
+    parser.add_argument("--seed", type=int, default=42, help="synthetic data seed")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    import numpy
+    import pandas
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "runs": []
+    }
+    for rows in args.rows:
+        print(f"Benchmarking {rows:,} rows...")
+        run = run_suite(rows, args.seed, args.repeat)
+        report["runs"].append(run)
+        for name, stats in run["results"].items():
+            print(f"  {name:28s} median {stats['median_ms']:10.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ export interface User {
   name: string;
   email: string;
   role: 'admin' | 'user';
+  accounts?: string[] | null;
 }
 
 export interface Metric {
@@ -13,6 +14,10 @@ export interface Metric {
   clicks: number;
   cost_micros: number;
   conversions: number;
+  conversion_rate?: number;
+  ctr?: number;
+  cpc?: number | null;
+  cpa?: number | null;
 }
 
 export interface LoginCredentials {
@@ -25,7 +30,16 @@ export interface LoginResponse {
   user: User;
 }
 
+export interface RangeFilter {
+  column: string;
+  gt?: number;
+  gte?: number;
+  lt?: number;
+  lte?: number;
+}
+
 export interface MetricsFilter {
+  dataset?: string;
   start_date?: string;
   end_date?: string;
   page?: number;
@@ -33,6 +47,8 @@ export interface MetricsFilter {
   sort_by?: string;
   sort_order?: string;
   search?: string;
+  ranges?: RangeFilter[];
+  count_mode?: 'exact' | 'approximate';
 }
 
 export type SortDirection = 'asc' | 'desc';
@@ -48,4 +64,66 @@ export interface MetricsResponse {
   page: number;
   page_size: number;
   total_pages: number;
-}
\ No newline at end of file
+  total_count_approximate?: boolean;
+}
+
+export interface MetricsCount {
+  total_count: number;
+  total_pages: number;
+}
+
+export interface AggregateRow {
+  key?: string;
+  rows: number;
+  impressions: number;
+  clicks: number;
+  interactions: number;
+  conversions: number;
+  conversion_rate: number;
+  ctr: number;
+  cost_micros?: number;
+  cpc?: number;
+  cpa?: number;
+}
+
+export interface AggregateResponse {
+  totals: AggregateRow;
+  groups?: AggregateRow[];
+}
+
+export interface BatchQuery {
+  id?: string;
+  type?: 'metrics' | 'aggregate';
+  filters?: MetricsFilter;
+  group_by?: 'date' | 'campaign_id' | 'account_id';
+}
+
+export interface BatchResult {
+  id?: string;
+  type: 'metrics' | 'aggregate';
+  status: number;
+  data?: MetricsResponse | AggregateResponse;
+  error?: string;
+}
+
+export interface TimeSeriesQuery {
+  filters?: MetricsFilter;
+  metrics?: string[];
+  interval?: 'day' | 'week' | 'month';
+  max_points?: number;
+  downsample?: 'lttb' | 'none';
+  group_by?: 'campaign_id' | 'account_id';
+  top?: number;
+}
+
+export interface TimeSeries {
+  key?: string;
+  timestamps: string[];
+  values: Record<string, number[]>;
+}
+
+export interface TimeSeriesResponse {
+  interval: 'day' | 'week' | 'month';
+  buckets: number;
+  series: TimeSeries[];
+}
@@ -133,4 +133,32 @@ def user_token():
         data={"sub": "user@company.com"}, 
         expires_delta=timedelta(minutes=15)
     )
-    return access_token
\ No newline at end of file
+    return access_token
+
+@pytest.fixture
+def metrics_csv(tmp_path, monkeypatch, mock_metrics_data):
+    """Point the loader at a CSV written from the mock dataset."""
+    from services import loader
+
+    csv_path = tmp_path / "metrics.csv"
+    mock_metrics_data.to_csv(csv_path, index=False)
+    monkeypatch.setattr(loader, "_get_csv_path", lambda: str(csv_path))
+    loader.clear_cache()
+    yield csv_path
+    loader.clear_cache()
+
+
+@pytest.fixture
+def admin_headers():
+    """Authorization headers for the admin user from users.csv."""
+    from auth import create_access_token
+    token = create_access_token(data={"sub": "user1@company.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def user_headers():
+    """Authorization headers for the regular user from users.csv."""
+    from auth import create_access_token
+    token = create_access_token(data={"sub": "user2@company.com"})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,98 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from models import MetricsFilters, RangeFilter
+from services import processor
+from utils.admission import AdmissionController, AdmissionRejected
+
+client = TestClient(app)
+
+
+class TestAdmissionController:
+    def test_queued_query_runs_when_budget_frees(self):
+        controller = AdmissionController(global_budget=4, user_budget=4, queue_timeout=1.0)
+        order = []
+
+        async def query(name, cost, hold):
+            async with controller.admit(name, cost):
+                order.append(name)
+                await asyncio.sleep(hold)
+
+        async def scenario():
+            await asyncio.gather(query("a", 3, 0.05), query("b", 3, 0))
+
+        asyncio.run(scenario())
+        assert order == ["a", "b"]
+        assert controller.stats['queued'] == 1 and controller.in_use == 0
+
+    def test_timeout_sheds_with_retry_after(self):
+        controller = AdmissionController(global_budget=2, user_budget=2, queue_timeout=0.05)
+
+        async def scenario():
+            async with controller.admit("a", 2):
+                await controller.acquire("b", 1)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            asyncio.run(scenario())
+        assert rejected.value.status_code == 503
+        assert rejected.value.retry_after >= 1
+
+    def test_user_over_own_budget_gets_429(self):
+        controller = AdmissionController(global_budget=10, user_budget=2, queue_timeout=0.01)
+
+        async def scenario():
+            async with controller.admit("a", 2):
+                async with controller.admit("b", 2):  # other users still fit
+                    await controller.acquire("a", 1)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            asyncio.run(scenario())
+        assert rejected.value.status_code == 429
+
+    def test_full_queue_rejects_immediately(self):
+        controller = AdmissionController(global_budget=1, user_budget=1, max_queue=0, queue_timeout=5)
+
+        async def scenario():
+            async with controller.admit("a", 1):
+                await controller.acquire("b", 1)
+
+        with pytest.raises(AdmissionRejected):
+            asyncio.run(scenario())
+        assert controller.stats['rejected_global'] == 1
+
+    def test_oversized_query_runs_alone(self):
+        controller = AdmissionController(global_budget=4, user_budget=2)
+        assert asyncio.run(controller.acquire("a", 100)) == 2
+
+
+class TestQueryCost:
+    def test_sorting_and_depth_cost_more(self, metrics_csv):
+        admin = {'role': 'admin'}
+        cheap = processor.estimate_query_cost(MetricsFilters(), admin, 1, 20)
+        sorted_deep = processor.estimate_query_cost(MetricsFilters(sort_by="impressions"), admin, 5, 20)
+        scanned = processor.estimate_query_cost(
+            MetricsFilters(ranges=[RangeFilter(column="clicks", gte=1)]), admin, 1, 20
+        )
+
+        assert 1 <= cheap < sorted_deep
+        assert cheap < scanned
+
+
+class TestMetricsEndpoint:
+    def test_overloaded_worker_returns_503(self, metrics_csv, admin_headers, monkeypatch):
+        busy = AdmissionController(global_budget=1, user_budget=1, queue_timeout=0)
+        busy.in_use = 1
+        monkeypatch.setattr(processor, "admission_controller", busy)
+
+        response = client.post("/api/metrics", headers=admin_headers, json={"search": "7"})
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,117 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.testclient import TestClient
+from main import app
+from services import batch, loader, planner, processor
+from services.index import DatasetIndex
+from utils.admission import AdmissionController
+from utils.logger import api_logger
+
+client = TestClient(app)
+
+
+class TestBatchEndpoint:
+    def test_results_match_individual_requests(self, metrics_csv, admin_headers):
+        """Each batch result equals what the standalone endpoint returns."""
+        filters = {"start_date": "2024-01-15", "end_date": "2024-01-16", "sort_by": "clicks"}
+        batch = client.post("/api/batch", headers=admin_headers, json={"queries": [
+            {"id": "table", "filters": filters},
+            {"id": "totals", "type": "aggregate", "filters": filters},
+        ]})
+        single = client.post("/api/metrics", headers=admin_headers, json=filters)
+
+        assert batch.status_code == 200
+        table, totals = batch.json()["results"]
+        assert table["id"] == "table" and table["status"] == 200
+        assert table["data"] == single.json()
+        assert totals["data"]["totals"]["rows"] == single.json()["total_count"]
+        assert totals["data"]["totals"]["clicks"] == sum(m["clicks"] for m in single.json()["metrics"])
+
+    def test_common_sub_filters_are_evaluated_once(self, metrics_csv):
+        """A predicate shared by several queries is computed once per batch."""
+        index = DatasetIndex(loader.get_dataset(), version=99)
+        filter_sets = [
+            ("2024-01-15", "2024-01-16", None, ()),
+            ("2024-01-15", "2024-01-16", "6320", ()),
+            (None, None, "6320", ()),
+            (None, None, None, (("clicks", "gt", 100.0),)),
+        ]
+        shared = planner.evaluate_shared_predicates(index, filter_sets)
+
+        assert sorted(key[0] for key in shared) == ["date", "search"]
+
+    def test_cached_filter_sets_skip_shared_evaluation(self, metrics_csv, admin_headers, monkeypatch):
+        """A repeated batch is served from the query cache without rebuilding shared bitmaps."""
+        evaluated = []
+        evaluate = batch.evaluate_shared_predicates
+        monkeypatch.setattr(batch, "evaluate_shared_predicates",
+                            lambda index, filter_sets: evaluated.append(list(filter_sets)) or evaluate(index, filter_sets))
+        filters = {"start_date": "2024-01-15", "end_date": "2024-03-31"}
+        queries = {"queries": [
+            {"id": "table", "filters": filters},
+            {"id": "totals", "type": "aggregate", "filters": filters},
+            {"id": "search", "filters": {**filters, "search": "6"}}
+        ]}
+
+        first = client.post("/api/batch", headers=admin_headers, json=queries).json()
+        second = client.post("/api/batch", headers=admin_headers, json=queries).json()
+
+        assert first == second
+        assert len(evaluated[0]) == 3 and evaluated[1] == []
+
+    def test_overloaded_worker_returns_503(self, metrics_csv, admin_headers, monkeypatch):
+        busy = AdmissionController(global_budget=1, user_budget=1, queue_timeout=0)
+        busy.in_use = 1
+        monkeypatch.setattr(batch, "admission_controller", busy)
+
+        response = client.post("/api/batch", headers=admin_headers, json={"queries": [{"id": "page"}]})
+
+        assert response.status_code == 503
+        assert "retry-after" in response.headers
+
+    def test_aggregate_groups_by_date(self, metrics_csv, user_headers):
+        response = client.post("/api/batch", headers=user_headers, json={"queries": [
+            {"type": "aggregate", "group_by": "date"}
+        ]})
+
+        data = response.json()["results"][0]["data"]
+        assert [group["key"] for group in data["groups"]] == sorted(group["key"] for group in data["groups"])
+        assert sum(group["rows"] for group in data["groups"]) == data["totals"]["rows"]
+        assert "cost_micros" not in data["totals"]
+
+    def test_forbidden_query_does_not_fail_the_batch(self, metrics_csv, user_headers):
+        response = client.post("/api/batch", headers=user_headers, json={"queries": [
+            {"id": "cost", "filters": {"ranges": [{"column": "cpc", "gt": 1}]}},
+            {"id": "page"}
+        ]})
+
+        cost, page = response.json()["results"]
+        assert cost["status"] == 403 and cost["data"] is None
+        assert page["status"] == 200 and page["data"]["total_count"] > 0
+
+    def test_failed_query_reports_500_and_is_logged(self, metrics_csv, admin_headers, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("index unavailable")
+        monkeypatch.setattr(processor, "page_row_ids", broken)
+
+        response = client.post("/api/batch", headers=admin_headers, json={"queries": [
+            {"id": "page"}, {"id": "totals", "type": "aggregate"}
+        ]})
+
+        page, totals = response.json()["results"]
+        assert page["status"] == 500 and "index unavailable" in page["error"]
+        assert totals["status"] == 200
+        logged = api_logger.get_recent_logs(10)
+        assert any(log["path"] == "BATCH_QUERY_FAILED" and log["level"] == "ERROR" for log in logged)
+
+    def test_requires_authentication(self):
+        response = client.post("/api/batch", json={"queries": [{}]})
+        assert response.status_code in (401, 403)
+
+    def test_rejects_empty_batch(self, admin_headers):
+        response = client.post("/api/batch", headers=admin_headers, json={"queries": []})
+        assert response.status_code == 422
@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pytest
+from services.bitmap import ARRAY_MAX_SIZE, CHUNK_SIZE, RowBitmap
+
+
+def _random_ids(density, n=5 * CHUNK_SIZE + 123, seed=0):
+    return np.flatnonzero(np.random.default_rng(seed).random(n) < density)
+
+
+# Sparse (array containers), dense (bitmap containers) and mixed sets
+DENSITIES = [0.001, 0.5, 0.04]
+
+
+class TestRowBitmap:
+    @pytest.mark.parametrize("density", DENSITIES)
+    def test_round_trip_and_cardinality(self, density):
+        ids = _random_ids(density)
+        bitmap = RowBitmap.from_row_ids(ids)
+
+        assert np.array_equal(bitmap.to_row_ids(), ids)
+        assert len(bitmap) == len(ids)
+
+    @pytest.mark.parametrize("density", DENSITIES)
+    def test_set_algebra_matches_numpy(self, density):
+        a, b = _random_ids(density, seed=1), _random_ids(0.2, seed=2)
+        first, second = RowBitmap.from_row_ids(a), RowBitmap.from_row_ids(b)
+
+        assert np.array_equal((first & second).to_row_ids(), np.intersect1d(a, b))
+        assert np.array_equal((first | second).to_row_ids(), np.union1d(a, b))
+        assert np.array_equal((first - second).to_row_ids(), np.setdiff1d(a, b))
+        assert np.array_equal((second - first).to_row_ids(), np.setdiff1d(b, a))
+
+    @pytest.mark.parametrize("density", DENSITIES)
+    def test_cardinality_without_bitwise_count(self, density, monkeypatch):
+        """NumPy 1.x has no np.bitwise_count; dense chunks are counted with a byte table."""
+        ids = _random_ids(density)
+        monkeypatch.delattr(np, "bitwise_count", raising=False)
+
+        bitmap = RowBitmap.from_row_ids(ids) & RowBitmap.from_row_ids(ids)
+        assert len(bitmap) == len(ids)
+
+    def test_contains_any_order(self):
+        ids = _random_ids(0.3)
+        probes = np.random.default_rng(5).integers(0, 6 * CHUNK_SIZE, 20000)
+
+        assert np.array_equal(RowBitmap.from_row_ids(ids).contains(probes), np.isin(probes, ids))
+
+    def test_dense_chunks_are_compressed(self):
+        ids = np.arange(3 * CHUNK_SIZE)
+        bitmap = RowBitmap.from_row_ids(ids)
+
+        assert bitmap.nbytes < ids.astype(np.int32).nbytes / 20
+
+    def test_intersection_shrinks_containers_back_to_arrays(self):
+        evens, low = RowBitmap.from_row_ids(np.arange(0, CHUNK_SIZE, 2)), RowBitmap.from_row_ids(np.arange(100))
+
+        both = evens & low
+        assert len(both) == 50
+        assert all(len(container) <= ARRAY_MAX_SIZE for container in both.containers)
+
+    def test_empty(self):
+        empty = RowBitmap.from_row_ids([])
+        full = RowBitmap.from_row_ids(np.arange(10))
+
+        assert len(empty & full) == 0 and len(empty | full) == 10
+        assert empty.to_row_ids().size == 0
+        assert not empty.contains(np.arange(3)).any()
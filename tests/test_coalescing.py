@@ -0,0 +1,125 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+import time
+
+import pytest
+from models import MetricsFilters
+from services import processor
+from utils.coalescing import SingleFlight
+
+
+def _slow_call(calls, result="rows", delay=0.05):
+    def compute(*args):
+        calls.append(args)
+        time.sleep(delay)
+        return result
+    return compute
+
+
+async def _gather(*coroutines):
+    return await asyncio.gather(*coroutines, return_exceptions=True)
+
+
+class TestSingleFlight:
+    def test_identical_concurrent_calls_share_one_computation(self):
+        flight, calls = SingleFlight("test"), []
+        compute = _slow_call(calls)
+
+        results = asyncio.run(_gather(*(flight.run("same", compute, 1) for _ in range(8))))
+
+        assert results == ["rows"] * 8
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+
+    def test_different_keys_run_separately(self):
+        flight, calls = SingleFlight("test"), []
+        compute = _slow_call(calls)
+
+        asyncio.run(_gather(flight.run("a", compute, 1), flight.run("b", compute, 2)))
+
+        assert sorted(calls) == [(1,), (2,)]
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        flight, attempts = SingleFlight("test"), []
+
+        def failing():
+            attempts.append(1)
+            time.sleep(0.02)
+            raise ValueError("boom")
+
+        results = asyncio.run(_gather(*(flight.run("k", failing) for _ in range(3))))
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(attempts) == 1
+
+        with pytest.raises(ValueError):
+            asyncio.run(flight.run("k", failing))
+        assert len(attempts) == 2
+
+    def test_cancelled_caller_does_not_cancel_joined_callers(self):
+        flight, calls = SingleFlight("test"), []
+        compute = _slow_call(calls, delay=0.1)
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.run("k", compute))
+            second = asyncio.ensure_future(flight.run("k", compute))
+            await asyncio.sleep(0.02)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "rows"
+        assert len(calls) == 1
+
+
+class TestCoalescedMetrics:
+    def test_same_query_computed_once(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(processor, "get_filtered_metrics", _slow_call(calls))
+        filters, other = MetricsFilters(search="12"), MetricsFilters(search="34")
+        admin, user = {'role': 'admin'}, {'role': 'user'}
+
+        asyncio.run(_gather(
+            processor.coalesced_filtered_metrics(filters, admin, 1, 20),
+            processor.coalesced_filtered_metrics(filters, admin, 1, 20),
+            processor.coalesced_filtered_metrics(filters, user, 1, 20),
+            processor.coalesced_filtered_metrics(other, admin, 1, 20),
+        ))
+
+        # Role and filters are part of the query identity
+        assert len(calls) == 3
+
+
+class TestColdLoad:
+    def test_dataset_loads_off_the_event_loop(self, metrics_csv, admin_headers, monkeypatch):
+        from fastapi.testclient import TestClient
+        from main import app
+        from services.loader import clear_cache, dataset_registry
+        on_loop, load = [], dataset_registry._load
+
+        def tracking_load(path):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(path)
+            except RuntimeError:
+                pass  # a worker thread
+            return load(path)
+        monkeypatch.setattr(dataset_registry, "_load", tracking_load)
+
+        for filters in ({}, {"search": "7"}):
+            clear_cache()
+            response = TestClient(app).post("/api/metrics", headers=admin_headers, json=filters)
+            assert response.status_code == 200 and response.json()["total_count"] > 0
+
+        assert dataset_registry.stats['loads'] >= 2
+        assert on_loop == []
+
+    def test_unloaded_dataset_is_uncached(self, metrics_csv):
+        admin = {'role': 'admin'}
+
+        assert processor.response_cache_key(MetricsFilters(), admin, 1, 20) is None
+        processor.get_filtered_metrics(MetricsFilters(), admin)
+        assert processor.response_cache_key(MetricsFilters(), admin, 1, 20) is not None
@@ -0,0 +1,93 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import asyncio
+import gzip
+from fastapi.testclient import TestClient
+from main import app
+from utils import config
+from utils.compression import ENCODERS, CachedPayload, negotiate_encoding, payload_cache
+
+client = TestClient(app)
+
+
+class TestNegotiation:
+    def test_prefers_server_order_among_accepted(self):
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+        assert negotiate_encoding("gzip;q=0, identity") is None
+        assert negotiate_encoding("*") == next(iter(ENCODERS))
+        assert negotiate_encoding("") is None
+
+    def test_disabled_by_config(self, monkeypatch):
+        monkeypatch.setattr(config, "COMPRESSION_ENABLED", False)
+        assert negotiate_encoding("gzip") is None
+
+
+class TestCachedPayload:
+    def test_compressed_variant_built_once(self, monkeypatch):
+        monkeypatch.setattr(config, "COMPRESSION_MIN_SIZE", 10)
+        payload = CachedPayload(b'{"value": "' + b"x" * 5000 + b'"}')
+
+        first, encoding = payload.encoded("gzip")
+        second, _ = payload.encoded("gzip")
+
+        assert encoding == "gzip" and first is second
+        assert gzip.decompress(first) == payload.body
+
+    def test_small_bodies_stay_uncompressed(self):
+        payload = CachedPayload(b"{}")
+        assert payload.encoded("gzip") == (b"{}", None)
+
+
+class TestCompressedResponses:
+    def test_large_json_is_gzipped(self, metrics_csv, admin_headers, monkeypatch):
+        monkeypatch.setattr(config, "COMPRESSION_MIN_SIZE", 100)
+        response = client.post("/api/metrics", headers={**admin_headers, "Accept-Encoding": "gzip"},
+                               json={"page_size": 50})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["total_count"] > 0  # decoded transparently by the client
+
+    def test_identity_when_not_accepted(self, metrics_csv, admin_headers):
+        response = client.post("/api/metrics", headers={**admin_headers, "Accept-Encoding": "identity"},
+                               json={})
+
+        assert "content-encoding" not in response.headers
+
+    def test_repeat_query_served_from_payload_cache(self, metrics_csv, admin_headers, monkeypatch):
+        monkeypatch.setattr(config, "COMPRESSION_MIN_SIZE", 100)
+        body = {"search": "6320", "page_size": 5}
+        headers = {**admin_headers, "Accept-Encoding": "gzip"}
+        first = client.post("/api/metrics", headers=headers, json=body)  # fills the query cache
+        second = client.post("/api/metrics", headers=headers, json=body)  # serialized and cached
+        third = client.post("/api/metrics", headers=headers, json=body)
+
+        assert len(payload_cache) == 1
+        assert first.json() == second.json() == third.json()
+        assert third.headers["content-encoding"] == "gzip"
+
+    def test_large_bodies_are_compressed_off_the_event_loop(self, metrics_csv, admin_headers, monkeypatch):
+        monkeypatch.setattr(config, "COMPRESSION_MIN_SIZE", 100)
+        monkeypatch.setattr(config, "COMPRESSION_THREADPOOL_SIZE", 100)
+        on_loop, encode = [], ENCODERS["gzip"]
+
+        def tracking_gzip(body):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(len(body))
+            except RuntimeError:
+                pass  # a worker thread
+            return encode(body)
+        monkeypatch.setitem(ENCODERS, "gzip", tracking_gzip)
+        headers = {**admin_headers, "Accept-Encoding": "gzip"}
+
+        # Not cached yet (middleware), then cached (payload variant)
+        responses = [client.post("/api/metrics", headers=headers, json={"page_size": 50}) for _ in range(3)]
+
+        assert all(response.headers["content-encoding"] == "gzip" for response in responses)
+        assert len(payload_cache) == 1
+        assert on_loop == []
@@ -0,0 +1,73 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services import loader, planner, processor
+from services.sample import write_synthetic_csv
+from utils.admission import AdmissionController
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def large_csv(tmp_path, monkeypatch):
+    """Several scan chunks of rows, so an early-terminating scan stops before the end."""
+    csv_path = write_synthetic_csv(str(tmp_path / "metrics.csv"), 3 * planner.SCAN_CHUNK_SIZE, seed=4)
+    monkeypatch.setattr(loader, "_get_csv_path", lambda: csv_path)
+    loader.clear_cache()
+    yield csv_path
+    loader.clear_cache()
+
+
+class TestApproximateCountMode:
+    def test_page_matches_exact_mode(self, metrics_csv, user_headers):
+        filters = {"start_date": "2024-01-15", "sort_by": "date", "page_size": 2}
+        planner.clear_result_cache()
+        approximate = client.post("/api/metrics", headers=user_headers,
+                                  json={**filters, "count_mode": "approximate"}).json()
+        exact = client.post("/api/metrics", headers=user_headers, json=filters).json()
+
+        assert approximate["metrics"] == exact["metrics"]
+        assert exact["total_count_approximate"] is False
+
+    def test_exact_count_endpoint(self, metrics_csv, mock_metrics_data, user_headers):
+        response = client.post("/api/metrics/count", headers=user_headers,
+                               json={"search": "6320", "page_size": 2})
+
+        expected = mock_metrics_data['campaign_id'].astype(str).str.contains("6320").sum()
+        assert response.status_code == 200
+        assert response.json() == {"total_count": int(expected), "total_pages": (int(expected) + 1) // 2}
+
+    def test_cached_result_gives_exact_count(self, metrics_csv, user_headers):
+        filters = {"search": "6320", "page_size": 1}
+        client.post("/api/metrics/count", headers=user_headers, json=filters)
+
+        response = client.post("/api/metrics", headers=user_headers, json={**filters, "count_mode": "approximate"})
+
+        assert response.json()["total_count_approximate"] is False
+
+    def test_early_terminated_scan_estimates_the_total(self, large_csv, admin_headers):
+        filters = {"start_date": "2023-03-01", "search": "1", "page_size": 10}
+        approximate = client.post("/api/metrics", headers=admin_headers,
+                                  json={**filters, "count_mode": "approximate"}).json()
+        exact = client.post("/api/metrics/count", headers=admin_headers, json=filters).json()
+
+        assert approximate["total_count_approximate"] is True
+        assert len(approximate["metrics"]) == 10
+        # Estimated from index statistics: close to, but not computed from, the matches
+        assert 0.5 * exact["total_count"] <= approximate["total_count"] <= 2 * exact["total_count"]
+        assert approximate["total_pages"] == (approximate["total_count"] + 9) // 10
+
+    def test_count_endpoint_is_admitted(self, metrics_csv, admin_headers, monkeypatch):
+        busy = AdmissionController(global_budget=1, user_budget=1, queue_timeout=0)
+        busy.in_use = 1
+        monkeypatch.setattr(processor, "admission_controller", busy)
+
+        response = client.post("/api/metrics/count", headers=admin_headers, json={"search": "6320"})
+
+        assert response.status_code == 503
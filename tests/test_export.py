@@ -0,0 +1,62 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from services.export import ARROW_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE, negotiate_format
+
+client = TestClient(app)
+
+
+class TestNegotiation:
+    def test_formats(self):
+        assert negotiate_format("") == "json"
+        assert negotiate_format("*/*") == "json"
+        assert negotiate_format(COLUMNAR_MEDIA_TYPE) == "columnar"
+        assert negotiate_format(f"application/json;q=0.5, {COLUMNAR_MEDIA_TYPE}") == "columnar"
+        assert negotiate_format("text/csv") is None
+
+
+class TestColumnarMetrics:
+    def test_same_rows_as_json_page(self, metrics_csv, admin_headers):
+        query = {"sort_by": "impressions", "sort_order": "desc"}
+        rows = client.post("/api/metrics", headers=admin_headers, json=query).json()["metrics"]
+
+        response = client.post("/api/metrics", headers={**admin_headers, "Accept": COLUMNAR_MEDIA_TYPE}, json=query)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(COLUMNAR_MEDIA_TYPE)
+        body = response.json()
+        assert body["total_count"] == len(rows)
+        for column in ("date", "impressions", "clicks", "cost_micros"):
+            assert body["data"][column] == [row[column] for row in rows]
+        assert [f"Campaign {value}" for value in body["data"]["campaign_id"]] == [row["campaign_name"] for row in rows]
+
+    def test_restricted_columns_are_projected_away(self, metrics_csv, user_headers):
+        response = client.post("/api/metrics/export", headers=user_headers, json={})
+
+        body = response.json()
+        assert body["total_count"] == 4 and body["page_size"] > 100
+        assert "impressions" in body["columns"]
+        assert not {"cost_micros", "cpc", "cpa"} & (set(body["columns"]) | set(body["data"]))
+
+    def test_unsupported_format_is_406(self, metrics_csv, admin_headers):
+        response = client.post("/api/metrics", headers={**admin_headers, "Accept": "text/csv"}, json={})
+        assert response.status_code == 406
+
+
+class TestArrowMetrics:
+    def test_arrow_stream_round_trip(self, metrics_csv, mock_metrics_data, admin_headers):
+        pa = pytest.importorskip("pyarrow")
+        response = client.post("/api/metrics/export", headers={**admin_headers, "Accept": ARROW_MEDIA_TYPE}, json={})
+
+        assert response.headers["content-type"].startswith(ARROW_MEDIA_TYPE)
+        table = pa.ipc.open_stream(io.BytesIO(response.content)).read_all()
+        assert table.num_rows == len(mock_metrics_data)
+        assert table.column("clicks").to_pylist() == mock_metrics_data["clicks"].tolist()
@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import re
+import subprocess
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+
+# Cumulative import time of `main` (fastapi alone is ~0.5s); pandas would add ~0.5s more
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+# Loaded lazily on the data-serving path, never by importing the app
+HEAVY_MODULES = ('pandas', 'numpy', 'passlib')
+
+
+def _import_main(code: str = ""):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import main, sys\n{code}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+
+
+class TestImportGraph:
+    def test_app_import_does_not_load_data_stack(self):
+        result = _import_main(f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+        assert result.stdout.strip() == "[]"
+
+    def test_app_import_within_budget(self):
+        result = _import_main()
+        cumulative = re.search(r"\|\s*(\d+)\s*\|\s*main$", result.stderr, re.MULTILINE)
+
+        assert cumulative, result.stderr[-500:]
+        assert int(cumulative.group(1)) / 1e6 < IMPORT_TIME_BUDGET_SECONDS
+
+    def test_services_package_resolves_lazily(self):
+        import services
+        from services.processor import get_filtered_metrics
+
+        assert services.get_filtered_metrics is get_filtered_metrics
@@ -0,0 +1,87 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from models import MetricData
+from utils import json_response
+from utils.json_response import FastJSONResponse, dumps
+
+
+def _metric():
+    return MetricData(
+        date="2024-01-01", campaign_name="Brand", impressions=100, clicks=5,
+        cost_micros=2_000_000, conversions=1.0, conversion_rate=0.2, ctr=0.05, cpc=0.4, cpa=2.0
+    )
+
+
+class TestDumps:
+    def test_numpy_scalars_and_arrays(self):
+        payload = {"count": np.int64(3), "rate": np.float32(0.25), "ids": np.arange(3)}
+        assert json.loads(dumps(payload)) == {"count": 3, "rate": 0.25, "ids": [0, 1, 2]}
+
+    def test_nan_becomes_null(self):
+        payload = {"value": np.float64("nan"), "values": np.array([1.0, np.nan])}
+        assert json.loads(dumps(payload)) == {"value": None, "values": [1.0, None]}
+
+    def test_dates_and_pydantic_models(self):
+        payload = {"day": date(2024, 1, 2), "at": datetime(2024, 1, 2, 3, 4, 5), "row": _metric()}
+        decoded = json.loads(dumps(payload))
+        assert decoded["day"] == "2024-01-02"
+        assert decoded["at"].startswith("2024-01-02T03:04:05")
+        assert decoded["row"] == json.loads(_metric().model_dump_json())
+
+    def test_unknown_types_raise(self):
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+    def test_stdlib_fallback_matches(self):
+        payload = {"count": np.int64(3), "values": np.array([0.5, np.nan]), "day": date(2024, 1, 2), "row": _metric()}
+        expected = json.loads(dumps(payload))
+        fallback = json.dumps(
+            payload, default=json_response._default, allow_nan=False, separators=(",", ":")
+        )
+        assert json.loads(fallback) == expected
+
+
+class TestFastJSONResponse:
+    def test_renders_compact_utf8_json(self):
+        response = FastJSONResponse({"name": "Café", "values": np.array([1, 2])})
+        assert response.body == '{"name":"Café","values":[1,2]}'.encode("utf-8")
+        assert response.headers["content-type"] == "application/json"
+
+    def test_is_the_application_default(self):
+        from main import app
+        assert app.router.default_response_class is FastJSONResponse
+
+
+class TestMetricsPage:
+    def test_rows_match_per_row_conversion(self):
+        """The column-wise page build gives the same models as converting row by row."""
+        import pandas as pd
+        from models.models import MetricDataPublic
+        from services.loader import add_derived_columns, apply_metrics_schema
+        from services.processor import _build_metrics_list
+        from services.sample import create_synthetic_data
+        df = add_derived_columns(apply_metrics_schema(create_synthetic_data(50, seed=3)))
+        df.loc[df.index[:5], 'cpa'] = np.nan
+
+        admin, public = _build_metrics_list(df, True), _build_metrics_list(df, False)
+
+        for (_, row), metric, public_metric in zip(df.iterrows(), admin, public):
+            expected = {
+                'date': row['date'].strftime('%Y-%m-%d'), 'campaign_name': f"Campaign {row['campaign_id']}",
+                'impressions': int(row['impressions']), 'clicks': int(row['clicks']),
+                'conversions': float(row['conversions']), 'conversion_rate': float(row['conversion_rate']),
+                'ctr': float(row['ctr'])
+            }
+            assert public_metric == MetricDataPublic(**expected)
+            cost = {column: float(row[column]) for column in ('cpc', 'cpa') if pd.notna(row[column])}
+            assert metric == MetricData(**expected, cost_micros=int(row['cost_micros']), **cost)
+        assert admin[0].cpa is None and admin[-1].cpa is not None
@@ -0,0 +1,124 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pandas as pd
+from services.loader import read_metrics_csv, apply_metrics_schema, compact_floats, dataset_memory_bytes
+from services.filters import campaign_search_mask, search_metrics
+from services.sample import write_synthetic_csv
+
+
+class TestCompactSchema:
+    def test_parse_applies_compact_types(self, metrics_csv, mock_metrics_data):
+        """Ids are dictionary-encoded and numeric columns narrowed at parse time."""
+        df = compact_floats(read_metrics_csv(str(metrics_csv)))
+
+        assert isinstance(df['campaign_id'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['account_id'].dtype, pd.CategoricalDtype)
+        assert df['impressions'].dtype == 'uint16'
+        assert df['clicks'].dtype == 'uint8'
+        assert df['cost_micros'].dtype == 'uint32'
+        assert df['conversions'].dtype == 'float32'
+        assert df['campaign_id'].astype('int64').tolist() == mock_metrics_data['campaign_id'].tolist()
+        assert (df['conversions'] - mock_metrics_data['conversions']).abs().max() < 1e-5
+
+    def test_out_of_range_values_keep_safe_types(self):
+        """Negative or huge values never get a type that would corrupt them."""
+        df = apply_metrics_schema(pd.DataFrame({
+            'campaign_id': [1, 2],
+            'impressions': [-5, 10],
+            'cost_micros': [2**40, 1],
+            'conversions': [1e9 + 0.01, 0.0],
+            'date': ['2024-01-01', '2024-01-02']
+        }))
+
+        assert df['impressions'].tolist() == [-5, 10]
+        assert df['cost_micros'].tolist() == [2**40, 1]
+        assert df['conversions'].dtype == 'float64'
+
+    def test_memory_footprint_shrinks(self, tmp_path):
+        """The compact schema about halves the default pandas types (dates stay 8 bytes a row)."""
+        csv_path = write_synthetic_csv(str(tmp_path / "metrics.csv"), 20000, seed=3)
+        naive = pd.read_csv(csv_path, parse_dates=['date'])
+        df = compact_floats(read_metrics_csv(csv_path))
+
+        per_row = df.memory_usage(deep=True, index=False) / len(df)
+        assert per_row[['clicks', 'interactions']].max() <= 2 and per_row[['impressions', 'conversions']].max() <= 4
+        assert max(df[column].cat.codes.dtype.itemsize for column in ('account_id', 'campaign_id')) <= 2
+        assert dataset_memory_bytes(df) < 0.55 * dataset_memory_bytes(naive)
+
+
+class TestCategoricalSearch:
+    def test_search_matches_string_semantics(self, metrics_csv, mock_metrics_data):
+        """Searching categorical ids gives the same rows as the string scan."""
+        df = read_metrics_csv(str(metrics_csv))
+
+        for term in ("632", "9", "4957786229", "nope", "(", "6.2"):
+            expected = mock_metrics_data['campaign_id'].astype(str).str.contains(term, regex=False)
+            assert campaign_search_mask(df['campaign_id'], term).tolist() == expected.tolist()
+        assert len(search_metrics(df, "6862")) == 1
+
+
+class TestDerivedColumns:
+    def test_kpis_materialized_at_load(self, metrics_csv):
+        """conversion_rate, ctr, cpc and cpa exist right after loading."""
+        from services.loader import load_metrics_data
+
+        df = load_metrics_data().set_index(load_metrics_data()['campaign_id'].astype('int64'))
+        row = df.loc[6320590762]
+
+        assert abs(row['conversion_rate'] - 6.1 / 130 * 100) < 1e-4
+        assert abs(row['ctr'] - 130 / 4374 * 100) < 1e-4
+        assert abs(row['cpc'] - 2026808000 / 130) / row['cpc'] < 1e-6
+        assert abs(row['cpa'] - 2026808000 / 6.1) / row['cpa'] < 1e-6
+
+    def test_kpis_stay_float64_and_sort_like_pandas(self, tmp_path):
+        """Rates are computed from the exact conversions and kept in float64, so pages keep pandas' order."""
+        from services.index import DatasetIndex
+        from services.loader import _load_frame
+        from services.planner import sort_row_ids
+        csv_path = write_synthetic_csv(str(tmp_path / "metrics.csv"), 20000, seed=8)
+        naive = pd.read_csv(csv_path)
+        expected = naive['conversions'] / naive['clicks'].replace(0, 1) * 100
+
+        df = _load_frame(csv_path)
+
+        assert df['conversions'].dtype == 'float32'
+        assert all(df[column].dtype == 'float64' for column in ('conversion_rate', 'ctr', 'cpc', 'cpa'))
+        assert df['conversion_rate'].tolist() == expected.fillna(0).tolist()
+        order = sort_row_ids(DatasetIndex(df, version=1), None, 'conversion_rate', ascending=False)
+        assert order.tolist() == expected.sort_values(ascending=False, kind='stable').index.tolist()
+
+    def test_undefined_cost_kpis_are_nan(self):
+        """No clicks or conversions means no CPC/CPA rather than a fake value."""
+        from services.loader import add_derived_columns
+
+        df = add_derived_columns(pd.DataFrame({
+            'impressions': [0], 'clicks': [0], 'conversions': [0.0], 'cost_micros': [100]
+        }))
+
+        assert df['conversion_rate'].iloc[0] == 0 and df['ctr'].iloc[0] == 0
+        assert pd.isna(df['cpc'].iloc[0]) and pd.isna(df['cpa'].iloc[0])
+
+    def test_sort_by_derived_column(self, metrics_csv, admin_headers, user_headers):
+        """Admins can rank by CPA; regular users neither see nor sort by it."""
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+
+        admin = client.post("/api/metrics", json={"sort_by": "cpa", "sort_order": "asc"},
+                            headers=admin_headers).json()
+        cpas = [metric['cpa'] for metric in admin['metrics']]
+        assert cpas == sorted(cpas)
+
+        user = client.post("/api/metrics", json={"sort_by": "cpa", "sort_order": "asc"},
+                           headers=user_headers).json()
+        assert all('cpa' not in metric and 'cpc' not in metric for metric in user['metrics'])
+        assert [m['date'] for m in user['metrics']] == sorted(m['date'] for m in user['metrics'])
+
+        by_ctr = client.post("/api/metrics", json={"sort_by": "ctr", "sort_order": "desc"},
+                             headers=user_headers).json()
+        ctrs = [metric['ctr'] for metric in by_ctr['metrics']]
+        assert ctrs == sorted(ctrs, reverse=True)
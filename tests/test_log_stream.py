@@ -0,0 +1,78 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from utils.logger import APILogger
+from utils.log_stream import LogBroadcaster
+
+
+def _parse(frame):
+    """Split an SSE frame into (event, data)."""
+    lines = frame.strip().split("\n")
+    return lines[0][len("event: "):], json.loads(lines[1][len("data: "):])
+
+
+class TestLogBroadcaster:
+    def test_snapshot_then_live_entries(self):
+        """Subscribers get a snapshot first, then each new log entry."""
+        logger = APILogger()
+        broadcaster = LogBroadcaster(logger, stats_interval=60)
+
+        async def scenario():
+            stream = broadcaster.stream(heartbeat=1)
+            event, _ = _parse(await stream.__anext__())
+            logger.log_request("GET", "/api/me", "127.0.0.1", 200, response_time=0.01)
+            live = _parse(await stream.__anext__())
+            await stream.aclose()
+            return event, live
+
+        snapshot_event, (live_event, live_data) = asyncio.run(scenario())
+
+        assert snapshot_event == "snapshot"
+        assert live_event == "log"
+        assert live_data["path"] == "/api/me"
+        assert live_data["status"] == 200
+        assert broadcaster.subscriber_count == 0
+
+    def test_slow_subscriber_buffer_is_bounded(self):
+        """A client that does not read loses old events instead of growing memory."""
+        logger = APILogger()
+        broadcaster = LogBroadcaster(logger, buffer_size=3, stats_interval=60)
+
+        async def scenario():
+            stream = broadcaster.stream(heartbeat=1)
+            await stream.__anext__()  # snapshot
+            for i in range(10):
+                logger.log_request("GET", f"/p{i}", "127.0.0.1", 200)
+            frames = [_parse(await stream.__anext__()) for _ in range(4)]
+            await stream.aclose()
+            return frames
+
+        frames = asyncio.run(scenario())
+
+        assert frames[0] == ("dropped", {"count": 7})
+        assert [data["path"] for _, data in frames[1:]] == ["/p7", "/p8", "/p9"]
+
+    def test_stats_deltas_only_include_changes(self):
+        """Periodic stats events carry only the fields that changed."""
+        logger = APILogger()
+        broadcaster = LogBroadcaster(logger, stats_interval=0.01)
+
+        async def scenario():
+            stream = broadcaster.stream(heartbeat=1)
+            await stream.__anext__()  # snapshot
+            logger.log_request("GET", "/api/me", "127.0.0.1", 200, response_time=0.01)
+            await stream.__anext__()  # log entry
+            event = _parse(await stream.__anext__())
+            await stream.aclose()
+            return event
+
+        event, delta = asyncio.run(scenario())
+
+        assert event == "stats"
+        assert delta["total_requests"] == 1
+        assert "success_rate" in delta
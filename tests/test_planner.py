@@ -0,0 +1,133 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pytest
+from models import RangeFilter
+from services.filters import normalize_ranges
+from services.index import DatasetIndex
+from services.loader import add_derived_columns, apply_metrics_schema
+from services.bitmap import RowBitmap
+from services.planner import filter_row_ids, plan_query, sort_row_ids, clear_result_cache, cached_row_ids
+from services.sample import create_synthetic_data
+
+
+@pytest.fixture(scope="module")
+def index():
+    df = add_derived_columns(apply_metrics_schema(create_synthetic_data(20000, seed=11)))
+    return DatasetIndex(df, version=1)
+
+
+class TestQueryPlan:
+    def test_matches_pandas_filtering(self, index):
+        """Row ids are exactly the rows chained pandas filters keep."""
+        df = index.df
+        ranges = normalize_ranges([RangeFilter(column="clicks", gte=20)])
+        row_ids = plan_query(index, "2023-06-01", "2024-01-31", "9", ranges).execute()
+
+        expected = df[(df['date'] >= "2023-06-01") & (df['date'] <= "2024-01-31")
+                      & df['campaign_id'].astype(str).str.contains("9") & (df['clicks'] >= 20)]
+
+        assert np.array_equal(row_ids, expected.index.to_numpy())
+        assert 0 < len(row_ids) < len(df)
+
+    def test_most_selective_predicate_runs_first(self, index):
+        """A narrow date range is evaluated before a broad range filter."""
+        ranges = normalize_ranges([RangeFilter(column="impressions", gt=1)])
+        plan = plan_query(index, "2024-07-01", "2024-07-03", None, ranges)
+        plan.execute()
+
+        steps = plan.explain()
+        assert [step["predicate"] for step in steps] == ["date", "range:impressions"]
+        assert steps[0]["rows_after"] >= steps[1]["rows_after"]
+
+    def test_no_filters_means_all_rows(self, index):
+        assert filter_row_ids(index) is None
+
+    def test_results_are_cached_per_dataset_version(self, index):
+        clear_result_cache()
+        first = filter_row_ids(index, search_term="63")
+        cached = cached_row_ids(index, search_term="63")
+        assert isinstance(cached, RowBitmap) and cached.nbytes < first.nbytes
+        assert np.array_equal(filter_row_ids(index, search_term="63"), first)
+
+        reloaded = DatasetIndex(index.df, version=index.version + 1)
+        assert cached_row_ids(reloaded, search_term="63") is None
+
+
+class TestSortRowIds:
+    @pytest.mark.parametrize("column,ascending", [
+        ("impressions", False), ("date", True), ("date", False), ("campaign_id", True), ("cpa", True)
+    ])
+    def test_top_page_matches_sort_values(self, index, column, ascending):
+        """The partial sort returns the same leading values as a full sort (nulls last)."""
+        df = index.df
+        top = sort_row_ids(index, None, column, ascending=ascending, limit=50)
+        expected = df[column].sort_values(ascending=ascending, na_position='last').iloc[:50]
+
+        assert df[column].iloc[top].reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+    def test_pages_over_ties_are_disjoint_and_complete(self, index):
+        """Partial-sorted pages tile the stable full sort, even across many equal keys."""
+        page_size, pages = 20, 100
+        assert index.df['clicks'].iloc[:page_size * pages].duplicated().mean() > 0.5
+
+        paged = np.concatenate([
+            sort_row_ids(index, None, "clicks", limit=(page + 1) * page_size)[page * page_size:]
+            for page in range(pages)
+        ])
+        expected = sort_row_ids(index, None, "clicks")[:page_size * pages]
+
+        assert len(np.unique(paged)) == page_size * pages
+        assert np.array_equal(paged, expected)
+
+    def test_ids_sort_numerically(self, tmp_path):
+        """Ids of different lengths sort as numbers, not as their strings."""
+        from services.loader import read_metrics_csv
+        csv_path = tmp_path / "metrics.csv"
+        csv_path.write_text(
+            "date,account_id,campaign_id,impressions,clicks,interactions,conversions,cost_micros\n"
+            "2024-01-01,7,999,10,1,1,0,5\n2024-01-01,30,10000,10,1,1,0,5\n2024-01-01,100,25,10,1,1,0,5\n"
+        )
+        ids = DatasetIndex(read_metrics_csv(str(csv_path)), version=1)
+
+        for column, expected in (("campaign_id", [25, 999, 10000]), ("account_id", [7, 30, 100])):
+            ascending = ids.df[column].iloc[sort_row_ids(ids, None, column)].astype(int).tolist()
+            descending = ids.df[column].iloc[sort_row_ids(ids, None, column, ascending=False)].astype(int).tolist()
+            assert ascending == expected and descending == expected[::-1]
+
+    def test_nulls_sort_last_in_full_order(self, index):
+        ordered = sort_row_ids(index, None, "cpa", ascending=False)
+
+        assert len(ordered) == index.n
+        nulls = int(index.df['cpa'].isna().sum())
+        assert nulls and index.df['cpa'].iloc[ordered[-nulls:]].isna().all()
+
+
+class TestEarlyTermination:
+    def test_first_matches_are_a_prefix_of_the_full_result(self, index):
+        ranges = normalize_ranges([RangeFilter(column="clicks", gte=20)])
+        plan = plan_query(index, None, None, "9", ranges)
+        everything = plan_query(index, None, None, "9", ranges).execute()
+
+        first, complete = plan.first_matches(25, chunk_size=1000)
+
+        assert not complete
+        assert np.array_equal(first, everything[:25])
+
+    def test_date_order_scan_matches_stable_date_sort(self, index):
+        plan = plan_query(index, "2023-01-01", None, "1", ())
+        everything = plan_query(index, "2023-01-01", None, "1", ()).execute()
+
+        first, _ = plan.first_matches(40, by_date=True, chunk_size=500)
+
+        assert np.array_equal(first, sort_row_ids(index, everything, "date", limit=40))
+
+    def test_exhausted_scan_is_complete(self, index):
+        plan = plan_query(index, "2024-07-30", None, None, ())
+        matches, complete = plan.first_matches(10 ** 9)
+
+        assert complete and len(matches) == plan.estimated_rows()
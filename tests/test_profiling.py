@@ -0,0 +1,127 @@
+import sys
+import os
+import time
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from main import app
+from middleware import ProfilingMiddleware
+from utils import config
+from utils.profiler import StackSampler, ProfileStore, profile_store
+
+client = TestClient(app)
+
+
+def busy_wait(seconds):
+    """CPU-bound helper so the sampler has something to see."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def profiled_app(monkeypatch):
+    """Minimal app wrapped in the profiling middleware with its own store."""
+    monkeypatch.setattr(config, "PROFILING_PATHS", ("/api/metrics",))
+    monkeypatch.setattr(config, "PROFILING_THRESHOLD_MS", 50)
+    store = ProfileStore(max_profiles=2)
+    test_app = FastAPI()
+    test_app.add_middleware(ProfilingMiddleware, sampler=StackSampler(interval=0.001), store=store)
+
+    @test_app.get("/api/metrics/slow")
+    async def slow():
+        busy_wait(0.1)
+        return {"ok": True}
+
+    @test_app.get("/api/metrics/worker")
+    async def worker():
+        from utils.coalescing import SingleFlight
+        await SingleFlight("test").run("key", busy_wait, 0.1)
+        return {"ok": True}
+
+    @test_app.get("/api/metrics/fast")
+    async def fast():
+        return {"ok": True}
+
+    @test_app.get("/other")
+    async def other():
+        busy_wait(0.1)
+        return {"ok": True}
+
+    return TestClient(test_app), store
+
+
+class TestProfilingMiddleware:
+    def test_slow_request_is_sampled(self, profiled_app):
+        """Requests over the threshold keep a sampled stack profile."""
+        test_client, store = profiled_app
+
+        response = test_client.get("/api/metrics/slow")
+
+        profile = store.get(int(response.headers["x-profile-id"]))
+        assert profile["mode"] == "sampled"
+        assert profile["sample_count"] > 0
+        assert any("busy_wait" in entry["stack"] for entry in profile["stacks"])
+
+    def test_threadpool_work_is_sampled(self, profiled_app):
+        """Work handed to a worker thread shows up in the request's samples."""
+        test_client, store = profiled_app
+
+        response = test_client.get("/api/metrics/worker")
+
+        profile = store.get(int(response.headers["x-profile-id"]))
+        assert any("busy_wait" in entry["stack"] for entry in profile["stacks"])
+
+    def test_cprofile_covers_threadpool_work(self, profiled_app, admin_headers):
+        """The X-Profile report includes functions run in worker threads."""
+        test_client, store = profiled_app
+
+        response = test_client.get("/api/metrics/worker", headers={**admin_headers, "X-Profile": "1"})
+
+        assert "busy_wait" in store.get(int(response.headers["x-profile-id"]))["cprofile"]
+
+    def test_fast_and_unmatched_requests_are_discarded(self, profiled_app):
+        """Fast requests and paths outside PROFILING_PATHS are not stored."""
+        test_client, store = profiled_app
+
+        assert "x-profile-id" not in test_client.get("/api/metrics/fast").headers
+        assert "x-profile-id" not in test_client.get("/other").headers
+        assert store.list() == []
+
+    def test_store_is_bounded(self, profiled_app):
+        """Only the last N profiles are kept."""
+        test_client, store = profiled_app
+
+        for _ in range(3):
+            test_client.get("/api/metrics/slow")
+
+        assert [profile["id"] for profile in store.list()] == [3, 2]
+
+    def test_cprofile_requires_admin(self, profiled_app, admin_headers, user_headers):
+        """The X-Profile flag only switches to cProfile for admins."""
+        test_client, store = profiled_app
+
+        admin = test_client.get("/api/metrics/fast", headers={**admin_headers, "X-Profile": "1"})
+        user = test_client.get("/api/metrics/fast", headers={**user_headers, "X-Profile": "1"})
+
+        profile = store.get(int(admin.headers["x-profile-id"]))
+        assert profile["mode"] == "cprofile"
+        assert "function calls" in profile["cprofile"]
+        assert "x-profile-id" not in user.headers
+
+
+class TestProfileEndpoints:
+    def test_profiles_admin_only(self, admin_headers, user_headers):
+        """Profile retrieval is restricted to admins."""
+        profile = profile_store.add("POST", "/api/metrics", 1.2, "sampled")
+
+        assert client.get("/api/profiles", headers=user_headers).status_code == 403
+        listing = client.get("/api/profiles", headers=admin_headers).json()
+        assert listing["profiles"][0]["id"] == profile["id"]
+        detail = client.get(f"/api/profiles/{profile['id']}", headers=admin_headers)
+        assert detail.json()["duration_ms"] == 1200.0
+        assert client.get("/api/profiles/999999", headers=admin_headers).status_code == 404
@@ -0,0 +1,53 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.testclient import TestClient
+from main import app
+from utils import APILogger, render_metrics
+
+client = TestClient(app)
+
+
+class TestPrometheusRendering:
+    def test_counters_and_histogram(self):
+        """Request counters and histogram buckets are exposed cumulatively."""
+        logger = APILogger()
+        logger.log_request("GET", "/api/me?x=1", "127.0.0.1", 200, response_time=0.02)
+        logger.log_request("GET", "/api/me", "127.0.0.1", 200, response_time=3.0)
+        logger.record_cache_access("query", hit=True)
+        logger.record_cache_access("query", hit=False)
+        logger.record_dataset_load(1.5, 1234)
+
+        text = render_metrics(logger)
+
+        assert 'marketing_api_requests_total{method="GET",route="/api/me",status="200"} 2' in text
+        assert 'marketing_api_request_duration_seconds_bucket{route="/api/me",le="0.025"} 1' in text
+        assert 'marketing_api_request_duration_seconds_bucket{route="/api/me",le="+Inf"} 2' in text
+        assert 'marketing_api_request_duration_seconds_count{route="/api/me"} 2' in text
+        assert 'marketing_api_cache_hit_ratio{cache="query"} 0.5' in text
+        assert 'marketing_api_dataset_rows{dataset="default"} 1234' in text
+        assert "marketing_api_process_resident_memory_bytes" in text
+
+    def test_system_events_not_counted(self):
+        """System events do not show up as HTTP requests."""
+        logger = APILogger()
+        logger.log_system_event("API_STARTUP")
+
+        assert "marketing_api_requests_total{" not in render_metrics(logger)
+
+
+class TestPrometheusEndpoint:
+    def test_metrics_endpoint_format(self, metrics_csv, admin_headers):
+        """The scrape endpoint is public and uses route templates as labels."""
+        client.post("/api/metrics", json={"search": "632"}, headers=admin_headers)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'route="/api/metrics"' in response.text
+        assert 'marketing_api_dataset_rows{dataset="default"} 4' in response.text
+        assert 'marketing_api_cache_misses_total{cache="query"}' in response.text
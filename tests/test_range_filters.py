@@ -0,0 +1,79 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from main import app
+from models import RangeFilter
+from services.filters import normalize_ranges, range_mask
+from services.loader import add_derived_columns
+from services.sample import create_synthetic_data
+
+client = TestClient(app)
+
+
+class TestRangeMask:
+    def test_fused_mask_matches_pandas(self):
+        """Chunked evaluation gives the same rows as chained pandas comparisons."""
+        df = add_derived_columns(create_synthetic_data(10000, seed=5))
+        predicates = normalize_ranges([
+            RangeFilter(column="impressions", gt=2000, lte=20000),
+            RangeFilter(column="conversion_rate", lt=2.5),
+            RangeFilter(column="cpa", gte=1e6)
+        ])
+
+        expected = ((df['impressions'] > 2000) & (df['impressions'] <= 20000)
+                    & (df['conversion_rate'] < 2.5) & (df['cpa'] >= 1e6)).to_numpy()
+
+        assert np.array_equal(range_mask(df, predicates, chunk_size=777), expected)
+        assert 0 < expected.sum() < len(df)
+
+    def test_normalized_ranges_are_order_independent(self):
+        """Equivalent filters share one cache key."""
+        first = normalize_ranges([RangeFilter(column="clicks", gt=1), RangeFilter(column="ctr", lt=5)])
+        second = normalize_ranges([RangeFilter(column="ctr", lt=5), RangeFilter(column="clicks", gt=1)])
+
+        assert first == second == (("clicks", "gt", 1.0), ("ctr", "lt", 5.0))
+
+
+class TestRangeFilterEndpoint:
+    def test_multi_column_range(self, metrics_csv, user_headers):
+        """Campaigns with > 1000 impressions and < 3% conversion rate."""
+        response = client.post("/api/metrics", json={"ranges": [
+            {"column": "impressions", "gt": 1000},
+            {"column": "conversion_rate", "lt": 3}
+        ]}, headers=user_headers)
+
+        data = response.json()
+        assert data['total_count'] == 1
+        assert data['metrics'][0]['impressions'] == 12333
+
+    def test_unknown_column_rejected(self, metrics_csv, admin_headers):
+        """Only numeric metric columns can be range-filtered."""
+        response = client.post("/api/metrics", json={"ranges": [{"column": "date", "gt": 1}]},
+                               headers=admin_headers)
+
+        assert response.status_code == 422
+
+    def test_cost_ranges_are_admin_only(self, metrics_csv, admin_headers, user_headers):
+        """Regular users cannot probe cost data through range filters."""
+        body = {"ranges": [{"column": "cost_micros", "gte": 1000000000}]}
+
+        assert client.post("/api/metrics", json=body, headers=user_headers).status_code == 403
+        assert client.post("/api/metrics", json=body, headers=admin_headers).json()['total_count'] == 2
+
+
+class TestFilterInput:
+    def test_search_is_literal(self, metrics_csv, user_headers):
+        """Search terms are matched as text, never as regular expressions."""
+        for search in ("(", "6.2", "[0-9]"):
+            response = client.post("/api/metrics", json={"search": search}, headers=user_headers)
+            assert response.status_code == 200 and response.json()['total_count'] == 0
+
+    def test_malformed_dates_rejected(self, metrics_csv, user_headers):
+        for filters in ({"start_date": "notadate"}, {"end_date": "2024-13-01"}):
+            assert client.post("/api/metrics", json=filters, headers=user_headers).status_code == 422
+        assert client.post("/api/metrics", json={"start_date": "2024-01-15"}, headers=user_headers).status_code == 200
@@ -0,0 +1,75 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import time
+from datetime import datetime
+from fastapi.testclient import TestClient
+from main import app
+from services.warmup import WarmupState, WARMUP_STEPS, warm_up
+from utils import config
+
+client = TestClient(app)
+
+
+class TestWarmup:
+    def test_warm_up_loads_dataset_and_reports_ready(self, metrics_csv, mock_metrics_data):
+        state = WarmupState()
+        warm_up(state)
+
+        report = state.snapshot()
+        assert state.ready and report["status"] == "ready"
+        assert report["completed_steps"] == list(WARMUP_STEPS) and report["progress"] == 1.0
+        assert report["dataset"]["loaded"] and report["dataset"]["rows"] == len(mock_metrics_data)
+
+    def test_failure_is_reported_and_logged_once(self, metrics_csv, monkeypatch, capsys):
+        from services import loader
+        from utils.logger import api_logger
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("disk unavailable")
+        monkeypatch.setattr(loader, "get_dataset_index", broken)
+        state = WarmupState()
+        warm_up(state)
+
+        assert state.snapshot()["status"] == "failed" and state.error == "disk unavailable"
+        logged = [log for log in api_logger.get_recent_logs(10) if log["path"] == "WARMUP_FAILED"]
+        assert logged and logged[-1]["level"] == "ERROR"
+        assert "Warmup failed" not in capsys.readouterr().out
+
+    def test_pending_state(self):
+        report = WarmupState().snapshot()
+        assert report["status"] == "pending" and report["progress"] == 0
+
+
+class TestReadinessEndpoint:
+    def test_not_ready_before_warmup(self, monkeypatch):
+        monkeypatch.setattr("services.warmup.warmup_state", WarmupState())
+        response = client.get("/ready")
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+    def test_ready_after_lifespan_warmup(self, metrics_csv, monkeypatch):
+        state = WarmupState()
+        monkeypatch.setattr("services.warmup.warmup_state", state)
+        with TestClient(app) as started:
+            for _ in range(200):
+                if state.status in ("ready", "failed"):
+                    break
+                time.sleep(0.05)
+            response = started.get("/ready")
+
+        assert response.status_code == 200
+        assert response.json()["dataset"]["version"] >= 1
+
+    def test_ready_when_warmup_disabled(self, monkeypatch):
+        monkeypatch.setattr(config, "WARMUP_ENABLED", False)
+        monkeypatch.setattr("services.warmup.warmup_state", WarmupState())
+        assert client.get("/ready").status_code == 200
+
+    def test_health_timestamp_is_current(self):
+        timestamp = datetime.fromisoformat(client.get("/health").json()["timestamp"])
+        assert timestamp.year >= 2025 and timestamp.tzinfo is not None
@@ -0,0 +1,209 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from models import MetricsFilters
+from services import loader, processor
+from services.registry import DatasetRegistry, UnknownDataset
+from services.sample import write_synthetic_csv
+from services.sketches import get_day_sketches
+from utils import config
+
+client = TestClient(app)
+MB = 1024 * 1024
+
+
+def _registry(tmp_path, names, fallback=None):
+    """Registry over tiny CSVs, each counted as 1 MB."""
+    paths = {}
+    for name in names:
+        paths[name] = tmp_path / f"{name}.csv"
+        pd.DataFrame({'date': ['2024-01-01'], 'clicks': [len(name)]}).to_csv(paths[name], index=False)
+    loads = []
+
+    def load(path):
+        loads.append(os.path.basename(path))
+        return pd.read_csv(path)
+    registry = DatasetRegistry(
+        lambda name: str(paths[name]) if name in paths else None, lambda: list(paths),
+        load, lambda df: MB, fallback=fallback
+    )
+    return registry, paths, loads
+
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    """metrics.csv plus two named datasets of different sizes."""
+    datasets_dir = tmp_path / "datasets"
+    datasets_dir.mkdir()
+    write_synthetic_csv(str(datasets_dir / "acme.csv"), 3000, seed=1, accounts=3)
+    write_synthetic_csv(str(datasets_dir / "globex.csv"), 5000, seed=2, accounts=4)
+    csv_path = write_synthetic_csv(str(tmp_path / "metrics.csv"), 1000, seed=3)
+    monkeypatch.setattr(loader, "_get_csv_path", lambda: csv_path)
+    monkeypatch.setattr(config, "DATASETS_DIR", str(datasets_dir))
+    loader.clear_cache()
+    yield datasets_dir
+    loader.clear_cache()
+
+
+class TestDatasetRegistry:
+    def test_loads_lazily_and_reuses(self, tmp_path):
+        registry, _, loads = _registry(tmp_path, ['a', 'b'])
+
+        assert registry.peek('a') is None
+        first = registry.get('a')
+        assert registry.get('a') is first
+        assert loads == ['a.csv']
+
+    def test_unknown_dataset(self, tmp_path):
+        registry, _, _ = _registry(tmp_path, ['a'])
+
+        with pytest.raises(UnknownDataset):
+            registry.get('missing')
+
+    def test_evicts_least_recently_used_over_budget(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "DATASET_MEMORY_BUDGET_MB", 2)
+        registry, _, _ = _registry(tmp_path, ['a', 'b', 'c'])
+
+        registry.get('a')
+        registry.get('b')
+        registry.get('a')  # b is now the coldest
+        registry.get('c')
+
+        assert registry.peek('b') is None
+        assert registry.peek('a') is not None and registry.peek('c') is not None
+        assert registry.snapshot()['evictions'] == 1
+
+    def test_requested_dataset_stays_even_over_budget(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "DATASET_MEMORY_BUDGET_MB", 0.5)
+        registry, _, _ = _registry(tmp_path, ['a', 'b'])
+
+        registry.get('a')
+        assert registry.get('b').name == 'b'
+        assert [entry['name'] for entry in registry.snapshot()['resident']] == ['b']
+
+    def test_versions_are_unique_and_stable_across_eviction(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "DATASET_MEMORY_BUDGET_MB", 1)
+        registry, paths, loads = _registry(tmp_path, ['a', 'b'])
+
+        version_a = registry.get('a').version
+        version_b = registry.get('b').version  # evicts a
+        assert version_a != version_b
+        assert registry.get('a').version == version_a  # same file, same version
+        assert loads == ['a.csv', 'b.csv', 'a.csv']
+
+        pd.DataFrame({'date': ['2024-01-02'], 'clicks': [123456]}).to_csv(paths['a'], index=False)
+        assert registry.get('a').version not in (version_a, version_b)
+
+    def test_index_and_sketches_count_toward_the_budget(self, datasets, monkeypatch):
+        registry = loader.dataset_registry
+        acme, globex = registry.get('acme'), registry.get('globex')
+        # Both frames fit, with no room for anything built over them
+        budget = acme.memory_bytes + globex.memory_bytes + 1024
+        monkeypatch.setattr(config, "DATASET_MEMORY_BUDGET_MB", budget / MB)
+
+        globex.index.build()
+        assert globex.memory_bytes > globex.frame_bytes
+        with_index = globex.memory_bytes
+        get_day_sketches(globex.index)
+
+        assert globex.memory_bytes > with_index
+        assert registry.peek('acme') is None and registry.peek('globex') is globex
+
+    def test_fallback_when_source_is_missing(self, tmp_path):
+        sample = pd.DataFrame({'date': ['2024-01-01'], 'clicks': [1]})
+        registry, paths, _ = _registry(tmp_path, ['a', 'b'], fallback=lambda name: sample if name == 'a' else None)
+        os.remove(paths['a'])
+        os.remove(paths['b'])
+
+        assert registry.get('a').df is sample
+        with pytest.raises(FileNotFoundError):
+            registry.get('b')
+
+
+class TestDatasetSelector:
+    def test_queries_are_served_from_the_selected_dataset(self, datasets):
+        admin = {'role': 'admin'}
+
+        assert processor.get_filtered_metrics(MetricsFilters(), admin).total_count == 1000
+        assert processor.get_filtered_metrics(MetricsFilters(dataset='acme'), admin).total_count == 3000
+        assert processor.get_filtered_metrics(MetricsFilters(dataset='globex'), admin).total_count == 5000
+
+    def test_cached_results_never_mix_datasets(self, datasets):
+        admin = {'role': 'admin'}
+        filters = {'start_date': '2024-01-01', 'end_date': '2024-06-30'}
+        counts = {}
+        for _ in range(2):
+            for name in ('acme', 'globex'):
+                counts.setdefault(name, set()).add(
+                    processor.get_metrics_count(MetricsFilters(dataset=name, **filters), admin).total_count
+                )
+        expected = {
+            name: int(pd.read_csv(datasets / f"{name}.csv")['date'].between('2024-01-01', '2024-06-30').sum())
+            for name in ('acme', 'globex')
+        }
+        assert counts == {name: {count} for name, count in expected.items()}
+
+    def test_discovery_lists_default_first(self, datasets):
+        assert loader.dataset_registry.names() == ['default', 'acme', 'globex']
+
+    def test_unknown_and_invalid_selectors(self, datasets, admin_headers):
+        assert client.post("/api/metrics", headers=admin_headers, json={"dataset": "initech"}).status_code == 404
+        assert client.post("/api/metrics", headers=admin_headers, json={"dataset": "../metrics"}).status_code == 422
+        response = client.post("/api/metrics", headers=admin_headers, json={"dataset": "acme"})
+        assert response.status_code == 200 and response.json()["total_count"] == 3000
+
+    def test_batch_queries_per_dataset(self, datasets, admin_headers):
+        response = client.post("/api/batch", headers=admin_headers, json={"queries": [
+            {"id": "a", "filters": {"dataset": "acme", "start_date": "2024-01-01"}},
+            {"id": "g", "filters": {"dataset": "globex", "start_date": "2024-01-01"}},
+            {"id": "x", "filters": {"dataset": "initech"}}
+        ]})
+        results = {result["id"]: result for result in response.json()["results"]}
+
+        for name, key in (('acme', 'a'), ('globex', 'g')):
+            expected = int((pd.read_csv(datasets / f"{name}.csv")['date'] >= '2024-01-01').sum())
+            assert results[key]["data"]["total_count"] == expected
+        assert results["x"]["status"] == 404
+
+    def test_named_datasets_require_a_grant(self, datasets, user_headers, tmp_path, monkeypatch):
+        from auth import auth
+        monkeypatch.setattr(auth, "USER_DATASETS_CSV_PATH", str(tmp_path / "user_datasets.csv"))
+
+        # No grant rows: the default dataset only, and unknown names look the same as denied ones
+        assert client.post("/api/metrics", headers=user_headers, json={}).status_code == 200
+        for name in ("acme", "initech"):
+            assert client.post("/api/metrics", headers=user_headers, json={"dataset": name}).status_code == 403
+        assert client.post("/api/timeseries", headers=user_headers,
+                           json={"filters": {"dataset": "acme"}, "metrics": ["clicks"]}).status_code == 403
+        batch = client.post("/api/batch", headers=user_headers, json={"queries": [
+            {"id": "a", "filters": {"dataset": "acme"}}, {"id": "d"}
+        ]}).json()
+        assert [result["status"] for result in batch["results"]] == [403, 200]
+
+        (tmp_path / "user_datasets.csv").write_text("email,dataset\nuser2@company.com,acme\n")
+        response = client.post("/api/metrics", headers=user_headers, json={"dataset": "acme"})
+        assert response.status_code == 200 and response.json()["total_count"] == 3000
+        assert client.post("/api/metrics", headers=user_headers, json={"dataset": "globex"}).status_code == 403
+
+    def test_gauges_are_labelled_by_dataset(self, datasets, admin_headers):
+        for name in ("acme", "globex"):
+            client.post("/api/metrics", headers=admin_headers, json={"dataset": name})
+
+        text = client.get("/metrics").text
+        assert 'marketing_api_dataset_rows{dataset="acme"} 3000' in text
+        assert 'marketing_api_dataset_rows{dataset="globex"} 5000' in text
+
+    def test_listing_is_admin_only(self, datasets, admin_headers, user_headers):
+        client.post("/api/metrics", headers=admin_headers, json={"dataset": "acme"})
+        listing = client.get("/api/datasets", headers=admin_headers).json()
+
+        assert [dataset["name"] for dataset in listing["datasets"]] == ['default', 'acme', 'globex']
+        assert [dataset["loaded"] for dataset in listing["datasets"]] == [False, True, False]
+        assert client.get("/api/datasets", headers=user_headers).status_code == 403
@@ -0,0 +1,77 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pytest
+from auth import auth
+from fastapi.testclient import TestClient
+from main import app
+from services.index import DatasetIndex
+from services.loader import add_derived_columns, apply_metrics_schema
+from services.planner import clear_result_cache, filter_row_ids
+from services.sample import create_synthetic_data
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def index():
+    df = add_derived_columns(apply_metrics_schema(create_synthetic_data(30000, seed=4, accounts=12)))
+    return DatasetIndex(df, version=1)
+
+
+@pytest.fixture
+def grants(tmp_path, monkeypatch):
+    """Write user_accounts.csv rows and point auth at it."""
+    path = tmp_path / "user_accounts.csv"
+
+    def write(*rows):
+        path.write_text("email,account_id\n" + "".join(f"{email},{account}\n" for email, account in rows))
+    write()
+    monkeypatch.setattr(auth, "USER_ACCOUNTS_CSV_PATH", str(path))
+    return write
+
+
+class TestAccountBitmaps:
+    def test_rows_match_account_filter(self, index):
+        df = index.df
+        accounts = [str(value) for value in df['account_id'].cat.categories[:3]]
+        clear_result_cache()
+
+        row_ids = filter_row_ids(index, search_term="5", accounts=accounts)
+
+        expected = df[df['account_id'].astype(str).isin(accounts) & df['campaign_id'].astype(str).str.contains("5")]
+        assert np.array_equal(row_ids, expected.index.to_numpy())
+
+    def test_account_sets_are_built_once(self, index):
+        accounts = [str(value) for value in index.df['account_id'].cat.categories[:2]]
+        first = index.account_rows(accounts)
+
+        assert index.account_rows(list(reversed(accounts))) is first
+        assert len(first) == index.df['account_id'].astype(str).isin(accounts).sum()
+
+    def test_unknown_accounts_match_nothing(self, index):
+        assert len(filter_row_ids(index, accounts=("0",))) == 0
+
+
+class TestGrants:
+    def test_grants_restrict_metrics(self, metrics_csv, user_headers, grants):
+        unrestricted = client.post("/api/metrics", headers=user_headers, json={})
+        assert unrestricted.json()["total_count"] == 4
+
+        grants(("user2@company.com", "123"))
+        assert client.post("/api/metrics", headers=user_headers, json={}).json()["total_count"] == 0
+
+        grants(("user2@company.com", "123"), ("user2@company.com", "8181642239"))
+        restricted = client.post("/api/metrics", headers=user_headers, json={})
+        assert restricted.json()["total_count"] == 4
+        assert client.get("/api/me", headers=user_headers).json()["accounts"] == ["123", "8181642239"]
+
+    def test_restricted_users_cannot_read_global_sketches(self, metrics_csv, user_headers, grants):
+        grants(("user2@company.com", "8181642239"))
+
+        response = client.post("/api/stats/approx", headers=user_headers, json={})
+        assert response.status_code == 403
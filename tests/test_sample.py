@@ -0,0 +1,26 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.sample import create_sample_data, create_synthetic_data
+
+
+class TestSyntheticData:
+    def test_same_seed_same_data(self):
+        """The benchmark generator is fully deterministic."""
+        first = create_synthetic_data(1000, seed=7)
+        second = create_synthetic_data(1000, seed=7)
+
+        assert first.equals(second)
+        assert not first.equals(create_synthetic_data(1000, seed=8))
+
+    def test_schema_matches_sample_data(self):
+        """Synthetic rows have the same columns as the fallback sample data."""
+        synthetic = create_synthetic_data(500, seed=1)
+
+        assert set(synthetic.columns) == set(create_sample_data(5, seed=1).columns)
+        assert synthetic['date'].is_monotonic_increasing
+        assert (synthetic['clicks'] <= synthetic['impressions']).all()
+        assert synthetic.groupby('campaign_id')['account_id'].nunique().max() == 1
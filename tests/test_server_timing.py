@@ -0,0 +1,64 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fastapi.testclient import TestClient
+from main import app
+from utils import config
+from utils.timing import span, start_request_timing, stop_request_timing, format_server_timing
+
+client = TestClient(app)
+
+
+class TestSpans:
+    def test_span_is_noop_without_timing_context(self):
+        """Spans outside a timed request record nothing."""
+        stop_request_timing()
+        with span("load"):
+            pass
+        spans = start_request_timing()
+        assert spans == {}
+        stop_request_timing()
+
+    def test_repeated_spans_accumulate(self):
+        """The same stage name adds up across calls."""
+        spans = start_request_timing()
+        with span("auth"):
+            pass
+        with span("auth"):
+            pass
+        stop_request_timing()
+
+        assert list(spans) == ["auth"]
+        assert format_server_timing({"load": 0.0125}, total=0.02) == "load;dur=12.500, total;dur=20.000"
+
+
+class TestServerTimingHeader:
+    def test_header_absent_when_disabled(self, monkeypatch, metrics_csv, admin_headers):
+        """No Server-Timing header unless enabled by configuration."""
+        monkeypatch.setattr(config, "SERVER_TIMING_ENABLED", False)
+
+        response = client.post("/api/metrics", json={}, headers=admin_headers)
+
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_stage_breakdown_when_enabled(self, monkeypatch, metrics_csv, admin_headers):
+        """Enabled timing reports each pipeline stage and records it in the logger."""
+        from utils.logger import api_logger
+        monkeypatch.setattr(config, "SERVER_TIMING_ENABLED", True)
+
+        response = client.post(
+            "/api/metrics",
+            json={"search": "632", "sort_by": "impressions"},
+            headers=admin_headers
+        )
+
+        header = response.headers["server-timing"]
+        for stage in ("auth", "load", "filter", "sort", "paginate", "serialize", "total"):
+            assert f"{stage};dur=" in header
+        stages = {stage for route, stage in api_logger.get_metrics_snapshot()["stage_stats"]
+                  if route == "/api/metrics"}
+        assert {"load", "sort", "serialize"} <= stages
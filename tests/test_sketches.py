@@ -0,0 +1,102 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from main import app
+from services.index import DatasetIndex
+from services.loader import add_derived_columns, apply_metrics_schema
+from services.sample import create_synthetic_data
+from services.sketches import DaySketches, HyperLogLog, KLLSketch, hll_standard_error, kll_rank_error
+
+client = TestClient(app)
+
+
+class TestHyperLogLog:
+    def test_estimate_within_error_bound(self):
+        hashes = pd.util.hash_array(np.arange(200000, dtype=np.int64))
+        estimate = HyperLogLog().add_hashes(hashes).estimate()
+
+        assert abs(estimate - 200000) / 200000 < 4 * hll_standard_error()
+
+    def test_merge_equals_union(self):
+        first = HyperLogLog().add_hashes(pd.util.hash_array(np.arange(0, 6000, dtype=np.int64)))
+        second = HyperLogLog().add_hashes(pd.util.hash_array(np.arange(3000, 9000, dtype=np.int64)))
+        union = HyperLogLog().add_hashes(pd.util.hash_array(np.arange(0, 9000, dtype=np.int64)))
+
+        assert np.array_equal(first.merge(second).registers, union.registers)
+
+
+class TestKLLSketch:
+    def test_merged_quantiles_within_rank_error(self):
+        values = np.random.default_rng(3).lognormal(size=100000)
+        merged = KLLSketch()
+        for part in np.array_split(values, 50):
+            merged.merge(KLLSketch().update(part))
+
+        estimates = merged.quantiles([0.1, 0.5, 0.99])
+        ranks = [(values < estimate).mean() for estimate in estimates]
+
+        assert merged.count == len(values)
+        assert np.allclose(ranks, [0.1, 0.5, 0.99], atol=kll_rank_error())
+        assert sum(len(level) for level in merged.levels) < 2000
+
+    def test_empty_sketch(self):
+        assert KLLSketch().update([np.nan]).quantiles([0.5]) == [None]
+
+
+class TestDaySketches:
+    def test_range_answers_match_exact_values(self):
+        df = add_derived_columns(apply_metrics_schema(create_synthetic_data(50000, seed=9, campaigns=3000)))
+        sketches = DaySketches(DatasetIndex(df, version=1))
+        lo, hi = sketches.day_range("2023-05-01", "2023-10-31")
+        selected = df[(df['date'] >= "2023-05-01") & (df['date'] <= "2023-10-31")]
+
+        assert sketches.rows(lo, hi) == len(selected)
+        exact = selected['campaign_id'].nunique()
+        assert abs(sketches.distinct_count('campaign_id', lo, hi) - exact) / exact < 4 * hll_standard_error()
+        (median,) = sketches.quantiles('ctr', [0.5], lo, hi)
+        assert abs((selected['ctr'] < median).mean() - 0.5) < kll_rank_error()
+
+
+class TestApproxStatsEndpoint:
+    def test_returns_estimates_and_error_bounds(self, metrics_csv, mock_metrics_data, admin_headers):
+        response = client.post("/api/stats/approx", headers=admin_headers, json={
+            "quantiles": {"cpc": [0.5]}
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rows"] == len(mock_metrics_data)
+        assert data["distinct"]["campaign_id"] == mock_metrics_data['campaign_id'].nunique()
+        assert data["quantiles"]["cpc"]["0.5"] > 0
+        assert set(data["error"]) == {"distinct_relative_standard_error", "quantile_rank_error"}
+
+    def test_cost_quantiles_require_admin(self, metrics_csv, user_headers):
+        response = client.post("/api/stats/approx", headers=user_headers, json={"quantiles": {"cpa": [0.5]}})
+        assert response.status_code == 403
+
+    def test_sketches_build_off_the_event_loop(self, metrics_csv, admin_headers, monkeypatch):
+        import asyncio
+        from services import sketches
+        from services.loader import clear_cache
+        on_loop, build = [], sketches.DaySketches.__init__
+
+        def tracking_build(self, *args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(args)
+            except RuntimeError:
+                pass  # a worker thread
+            build(self, *args, **kwargs)
+        monkeypatch.setattr(sketches.DaySketches, "__init__", tracking_build)
+        clear_cache()
+
+        response = client.post("/api/stats/approx", headers=admin_headers, json={"quantiles": {"cpc": [0.5]}})
+
+        assert response.status_code == 200
+        assert on_loop == []
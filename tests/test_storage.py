@@ -0,0 +1,202 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import pandas as pd
+import pytest
+from models import MetricsFilters
+from services import loader, processor, storage
+from services.sample import write_synthetic_csv
+from services.storage import MetricsStore
+from utils import config
+
+QUERIES = (
+    {},
+    {'sort_by': 'impressions', 'sort_order': 'desc'},
+    {'sort_by': 'date', 'sort_order': 'desc', 'page': 3},
+    {'start_date': '2024-03-01', 'end_date': '2024-03-20', 'sort_by': 'cpc', 'sort_order': 'desc'},
+    {'search': '12', 'page': 2},
+    {'ranges': [{'column': 'clicks', 'gte': 50}], 'sort_by': 'ctr'},
+    {'sort_by': 'cpa', 'page': 2},
+    {'sort_by': 'conversion_rate', 'sort_order': 'desc', 'page': 4},
+)
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    return write_synthetic_csv(str(tmp_path_factory.mktemp("storage") / "metrics.csv"), 8000, seed=5, accounts=6)
+
+
+@pytest.fixture
+def sql_backend(csv_path, monkeypatch):
+    """Serve the synthetic CSV through the SQLite store."""
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(loader, "_get_csv_path", lambda: csv_path)
+    loader.clear_cache()
+    yield csv_path
+    loader.clear_cache()
+
+
+class TestImport:
+    def test_import_builds_indexed_table(self, sql_backend):
+        store = loader.get_metrics_store()
+
+        assert store.rows == 8000
+        indexes = {row[0] for row in store.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'idx_metrics_date', 'idx_metrics_campaign_id', 'idx_metrics_account_id'} <= indexes
+        assert os.path.exists(os.path.splitext(sql_backend)[0] + '.sqlite')
+
+    def test_reopening_reuses_the_database(self, sql_backend, monkeypatch):
+        loader.get_metrics_store()
+        loader.clear_cache()
+        imports = []
+        monkeypatch.setattr(storage, "import_csv", lambda *args: imports.append(args))
+
+        assert loader.get_metrics_store().rows == 8000
+        assert imports == []
+
+    def test_changed_csv_is_reimported(self, tmp_path, monkeypatch):
+        csv_path = write_synthetic_csv(str(tmp_path / "metrics.csv"), 500, seed=1)
+        db_path = str(tmp_path / "metrics.sqlite")
+        assert MetricsStore.open(csv_path, db_path).rows == 500
+
+        write_synthetic_csv(csv_path, 700, seed=2)
+        assert MetricsStore.open(csv_path, db_path).rows == 700
+
+    def test_memory_backend_has_no_store(self, monkeypatch):
+        monkeypatch.setattr(config, "STORAGE_BACKEND", "memory")
+        assert loader.get_metrics_store() is None
+
+
+class TestPushdown:
+    @pytest.mark.parametrize("query", QUERIES)
+    @pytest.mark.parametrize("user", [{'role': 'admin'}, {'role': 'user'}])
+    def test_pages_match_in_memory_backend(self, sql_backend, monkeypatch, query, user):
+        filters = MetricsFilters(**query)
+        from_store = processor.get_filtered_metrics(filters, user, filters.page, 20).model_dump()
+        monkeypatch.setattr(config, "STORAGE_BACKEND", "memory")
+        in_memory = processor.get_filtered_metrics(filters, user, filters.page, 20).model_dump()
+
+        assert from_store['metrics']
+        assert in_memory == from_store
+
+    def test_account_grant_is_a_filter(self, sql_backend):
+        accounts = tuple(pd.read_csv(sql_backend, dtype=str)['account_id'].unique()[:2])
+        store = loader.get_metrics_store()
+        user = {'role': 'user', 'accounts': accounts}
+
+        page = store.page(processor.get_filter_set(MetricsFilters(), user), ['account_id'], limit=50)
+        assert set(page['account_id']) <= set(accounts)
+        assert processor.get_metrics_count(MetricsFilters(), user).total_count == store.count(None, None, None, (), accounts)
+
+    def test_search_is_literal(self, sql_backend):
+        store = loader.get_metrics_store()
+        assert store.count(None, None, '(') == 0
+        assert store.count(None, None, '1') == processor.get_metrics_count(MetricsFilters(search='1'), {'role': 'user'}).total_count
+
+    def test_only_the_page_is_read(self, sql_backend):
+        store = loader.get_metrics_store()
+        user = {'role': 'user'}
+        df_page, total_count = processor.store_page(store, MetricsFilters(sort_by='cost_micros'), user, 40, 20)
+
+        assert len(df_page) == 20 and total_count == 8000
+        assert 'cost_micros' not in df_page.columns
+
+    def test_ids_sort_numerically(self, tmp_path):
+        csv_path = tmp_path / "metrics.csv"
+        csv_path.write_text(
+            "date,account_id,campaign_id,impressions,clicks,interactions,conversions,cost_micros\n"
+            "2024-01-01,7,999,10,1,1,0,5\n2024-01-01,30,10000,10,1,1,0,5\n2024-01-01,100,25,10,1,1,0,5\n"
+        )
+        store = MetricsStore.open(str(csv_path), str(tmp_path / "metrics.sqlite"))
+        filter_set = (None, None, None, (), None)
+
+        page = store.page(filter_set, ['campaign_id'], 'campaign_id', ascending=True)
+        assert page['campaign_id'].tolist() == ['25', '999', '10000']
+        page = store.page(filter_set, ['account_id'], 'account_id', ascending=False)
+        assert page['account_id'].tolist() == ['100', '30', '7']
+
+    def test_date_filter_uses_the_index(self, sql_backend):
+        store = loader.get_metrics_store()
+        where, params = store.where_clause('2024-03-01', '2024-03-02')
+        plan = store.execute(f"EXPLAIN QUERY PLAN SELECT COUNT(*) FROM metrics{where}", params)
+
+        assert any('idx_metrics_date' in row[-1] for row in plan)
+
+
+class TestNoFrameLoad:
+    """SQL mode answers every endpoint without loading the CSV into memory."""
+
+    @pytest.fixture(autouse=True)
+    def loads(self):
+        self.loads_before = loader.dataset_registry.stats['loads']
+
+    def _assert_not_loaded(self):
+        assert loader.dataset_registry.stats['loads'] == self.loads_before
+        assert loader.get_resident_index(None) is None
+
+    @pytest.mark.parametrize("group_by", [None, 'date', 'account_id'])
+    def test_aggregates_match_in_memory_backend(self, sql_backend, monkeypatch, group_by):
+        from services.aggregates import get_aggregated_metrics
+        filters, user = MetricsFilters(start_date='2024-02-01', search='1'), {'role': 'admin'}
+        from_store = get_aggregated_metrics(filters, user, group_by).model_dump()
+        self._assert_not_loaded()
+        monkeypatch.setattr(config, "STORAGE_BACKEND", "memory")
+        in_memory = get_aggregated_metrics(filters, user, group_by).model_dump()
+
+        assert [group['key'] for group in from_store['groups'] or ()] == [group['key'] for group in in_memory['groups'] or ()]
+        assert not group_by or len(from_store['groups']) > 1
+        for row, other in zip([from_store['totals'], *(from_store['groups'] or ())],
+                              [in_memory['totals'], *(in_memory['groups'] or ())]):
+            assert row == pytest.approx(other, rel=1e-5)
+
+    @pytest.mark.parametrize("group_by", [None, 'campaign_id'])
+    def test_time_series_match_in_memory_backend(self, sql_backend, monkeypatch, group_by):
+        from models import TimeSeriesQuery
+        from services.timeseries import get_time_series
+        query = TimeSeriesQuery(filters=MetricsFilters(end_date='2024-03-31'), metrics=['clicks', 'ctr'],
+                                interval='week', group_by=group_by, top=3)
+        from_store = get_time_series(query, {'role': 'user'}).model_dump()
+        self._assert_not_loaded()
+        monkeypatch.setattr(config, "STORAGE_BACKEND", "memory")
+        in_memory = get_time_series(query, {'role': 'user'}).model_dump()
+
+        assert from_store['buckets'] == in_memory['buckets'] > 1
+        assert [series['key'] for series in from_store['series']] == [series['key'] for series in in_memory['series']]
+        for series, other in zip(from_store['series'], in_memory['series']):
+            assert series['timestamps'] == other['timestamps']
+            for metric, values in series['values'].items():
+                assert values == pytest.approx(other['values'][metric], rel=1e-5)
+
+    def test_export_matches_in_memory_backend(self, sql_backend, monkeypatch):
+        import orjson
+        from services.export import export_metrics
+        filters = MetricsFilters(sort_by='clicks', sort_order='desc', search='2')
+        body, _, meta = export_metrics(filters, {'role': 'user'}, 2, 50, 'columnar')
+        self._assert_not_loaded()
+        monkeypatch.setattr(config, "STORAGE_BACKEND", "memory")
+        expected, _, expected_meta = export_metrics(filters, {'role': 'user'}, 2, 50, 'columnar')
+
+        from_store, in_memory = orjson.loads(body), orjson.loads(expected)
+        assert meta == expected_meta
+        assert from_store['columns'] == in_memory['columns'] and 'cost_micros' not in from_store['columns']
+        for column in ('date', 'account_id', 'campaign_id', 'clicks'):
+            assert from_store['data'][column] == in_memory['data'][column]
+        assert from_store['data']['ctr'] == pytest.approx(in_memory['data']['ctr'], rel=1e-5)
+
+    def test_batch_and_approximate_stats(self, sql_backend, admin_headers):
+        from fastapi.testclient import TestClient
+        from main import app
+        client = TestClient(app)
+        batch = client.post("/api/batch", headers=admin_headers, json={"queries": [
+            {"type": "metrics", "filters": {"start_date": "2024-02-01", "page_size": 5}},
+            {"type": "aggregate", "filters": {"start_date": "2024-02-01"}, "group_by": "account_id"},
+        ]})
+        stats = client.post("/api/stats/approx", headers=admin_headers, json={})
+
+        assert batch.status_code == 200
+        assert all(result['status'] == 200 for result in batch.json()['results'])
+        assert stats.status_code == 501
+        self._assert_not_loaded()
@@ -0,0 +1,111 @@
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import numpy as np
+from fastapi.testclient import TestClient
+from main import app
+from services.timeseries import bucket_starts, choose_interval, lttb_indices
+
+client = TestClient(app)
+
+
+class TestBucketing:
+    def test_weeks_start_on_monday_and_months_on_the_first(self):
+        days = np.array(['2024-01-01', '2024-01-07', '2024-01-08', '2024-02-29'], dtype='datetime64[D]')
+
+        assert bucket_starts(days, 'week').astype(str).tolist() == [
+            '2024-01-01', '2024-01-01', '2024-01-08', '2024-02-26']
+        assert bucket_starts(days, 'month').astype(str).tolist() == [
+            '2024-01', '2024-01', '2024-01', '2024-02']
+
+    def test_finest_interval_that_fits(self):
+        start, end = np.datetime64('2023-01-01'), np.datetime64('2023-12-31')
+
+        assert choose_interval(start, end, 400) == 'day'
+        assert choose_interval(start, end, 100) == 'week'
+        assert choose_interval(start, end, 20) == 'month'
+
+
+class TestLttb:
+    def test_keeps_endpoints_and_extremes(self):
+        x = np.arange(1000, dtype='float64')
+        y = np.zeros(1000)
+        y[500] = 10.0  # single spike
+
+        keep = lttb_indices(x, y, 50)
+
+        assert len(keep) == 50 and keep[0] == 0 and keep[-1] == 999
+        assert np.all(np.diff(keep) > 0)
+        assert 500 in keep
+
+    def test_short_series_untouched(self):
+        assert lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+class TestTimeSeriesEndpoint:
+    def test_daily_totals_match_rows(self, metrics_csv, mock_metrics_data, user_headers):
+        response = client.post("/api/timeseries", headers=user_headers, json={
+            "metrics": ["clicks", "ctr"], "interval": "day"
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["interval"] == "day"
+        (series,) = data["series"]
+        daily = mock_metrics_data.groupby(mock_metrics_data['date'].dt.strftime('%Y-%m-%d'))['clicks'].sum()
+        clicks = dict(zip(series["timestamps"], series["values"]["clicks"]))
+        assert all(clicks[day] == total for day, total in daily.items())
+        assert len(series["values"]["ctr"]) == len(series["timestamps"])
+
+    def test_grouped_series_respect_top(self, metrics_csv, admin_headers):
+        response = client.post("/api/timeseries", headers=admin_headers, json={
+            "metrics": ["cost_micros"], "group_by": "campaign_id", "top": 1
+        })
+
+        series = response.json()["series"]
+        assert len(series) == 1 and series[0]["key"]
+
+    def test_cost_metrics_require_admin(self, metrics_csv, user_headers):
+        response = client.post("/api/timeseries", headers=user_headers, json={"metrics": ["cpc"]})
+        assert response.status_code == 403
+
+    def test_unknown_metric_rejected(self, user_headers):
+        response = client.post("/api/timeseries", headers=user_headers, json={"metrics": ["revenue"]})
+        assert response.status_code == 422
+
+    def test_errors_are_logged(self, metrics_csv, user_headers, monkeypatch):
+        from services import timeseries
+        from utils.logger import api_logger
+
+        def broken(*args, **kwargs):
+            raise RuntimeError("index unavailable")
+        monkeypatch.setattr(timeseries, "get_time_series", broken)
+
+        response = client.post("/api/timeseries", headers=user_headers, json={"metrics": ["clicks"]})
+
+        assert response.status_code == 500
+        logged = api_logger.get_recent_logs(10)
+        assert any(log["path"] == "API_ERROR" and log["level"] == "ERROR" for log in logged)
+
+    def test_cold_dataset_loads_off_the_event_loop(self, metrics_csv, user_headers, monkeypatch):
+        import asyncio
+        from services.loader import clear_cache, dataset_registry
+        on_loop, load = [], dataset_registry._load
+
+        def tracking_load(path):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(path)
+            except RuntimeError:
+                pass  # a worker thread
+            return load(path)
+        monkeypatch.setattr(dataset_registry, "_load", tracking_load)
+        clear_cache()
+
+        response = client.post("/api/timeseries", headers=user_headers, json={"metrics": ["clicks"]})
+
+        assert response.status_code == 200 and response.json()["series"]
+        assert on_loop == []